@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+        from rest_framework.authtoken.models import Token
+        from .authentication import token_deleted, user_changed
+        post_delete.connect(token_deleted, sender=Token, dispatch_uid="accounts.token_deleted")
+        post_save.connect(user_changed, sender=get_user_model(), dispatch_uid="accounts.user_saved")
+        post_delete.connect(user_changed, sender=get_user_model(), dispatch_uid="accounts.user_deleted")
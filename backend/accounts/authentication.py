@@ -0,0 +1,148 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    Bounded LRU of token key -> (user, token), each entry valid for `ttl`
+    seconds. Entries are dropped early by the signal receivers below when a
+    token is deleted or its user is saved or deleted; the TTL bounds how stale
+    other processes (or queryset.update() calls, which send no signals) can be.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, user, token)
+        self._user_keys = {}  # user pk -> {key, ...}, so invalidating a user does not scan every entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own instances; request.user may be modified and saved
+        return copy.copy(entry[1]), copy.copy(entry[2])
+
+    def set(self, key, user, token):
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, user, token)
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._user_keys.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def _drop(self, key):
+        """Remove one entry and its index slot; callers hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys.get(entry[1].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[entry[1].pk]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Process-wide token cache, or None when TOKEN_CACHE_TTL is 0."""
+    global _token_cache
+    if settings.TOKEN_CACHE_TTL <= 0:
+        return None
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.TOKEN_CACHE_TTL)
+    return _token_cache
+
+
+class CachingTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers token -> user for TOKEN_CACHE_TTL
+    seconds, so clients polling every few seconds skip the token/user join.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        # Raises AuthenticationFailed for unknown keys and inactive users; those are not cached
+        user, token = super().authenticate_credentials(key)
+        cache.set(key, user, token)
+        return user, token
+
+
+# -- Stream tickets -------------------------------------------------------
+#
+# The browser EventSource API cannot set an Authorization header. Instead of
+# putting the long-lived API token in the URL (where it ends up in proxy and
+# server logs), the client trades it for a signed ticket that names the user
+# and expires after STREAM_TICKET_MAX_AGE seconds.
+
+STREAM_TICKET_SALT = "accounts.stream-ticket"
+
+
+def issue_stream_ticket(user):
+    return signing.TimestampSigner(salt=STREAM_TICKET_SALT).sign(str(user.pk))
+
+
+def stream_ticket_user(ticket):
+    """Active user a ticket was issued to; raises AuthenticationFailed when it is forged, expired or the user is gone."""
+    try:
+        user_id = signing.TimestampSigner(salt=STREAM_TICKET_SALT).unsign(ticket, max_age=settings.STREAM_TICKET_MAX_AGE)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed("Stream ticket expired.")
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed("Invalid stream ticket.")
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        raise exceptions.AuthenticationFailed("User inactive or deleted.")
+    return user
+
+
+# -- Invalidation (connected in AccountsConfig.ready) ---------------------
+
+def token_deleted(sender, instance, **kwargs):
+    cache = get_token_cache()
+    if cache is not None:
+        cache.invalidate_key(instance.key)
+
+
+def user_changed(sender, instance, **kwargs):
+    """Any save may deactivate the user or change the password: forget their tokens."""
+    cache = get_token_cache()
+    if cache is not None:
+        cache.invalidate_user(instance.pk)
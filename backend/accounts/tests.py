@@ -1,3 +1,115 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from .authentication import TokenCache, get_token_cache, issue_stream_ticket, stream_ticket_user
 
-# Create your tests here.
+
+class StreamTicketTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', password='pass')
+
+    def test_ticket_names_its_user(self):
+        self.assertEqual(stream_ticket_user(issue_stream_ticket(self.user)), self.user)
+
+    def test_forged_and_expired_tickets_are_refused(self):
+        ticket = issue_stream_ticket(self.user)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            stream_ticket_user(ticket[:-1] + ('A' if ticket[-1] != 'A' else 'B'))
+        with override_settings(STREAM_TICKET_MAX_AGE=-1), self.assertRaises(exceptions.AuthenticationFailed):
+            stream_ticket_user(ticket)
+
+    def test_inactive_user_is_refused(self):
+        ticket = issue_stream_ticket(self.user)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            stream_ticket_user(ticket)
+
+    def test_ticket_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.post('/api/auth/stream-ticket/').status_code, 401)
+        token = Token.objects.create(user=self.user)
+        response = self.client.post('/api/auth/stream-ticket/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stream_ticket_user(response.json()['ticket']), self.user)
+
+
+class TokenCacheTests(SimpleTestCase):
+    def user(self, pk):
+        return SimpleNamespace(pk=pk)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TokenCache(ttl=60)
+        with mock.patch('accounts.authentication.time.monotonic', return_value=100):
+            cache.set('a', self.user(1), 'token')
+        with mock.patch('accounts.authentication.time.monotonic', return_value=159):
+            self.assertIsNotNone(cache.get('a'))
+        with mock.patch('accounts.authentication.time.monotonic', return_value=160):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache._user_keys, {})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TokenCache(max_entries=2)
+        cache.set('a', self.user(1), 'token')
+        cache.set('b', self.user(2), 'token')
+        cache.get('a')
+        cache.set('c', self.user(3), 'token')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(len(cache._entries), 2)
+        self.assertNotIn(2, cache._user_keys)
+
+    def test_invalidate_user_drops_only_that_users_keys(self):
+        cache = TokenCache()
+        cache.set('a1', self.user(1), 'token')
+        cache.set('a2', self.user(1), 'token')
+        cache.set('b', self.user(2), 'token')
+        cache.invalidate_user(1)
+        self.assertIsNone(cache.get('a1'))
+        self.assertIsNone(cache.get('a2'))
+        self.assertIsNotNone(cache.get('b'))
+        self.assertEqual(cache._user_keys, {2: {'b'}})
+
+
+class CachingTokenAuthenticationTests(TestCase):
+    """A cached token must stop authenticating on the very next request once it is revoked."""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.addCleanup(get_token_cache().clear)
+        self.user = User.objects.create_user(username='cached', password='pass')
+        self.token = Token.objects.create(user=self.user)
+
+    def get_me(self, key):
+        return self.client.get('/api/auth/me/', HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_second_request_skips_the_token_query(self):
+        self.assertEqual(self.get_me(self.token.key).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_me(self.token.key).status_code, 200)
+
+    def test_deleted_token_is_refused(self):
+        self.get_me(self.token.key)
+        self.token.delete()
+        self.assertEqual(self.get_me(self.token.key).status_code, 401)
+
+    def test_rotated_token_is_refused(self):
+        self.get_me(self.token.key)
+        old_key = self.token.key
+        self.token.delete()
+        new_token = Token.objects.create(user=self.user)
+        self.assertEqual(self.get_me(old_key).status_code, 401)
+        self.assertEqual(self.get_me(new_token.key).status_code, 200)
+
+    def test_deactivated_user_is_refused(self):
+        self.get_me(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me(self.token.key).status_code, 401)
+
+    def test_deleted_user_is_refused(self):
+        self.get_me(self.token.key)
+        User.objects.filter(pk=self.user.pk).first().delete()
+        self.assertEqual(self.get_me(self.token.key).status_code, 401)
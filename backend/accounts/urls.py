@@ -7,4 +7,5 @@ urlpatterns = [
     path('signup/', views.CreateUserView.as_view(), name='signup'),
     path('login/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('stream-ticket/', views.StreamTicketView.as_view(), name='stream-ticket'),
 ]
@@ -1,6 +1,10 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from .authentication import CachingTokenAuthentication, issue_stream_ticket
 from .serializers import UserSerializer
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,9 +18,17 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachingTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
         """Retrieve and return authenticated user"""
         return self.request.user
+
+class StreamTicketView(APIView):
+    """Short-lived ticket for EventSource URLs, which cannot send the token header"""
+    authentication_classes = (CachingTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request):
+        return Response({"ticket": issue_stream_ticket(request.user), "expires_in": settings.STREAM_TICKET_MAX_AGE})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Client, Project
+from .models import Client, Project, GenerationJob, ProjectPoolBucket, PooledProject
 
 @admin.register(Client)
 class ClientAdmin(admin.ModelAdmin):
@@ -11,3 +11,19 @@ class ProjectAdmin(admin.ModelAdmin):
     list_display = ('title', 'category', 'client', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('title', 'client__name')
+
+@admin.register(GenerationJob)
+class GenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'project', 'status', 'attempts', 'worker_id', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('project__title', 'worker_id')
+
+@admin.register(ProjectPoolBucket)
+class ProjectPoolBucketAdmin(admin.ModelAdmin):
+    list_display = ('key', 'hits', 'misses', 'updated_at')
+    search_fields = ('key',)
+
+@admin.register(PooledProject)
+class PooledProjectAdmin(admin.ModelAdmin):
+    list_display = ('id', 'bucket', 'created_at')
+    list_filter = ('bucket',)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .sqlite import configure_connection
+        connection_created.connect(configure_connection, dispatch_uid="api.sqlite.configure_connection")
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('api')
+
+
+class InProcessBroker:
+    """
+    Per-user event buffers with blocking (listen) and asyncio (alisten)
+    listeners, for single-process deployments.
+    Events are dicts {"id", "type", "data"} with ids increasing per process.
+    """
+
+    # A user's buffer is dropped once its newest event is this old; reconnecting
+    # clients come back within seconds, and new subscribers only want what is next
+    BUFFER_TTL_SECONDS = 300
+
+    def __init__(self, buffer_size=100):
+        self._condition = threading.Condition()
+        self._buffer_size = buffer_size
+        self._events = {}  # user_id -> deque of events
+        self._last_event_at = {}  # user_id -> monotonic time of its newest event
+        self._next_sweep = 0.0
+        self._async_waiters = set()  # (loop, asyncio.Event) of coroutines in alisten()
+        self._last_id = 0
+
+    def publish(self, user_id, event_type, data):
+        with self._condition:
+            self._last_id += 1
+            event = {"id": self._last_id, "type": event_type, "data": data}
+            self._append(user_id, event)
+            self._notify()
+        return event
+
+    def _append(self, user_id, event):
+        # Caller holds self._condition
+        now = time.monotonic()
+        events = self._events.get(user_id)
+        if events is None:
+            events = self._events[user_id] = deque(maxlen=self._buffer_size)
+        events.append(event)
+        self._last_event_at[user_id] = now
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.BUFFER_TTL_SECONDS
+            cutoff = now - self.BUFFER_TTL_SECONDS
+            for idle in [key for key, at in self._last_event_at.items() if at < cutoff]:
+                del self._events[idle]
+                del self._last_event_at[idle]
+
+    def latest_id(self, user_id):
+        with self._condition:
+            events = self._events.get(user_id)
+            return events[-1]["id"] if events else 0
+
+    def _buffered(self, user_id, last_event_id):
+        # Caller holds self._condition
+        return [e for e in self._events.get(user_id, ()) if e["id"] > last_event_id]
+
+    def _notify(self):
+        # Caller holds self._condition
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(waiter.set)
+
+    def listen(self, user_id, last_event_id, timeout):
+        """Block until user_id has events newer than last_event_id, or timeout."""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                events = self._buffered(user_id, last_event_id)
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0:
+                    return events
+                self._condition.wait(remaining)
+
+    async def alisten(self, user_id, last_event_id, timeout):
+        """listen() for coroutines: waits on the event loop, not on a thread."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            waiter = (loop, asyncio.Event())
+            with self._condition:
+                events = self._buffered(user_id, last_event_id)
+                remaining = deadline - loop.time()
+                if events or remaining <= 0:
+                    return events
+                # Registered under the lock, so a publish cannot slip in unseen
+                self._async_waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    self._async_waiters.discard(waiter)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Cross-process broker backed by the ProjectEvent table.
+
+    One poller thread per process reads new rows for every user at once,
+    every PROJECT_EVENTS_POLL_INTERVAL while anyone is listening, and feeds
+    them to the in-memory buffers; listeners then wait in memory, so open
+    streams cost no queries of their own. A subscription starts with one
+    query for the events it missed. Publishing in this process triggers an
+    immediate poll.
+    """
+
+    PRUNE_EVERY_SECONDS = 60
+
+    def __init__(self, buffer_size=100):
+        super().__init__(buffer_size)
+        self._last_prune = 0.0
+        self._cursor = None  # Highest ProjectEvent id the poller has read
+        self._listeners = 0
+        self._poke = threading.Event()
+        self._poller = None
+
+    def publish(self, user_id, event_type, data):
+        from .models import ProjectEvent
+
+        event = ProjectEvent.objects.create(user_id=user_id, event_type=event_type, payload=data)
+        self._prune()
+        self._poke.set()
+        return {"id": event.id, "type": event_type, "data": data}
+
+    def latest_id(self, user_id):
+        from .models import ProjectEvent
+
+        return ProjectEvent.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+    def backlog(self, user_id, last_event_id):
+        """Events after last_event_id already in the table: what a new subscriber missed."""
+        from .models import ProjectEvent
+
+        return [
+            {"id": e.id, "type": e.event_type, "data": e.payload}
+            for e in ProjectEvent.objects.filter(user_id=user_id, id__gt=last_event_id).order_by('id')
+        ]
+
+    def listen(self, user_id, last_event_id, timeout):
+        events = self.backlog(user_id, last_event_id)
+        if events:
+            return events
+        with self._listening(last_event_id):
+            return super().listen(user_id, last_event_id, timeout)
+
+    async def alisten(self, user_id, last_event_id, timeout):
+        events = await pooled_db_call(self.backlog)(user_id, last_event_id)
+        if events:
+            return events
+        with self._listening(last_event_id):
+            return await super().alisten(user_id, last_event_id, timeout)
+
+    @contextmanager
+    def _listening(self, last_event_id):
+        with self._condition:
+            self._listeners += 1
+            if self._cursor is None:
+                # The first listener's backlog query covered everything up to here
+                self._cursor = last_event_id
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll_loop, name="project-events-poller", daemon=True)
+                self._poller.start()
+        self._poke.set()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._listeners -= 1
+
+    def _poll_loop(self):
+        from .models import ProjectEvent
+
+        while True:
+            with self._condition:
+                listening = self._listeners > 0
+            if not listening:
+                connection.close()  # Nobody to poll for; do not hold the connection while idle
+                self._poke.wait()
+            self._poke.clear()
+            try:
+                rows = list(
+                    ProjectEvent.objects.filter(id__gt=self._cursor).order_by('id')
+                    .values_list('id', 'user_id', 'event_type', 'payload')
+                )
+            except Exception:
+                logger.warning("Project event poll failed", exc_info=True)
+                connection.close()
+                rows = []
+            if rows:
+                with self._condition:
+                    for event_id, user_id, event_type, payload in rows:
+                        self._append(user_id, {"id": event_id, "type": event_type, "data": payload})
+                    self._cursor = rows[-1][0]
+                    self._notify()
+            self._poke.wait(settings.PROJECT_EVENTS_POLL_INTERVAL)
+
+    def _prune(self):
+        from .models import ProjectEvent
+
+        now = time.monotonic()
+        if now - self._last_prune < self.PRUNE_EVERY_SECONDS:
+            return
+        self._last_prune = now
+        cutoff = timezone.now() - timedelta(seconds=settings.PROJECT_EVENTS_RETENTION)
+        ProjectEvent.objects.filter(created_at__lt=cutoff).delete()
+
+
+def pooled_db_call(fn):
+    """
+    Awaitable fn for coroutines: runs on a pool thread and closes that
+    thread's DB connection afterwards, so a stream lasting minutes does not
+    pin a connection between calls.
+    """
+    def call(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            connection.close()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Process-wide broker selected by settings.PROJECT_EVENTS_BROKER."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.PROJECT_EVENTS_BROKER)()
+    return _broker
+
+
+def publish_project_status(project):
+    """Announce a project's current status to its owner once the write commits."""
+    if project.owner_id is None:
+        return
+    data = {"id": str(project.id), "status": project.status, "title": project.title}
+
+    def send():
+        try:
+            get_broker().publish(project.owner_id, "status", data)
+        except Exception:
+            # Clients fall back to polling; never fail a generation over a notification
+            logger.warning(f"Could not publish status for Project {project.id}", exc_info=True)
+
+    transaction.on_commit(send)
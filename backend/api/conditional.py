@@ -0,0 +1,73 @@
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def _make_etag(request, *parts):
+    # The representation also depends on the URL (query params) and language
+    material = "|".join(str(p) for p in (request.get_full_path(), request.headers.get('Accept-Language', ''), *parts))
+    return quote_etag(hashlib.sha256(material.encode("utf-8")).hexdigest()[:32])
+
+
+def _latest(*timestamps):
+    timestamps = [t for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for ReadOnlyModelViewSet list and retrieve.
+
+    Validators come from one aggregate query over updated_at (projects and
+    their clients) plus the row count, so an unchanged poll is answered with
+    304 before the queryset is loaded or the serializer runs.
+    """
+
+    def list_validators(self):
+        stats = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('id'),
+            last=Max('updated_at'),
+            client_last=Max('client__updated_at'),
+        )
+        last_modified = _latest(stats['last'], stats['client_last'])
+        return _make_etag(self.request, self.request.user.pk, stats['count'], stats['last'], stats['client_last']), last_modified
+
+    def retrieve_validators(self):
+        lookup = {self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        row = self.get_queryset().filter(**lookup).values('pk', 'updated_at', 'client__updated_at').first()
+        if row is None:
+            return None, None  # Let retrieve() raise the usual 404
+        last_modified = _latest(row['updated_at'], row['client__updated_at'])
+        return _make_etag(self.request, row['pk'], row['updated_at'], row['client__updated_at']), last_modified
+
+    def _conditional(self, request, validators, handler, *args, **kwargs):
+        etag, last_modified = validators
+        if etag is not None:
+            not_modified = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+            )
+            if not_modified is not None:
+                return self._add_validator_headers(not_modified, etag, last_modified)
+
+        response = handler(request, *args, **kwargs)
+        if etag is not None and response.status_code == 200:
+            self._add_validator_headers(response, etag, last_modified)
+        return response
+
+    def _add_validator_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Per-user data: browsers may keep it but must revalidate every time
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization', 'Accept-Language'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, self.list_validators(), super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, self.retrieve_validators(), super().retrieve, *args, **kwargs)
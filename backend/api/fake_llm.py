@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+from django.conf import settings
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted, InternalServerError
+
+logger = logging.getLogger('api')
+
+# Where PromptBuilder puts the minified schema in every prompt
+SCHEMA_MARKER = "matching the following schema:\n"
+
+MALFORMED_KINDS = ("prose", "truncated", "missing_field", "not_json")
+
+
+def parse_latency(spec):
+    """
+    Turn "fixed:S", "uniform:A,B" or "lognormal:MEDIAN,SIGMA" (seconds) into
+    a sampler rng -> seconds.
+    """
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(value) for value in args.split(",") if value.strip()]
+        if kind == "fixed":
+            (seconds,) = values
+            return lambda rng: seconds
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid LLM_FAKE_LATENCY {spec!r}; use fixed:S, uniform:A,B or lognormal:MEDIAN,SIGMA")
+
+
+def schema_from_prompt(prompt):
+    """The response schema embedded in a built prompt, or {} if there is none."""
+    start = prompt.find(SCHEMA_MARKER)
+    if start == -1:
+        return {}
+    start += len(SCHEMA_MARKER)
+    end = prompt.find("\n\n", start)
+    try:
+        return json.loads(prompt[start:end if end != -1 else None])
+    except json.JSONDecodeError:
+        return {}
+
+
+def sample_value(schema, name, rng):
+    """A plausible value for `schema`, sized roughly like a real response."""
+    kind = schema.get("type")
+    if kind == "OBJECT":
+        return {key: sample_value(sub, key, rng) for key, sub in schema.get("properties", {}).items()}
+    if kind == "ARRAY":
+        return [sample_value(schema.get("items", {}), name, rng) for _ in range(rng.randint(2, 4))]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if kind in ("NUMBER", "INTEGER"):
+        return rng.randint(1, 40)
+    if kind == "BOOLEAN":
+        return rng.random() < 0.5
+    label = name.replace("_", " ")
+    return f"Sample {label} #{rng.randint(1, 9999)}: " + " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 18)))
+
+
+_WORDS = (
+    "build", "a", "dashboard", "for", "tracking", "orders", "with", "role-based", "access", "and",
+    "reports", "the", "client", "needs", "an", "API", "that", "integrates", "payments", "inventory",
+)
+
+
+class FakeResponse:
+    """Quacks like a google.generativeai response: .text, .usage_metadata and, when streamed, chunks."""
+
+    def __init__(self, text, prompt, chunk_delays=()):
+        self.text = text
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(text) // 4
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+        self._chunk_delays = list(chunk_delays)
+
+    def __iter__(self):
+        size = max(1, math.ceil(len(self.text) / max(1, len(self._chunk_delays))))
+        for index, delay in enumerate(self._chunk_delays):
+            time.sleep(delay)
+            yield SimpleNamespace(text=self.text[index * size:(index + 1) * size])
+
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for genai.GenerativeModel, selected with LLM_BACKEND=fake.
+
+    Responses follow the schema embedded in the prompt and take a sampled
+    latency, so worker pools, semaphores, quota waits and SQLite writes see
+    realistic overlap. Quota errors, server errors and malformed JSON are
+    injected at the configured rates.
+    """
+
+    STREAM_CHUNKS = 8
+
+    def __init__(self, model_name, latency="fixed:1", quota_error_rate=0.0, server_error_rate=0.0, malformed_rate=0.0, seed=None):
+        self.model_name = model_name
+        self._latency = parse_latency(latency)
+        self.quota_error_rate = quota_error_rate
+        self.server_error_rate = server_error_rate
+        self.malformed_rate = malformed_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, model_name):
+        return cls(
+            model_name,
+            latency=settings.LLM_FAKE_LATENCY_OVERRIDES.get(model_name, settings.LLM_FAKE_LATENCY),
+            quota_error_rate=settings.LLM_FAKE_QUOTA_ERROR_RATE,
+            server_error_rate=settings.LLM_FAKE_SERVER_ERROR_RATE,
+            malformed_rate=settings.LLM_FAKE_MALFORMED_RATE,
+            seed=settings.LLM_FAKE_SEED,
+        )
+
+    def _plan(self, prompt):
+        """Decide the outcome of one request: (latency, exception or None, response text)."""
+        with self._lock:
+            rng = self._rng
+            roll = rng.random()
+            if roll < self.quota_error_rate:
+                return rng.uniform(0.05, 0.2), ResourceExhausted("Resource has been exhausted (fake backend). Please retry in 2s."), None
+            latency = self._latency(rng)
+            if roll < self.quota_error_rate + self.server_error_rate:
+                return latency * rng.random(), InternalServerError("Internal error (fake backend)"), None
+            value = sample_value(schema_from_prompt(prompt), "value", rng)
+            text = json.dumps(value, ensure_ascii=False, indent=2)
+            if rng.random() < self.malformed_rate:
+                text = self._malform(text, value, rng)
+        return latency, None, text
+
+    def _malform(self, text, value, rng):
+        kind = rng.choice(MALFORMED_KINDS)
+        if kind == "prose":
+            return f"Sure! Here is the project:\n```json\n{text}\n```\nLet me know if you need changes."
+        if kind == "truncated":
+            return text[:int(len(text) * rng.uniform(0.5, 0.95))]
+        if kind == "missing_field" and isinstance(value, dict) and value:
+            value = dict(value)
+            value.pop(rng.choice(list(value)))
+            return json.dumps(value, ensure_ascii=False, indent=2)
+        return "I'm sorry, I can't produce that right now."
+
+    def _deadline(self, latency, error, request_options):
+        """Honour request_options={"timeout": s} like the real client: give up after `s` seconds."""
+        timeout = (request_options or {}).get("timeout")
+        if error is None and timeout and latency > timeout:
+            return timeout, DeadlineExceeded(f"Deadline of {timeout:.1f}s exceeded (fake backend)")
+        return latency, error
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        latency, error, text = self._plan(prompt)
+        latency, error = self._deadline(latency, error, request_options)
+        if error is not None:
+            time.sleep(latency)
+            raise error
+        if stream:
+            # Spread the latency over the chunks, like a token stream
+            return FakeResponse(text, prompt, [latency / self.STREAM_CHUNKS] * self.STREAM_CHUNKS)
+        time.sleep(latency)
+        return FakeResponse(text, prompt)
+
+    async def generate_content_async(self, prompt, generation_config=None, request_options=None):
+        latency, error, text = self._plan(prompt)
+        latency, error = self._deadline(latency, error, request_options)
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return FakeResponse(text, prompt)
@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections
+from .metrics import HEDGE_REQUESTS, HEDGE_SAVED_SECONDS, REGISTRY
+
+
+class LatencyTracker:
+    """Rolling window of recent request latencies per (model, schema)."""
+
+    def __init__(self, window=200, min_samples=20):
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def observe(self, key, seconds):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key, pct):
+        """Nearest-rank percentile of the window, or None until min_samples have been seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+    def keys(self):
+        with self._lock:
+            return list(self._samples)
+
+
+class HedgeBudget:
+    """Token bucket credited `ratio` per call, so hedges stay under that share of requests."""
+
+    def __init__(self, ratio, burst=5):
+        self.ratio = ratio
+        self.burst = burst
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def credit(self):
+        with self._lock:
+            self._credit = min(self.burst, self._credit + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._credit < 1:
+                return False
+            self._credit -= 1
+            return True
+
+
+class Race:
+    """Shared by the two requests of a hedged call; the first to succeed claims it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.winner = None
+        self.decided_at = None
+
+    def claim(self, index):
+        with self._lock:
+            if self.winner is None:
+                self.winner = index
+                self.decided_at = time.monotonic()
+            return self.winner == index
+
+    def gate(self, index, on_field):
+        """Forward streamed fields only while the race is open or `index` has won it."""
+        if on_field is None:
+            return None
+
+        def forward(key, value):
+            with self._lock:
+                if self.winner in (None, index):
+                    on_field(key, value)
+        return forward
+
+
+class Hedger:
+    """
+    Hedged requests: when a call is still running after the recent
+    `percentile` latency for its (model, schema), an identical second
+    request is sent and the first successful response is used. Sync losers
+    run to completion and are ignored; async losers are cancelled. The
+    budget keeps hedges under `max_ratio` of calls.
+    """
+
+    def __init__(self, percentile=90, max_ratio=0.1, min_delay=2.0, window=200, min_samples=20, max_threads=64):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.tracker = LatencyTracker(window, min_samples)
+        self.budget = HedgeBudget(max_ratio)
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="llm-hedge")
+
+    def observe(self, key, seconds):
+        self.tracker.observe(key, seconds)
+
+    def hedge_delay(self, key):
+        threshold = self.tracker.percentile(key, self.percentile)
+        return None if threshold is None else max(threshold, self.min_delay)
+
+    def _may_hedge(self, key, admit):
+        if not self.budget.try_spend():
+            HEDGE_REQUESTS.inc(model=key[0], outcome="skipped_budget")
+            return False
+        if not admit():
+            HEDGE_REQUESTS.inc(model=key[0], outcome="skipped_quota")
+            return False
+        HEDGE_REQUESTS.inc(model=key[0], outcome="issued")
+        return True
+
+    def _settle(self, key, race, hedged):
+        if hedged:
+            HEDGE_REQUESTS.inc(model=key[0], outcome="won" if race.winner == 1 else "lost")
+
+    def _run(self, attempt, index, race):
+        try:
+            result = attempt(index, race)
+        finally:
+            # Streamed fields are written from this pool thread; do not leave its connection behind
+            close_old_connections()
+        race.claim(index)
+        return result
+
+    def _submit(self, attempt, index, race):
+        # Executor threads do not inherit contextvars (call stats, request priority)
+        return self._executor.submit(contextvars.copy_context().run, self._run, attempt, index, race)
+
+    def call(self, key, attempt, admit):
+        """
+        Run attempt(index, race) -> result, hedged with attempt(1, race) when
+        attempt(0, race) is slow. admit() reserves quota for the hedge.
+        Returns (result, index of the request that produced it).
+
+        The losing request is not cancelled (a blocking SDK call cannot be
+        interrupted): it keeps its pool thread and its quota until the
+        provider answers, and race.gate() drops whatever it streams.
+        """
+        self.budget.credit()
+        delay = self.hedge_delay(key)
+        if delay is None:
+            return attempt(0, None), 0
+
+        race = Race()
+        futures = [self._submit(attempt, 0, race)]
+        done, _ = wait(futures, timeout=delay)
+        if not done and self._may_hedge(key, admit):
+            futures.append(self._submit(attempt, 1, race))
+            futures[0].add_done_callback(lambda future: self._record_saving(key, race, future))
+
+        pending, error = set(futures), None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                index = futures.index(future)
+                if race.winner == index:
+                    self._settle(key, race, len(futures) > 1)
+                    return future.result(), index
+        raise error
+
+    def _record_saving(self, key, race, future):
+        """The first request finished after the hedge had won: count the seconds the hedge saved."""
+        if race.winner == 1 and future.exception() is None:
+            HEDGE_SAVED_SECONDS.inc(max(0.0, time.monotonic() - race.decided_at), model=key[0])
+
+    async def acall(self, key, attempt, admit):
+        """Async counterpart of call(); attempt(index, race) returns a coroutine. The loser is cancelled."""
+        self.budget.credit()
+        delay = self.hedge_delay(key)
+        if delay is None:
+            return await attempt(0, None), 0
+
+        race = Race()
+
+        async def run(index):
+            result = await attempt(index, race)
+            race.claim(index)
+            return result
+
+        tasks = [asyncio.ensure_future(run(0))]
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        # admit() takes quota from the limiter's SQLite file; keep it off the event loop
+        if not done and await asyncio.to_thread(self._may_hedge, key, admit):
+            tasks.append(asyncio.ensure_future(run(1)))
+
+        try:
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    index = tasks.index(task)
+                    if race.winner == index:
+                        self._settle(key, race, len(tasks) > 1)
+                        return task.result(), index
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def samples(self):
+        """Scrape-time gauges: recent p50/p99 per (model, schema) and the current hedge threshold."""
+        latency, thresholds = [], []
+        for model, schema in self.tracker.keys():
+            for quantile in (50, 99):
+                value = self.tracker.percentile((model, schema), quantile)
+                if value is not None:
+                    latency.append(({"model": model, "schema": schema, "quantile": str(quantile / 100)}, value))
+            delay = self.hedge_delay((model, schema))
+            if delay is not None:
+                thresholds.append(({"model": model, "schema": schema}, delay))
+        yield "llm_recent_request_seconds", "gauge", "Percentiles of the recent latency window used for hedging.", latency
+        yield "llm_hedge_delay_seconds", "gauge", "Current delay before a request is hedged.", thresholds
+
+
+_hedger = None
+_hedger_lock = threading.Lock()
+
+
+def get_hedger():
+    """Process-wide hedger, or None when LLM_HEDGING_ENABLED is off."""
+    global _hedger
+    if not settings.LLM_HEDGING_ENABLED:
+        return None
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = Hedger(
+                    percentile=settings.LLM_HEDGE_PERCENTILE,
+                    max_ratio=settings.LLM_HEDGE_MAX_RATIO,
+                    min_delay=settings.LLM_HEDGE_MIN_DELAY,
+                    window=settings.LLM_HEDGE_WINDOW,
+                    min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+                )
+                REGISTRY.add_collector(_hedger.samples)
+    return _hedger
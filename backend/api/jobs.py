@@ -0,0 +1,279 @@
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import GenerationJob, Project
+from .pool import run_refill_job
+from .sqlite import serialized_write
+from .broker import publish_project_status
+from .metrics import observe_generation_finished
+
+logger = logging.getLogger('api')
+
+
+def generation_payload(category, answers, profile_data=None, difficulty=None, focus_area=None, language="en"):
+    return {
+        "category": category,
+        "answers": answers,
+        "profile_data": profile_data,
+        "difficulty": difficulty,
+        "focus_area": focus_area,
+        "language": language,
+    }
+
+
+def enqueue_generation(project, category, answers, profile_data=None, difficulty=None, focus_area=None, language="en"):
+    """
+    Persist a generation request for the worker pool.
+    Call inside the same transaction that creates the placeholder project.
+    """
+    return GenerationJob.objects.create(
+        project=project,
+        payload=generation_payload(category, answers, profile_data, difficulty, focus_area, language)
+    )
+
+
+def enqueue_batch(batch, projects, payloads):
+    """Queue one job per (project, payload) of a batch with a single INSERT."""
+    return GenerationJob.objects.bulk_create([
+        GenerationJob(project=project, batch=batch, payload=payload)
+        for project, payload in zip(projects, payloads)
+    ])
+
+
+def saturated_batches():
+    """Batches already running max_concurrency jobs; their queued jobs wait their turn."""
+    return (
+        GenerationJob.objects
+        .filter(status=GenerationJob.Status.RUNNING, batch__isnull=False)
+        .values('batch', 'batch__max_concurrency')
+        .annotate(running=Count('id'))
+        .filter(running__gte=F('batch__max_concurrency'))
+        .values('batch')
+    )
+
+
+# Generations someone is waiting on go before pool refills nobody is
+CLAIM_ORDER = (GenerationJob.Kind.GENERATE, GenerationJob.Kind.POOL_REFILL)
+
+
+def next_queued_job_id():
+    queued = GenerationJob.objects.filter(status=GenerationJob.Status.QUEUED).exclude(batch__in=saturated_batches())
+    for kind in CLAIM_ORDER:
+        job_id = queued.filter(kind=kind).order_by('created_at').values_list('id', flat=True).first()
+        if job_id is not None:
+            return job_id
+    return None
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically move the oldest QUEUED job of the most urgent kind
+    (CLAIM_ORDER) to RUNNING.
+    The conditional UPDATE is the lock: only one worker (thread, process or node)
+    can flip a given row, so losers simply try the next candidate.
+    Jobs of a batch that is at its concurrency limit are skipped; the UPDATE
+    re-checks the limit so the fan-out stays bounded.
+    """
+    while True:
+        job_id = next_queued_job_id()
+        if job_id is None:
+            return None
+
+        now = timezone.now()
+        claimable = GenerationJob.objects.filter(id=job_id, status=GenerationJob.Status.QUEUED)
+        claimed = claimable.exclude(batch__in=saturated_batches()).update(
+            status=GenerationJob.Status.RUNNING,
+            worker_id=worker_id,
+            claimed_at=now,
+            lease_expires_at=now + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return GenerationJob.objects.get(id=job_id)
+
+
+def renew_lease(job_id, worker_id):
+    """Push a RUNNING job's lease forward; False once the job is no longer this worker's."""
+    return bool(GenerationJob.objects.filter(id=job_id, status=GenerationJob.Status.RUNNING, worker_id=worker_id).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=settings.GENERATION_JOB_LEASE_SECONDS),
+    ))
+
+
+@contextmanager
+def lease_heartbeat(job, worker_id, interval=None):
+    """
+    Renew `job`'s lease every `interval` seconds (default a third of
+    GENERATION_JOB_LEASE_SECONDS) while the block runs, so a long generation
+    is not requeued under a live worker. A worker that dies stops renewing,
+    and its job is recovered once the lease runs out.
+    """
+    interval = interval or settings.GENERATION_JOB_LEASE_SECONDS / 3
+    done = threading.Event()
+
+    def beat():
+        try:
+            while not done.wait(interval):
+                try:
+                    if not serialized_write(renew_lease, job.id, worker_id):
+                        if not done.is_set():  # Not just a job that finished during this renewal
+                            logger.warning(f"Job {job.id} is no longer leased to {worker_id}; stopped renewing")
+                        return
+                except Exception:
+                    logger.warning(f"Failed to renew the lease of job {job.id}", exc_info=True)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"lease-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+
+
+def requeue_expired_jobs():
+    """
+    Recover jobs whose worker died mid-generation (lease expired while RUNNING).
+    They are queued again until GENERATION_JOB_MAX_ATTEMPTS, then marked FAILED.
+    """
+    now = timezone.now()
+    expired = GenerationJob.objects.filter(status=GenerationJob.Status.RUNNING, lease_expires_at__lt=now)
+
+    requeued = expired.filter(attempts__lt=settings.GENERATION_JOB_MAX_ATTEMPTS).update(
+        status=GenerationJob.Status.QUEUED,
+        worker_id=None,
+        lease_expires_at=None,
+        last_error="Lease expired",
+    )
+
+    exhausted_ids = list(expired.values_list('id', flat=True))
+    failed = 0
+    for job_id in exhausted_ids:
+        # Re-check status so a concurrent recovery pass does not fail the same job twice
+        if GenerationJob.objects.filter(id=job_id, status=GenerationJob.Status.RUNNING).update(
+            status=GenerationJob.Status.FAILED,
+            finished_at=now,
+            last_error="Lease expired after max attempts",
+        ):
+            failed += 1
+            project_id = GenerationJob.objects.values_list('project_id', flat=True).get(id=job_id)
+            _mark_project_failed(project_id)
+
+    if requeued or failed:
+        logger.warning(f"Recovered expired generation jobs: {requeued} requeued, {failed} failed")
+    return requeued, failed
+
+
+def _mark_project_failed(project_id):
+    if project_id is None:
+        return
+    try:
+        project = Project.objects.get(id=project_id)
+    except Project.DoesNotExist:
+        return
+    if project.status == Project.Status.GENERATING:
+        project.status = Project.Status.FAILED
+        project.save()
+        publish_project_status(project)
+        observe_generation_finished(project, "failed")
+
+
+def run_job(job):
+    """Execute a claimed job and record its outcome."""
+    from .views import run_background_generation
+
+    if job.kind == GenerationJob.Kind.POOL_REFILL:
+        run_refill_job(job)
+        GenerationJob.objects.filter(id=job.id, status=GenerationJob.Status.RUNNING).update(
+            status=GenerationJob.Status.DONE,
+            finished_at=timezone.now(),
+        )
+        return True
+
+    payload = job.payload
+    run_background_generation(
+        job.project_id,
+        payload.get("category"),
+        payload.get("answers"),
+        profile_data=payload.get("profile_data"),
+        difficulty=payload.get("difficulty"),
+        focus_area=payload.get("focus_area"),
+        language=payload.get("language", "en"),
+    )
+
+    project_status = Project.objects.filter(id=job.project_id).values_list('status', flat=True).first()
+    succeeded = project_status is not None and project_status != Project.Status.FAILED
+    GenerationJob.objects.filter(id=job.id, status=GenerationJob.Status.RUNNING).update(
+        status=GenerationJob.Status.DONE if succeeded else GenerationJob.Status.FAILED,
+        finished_at=timezone.now(),
+        last_error=None if succeeded else f"Project ended as {project_status}",
+    )
+    return succeeded
+
+
+def worker_loop(worker_id, stop_event, poll_interval=None, burst=False):
+    """
+    Claim and run jobs until stop_event is set.
+    With burst=True the loop exits as soon as the queue is empty.
+    """
+    poll_interval = poll_interval if poll_interval is not None else settings.GENERATION_POLL_INTERVAL
+    logger.info(f"Generation worker {worker_id} started")
+
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            requeue_expired_jobs()
+            job = claim_next_job(worker_id)
+        except Exception:
+            logger.error(f"Worker {worker_id} failed to claim a job", exc_info=True)
+            stop_event.wait(poll_interval)
+            continue
+
+        if job is None:
+            if burst:
+                break
+            stop_event.wait(poll_interval)
+            continue
+
+        logger.info(f"Worker {worker_id} claimed {job.kind} job {job.id} (attempt {job.attempts})")
+        try:
+            with lease_heartbeat(job, worker_id):
+                run_job(job)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} crashed on job {job.id}", exc_info=True)
+            GenerationJob.objects.filter(id=job.id).update(
+                status=GenerationJob.Status.FAILED,
+                finished_at=timezone.now(),
+                last_error=str(e),
+            )
+            _mark_project_failed(job.project_id)
+
+    close_old_connections()
+    logger.info(f"Generation worker {worker_id} stopped")
+
+
+def default_worker_prefix():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def start_workers(count, stop_event, poll_interval=None, burst=False, prefix=None):
+    """Start `count` worker threads sharing one stop_event and return them."""
+    prefix = prefix or default_worker_prefix()
+    threads = []
+    for i in range(count):
+        thread = threading.Thread(
+            target=worker_loop,
+            args=(f"{prefix}:{i}", stop_event, poll_interval, burst),
+            name=f"generation-worker-{i}",
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
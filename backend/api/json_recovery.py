@@ -0,0 +1,200 @@
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+# How many cut points to try when closing a truncated response
+MAX_TRUNCATION_CANDIDATES = 50
+
+
+def _ends_string(text, pos):
+    """
+    Whether the quote at `pos` closes its string. LLMs leave quotes inside
+    values unescaped ("said "hi"", 'it's'); a quote that is not followed by
+    ',', ':', '}' or ']' (or the end of the text) is taken as part of the value.
+    """
+    for ch in text[pos + 1:]:
+        if not ch.isspace():
+            return ch in ",:}]"
+    return True
+
+
+def extract_json_object(text):
+    """
+    Return the outermost {...} in `text`, skipping fences and prose around it.
+    If the object never closes, everything from the first '{' is returned.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    depth = 0
+    quote = None
+    escape = False
+    for pos in range(start, len(text)):
+        ch = text[pos]
+        if quote:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote and _ends_string(text, pos):
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return text[start:]
+
+
+def _normalize(text):
+    """
+    Rewrite the common LLM defects into strict JSON: single-quoted strings,
+    unescaped quotes and raw newlines inside strings, Python literals and
+    trailing commas.
+
+    Returns (text, open_brackets, cut_points, cut_in_string). open_brackets is
+    non-empty when the input was truncated; each cut point is (offset, brackets)
+    just before a ',' where the output could be cut and closed.
+    """
+    out = []
+    stack = []
+    cut_points = []
+    quote = None
+    escape = False
+    pos = 0
+
+    while pos < len(text):
+        ch = text[pos]
+
+        if quote:
+            if escape:
+                escape = False
+                # \' is valid in Python-ish output but not in JSON
+                out.append("'" if ch == "'" else "\\" + ch)
+            elif ch == "\\":
+                escape = True
+            elif ch == quote and _ends_string(text, pos):
+                quote = None
+                out.append('"')
+            elif ch == '"':
+                out.append('\\"')  # A double quote inside a single-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\r":
+                out.append("\\r")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            pos += 1
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break  # Ignore anything after the outermost object
+        elif ch == ",":
+            cut_points.append((len(out), tuple(stack)))
+            out.append(ch)
+        elif ch.isalpha():
+            end = pos
+            while end < len(text) and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[pos:end]
+            out.append(_LITERALS.get(word, word))
+            pos = end
+            continue
+        else:
+            out.append(ch)
+        pos += 1
+
+    cut_in_string = quote is not None
+    return "".join(out), stack, cut_points, cut_in_string
+
+
+def _drop_trailing_comma(out):
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index]
+
+
+def _close(text, stack):
+    return text + "".join(_CLOSERS[bracket] for bracket in reversed(stack))
+
+
+def missing_required(value, schema):
+    """Dotted paths of required fields absent from `value` (recursing into objects and arrays)."""
+    if not schema:
+        return []
+    kind = schema.get("type")
+    if kind == "OBJECT":
+        if not isinstance(value, dict):
+            return ["(object)"]
+        missing = [name for name in schema.get("required", []) if name not in value]
+        for name, sub_schema in schema.get("properties", {}).items():
+            if name in value:
+                missing += [f"{name}.{path}" for path in missing_required(value[name], sub_schema)]
+        return missing
+    if kind == "ARRAY" and isinstance(value, list):
+        missing = []
+        for index, item in enumerate(value):
+            missing += [f"{index}.{path}" for path in missing_required(item, schema.get("items"))]
+        return missing
+    return []
+
+
+def recover_json(text, schema=None):
+    """
+    Best-effort parse of a malformed LLM JSON response.
+
+    Extracts the outermost object, repairs common defects and, when the
+    response was cut off, closes the open structures at the latest point
+    where the result still satisfies the schema's required fields. Returns
+    the parsed object, or None when nothing usable can be recovered.
+    """
+    candidate = extract_json_object(text)
+    if candidate is None:
+        return None
+
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        pass
+
+    normalized, stack, cut_points, cut_in_string = _normalize(candidate)
+    if not stack:
+        try:
+            return json.loads(normalized)
+        except json.JSONDecodeError:
+            return None
+
+    # Truncated: close at the end, then at earlier cut points, until the result is complete enough.
+    # A string cut mid-value is not trusted; the member is dropped instead.
+    attempts = [] if cut_in_string else [_close(normalized, stack)]
+    for offset, brackets in reversed(cut_points[-MAX_TRUNCATION_CANDIDATES:]):
+        attempts.append(_close(normalized[:offset], list(brackets)))
+
+    for attempt in attempts:
+        try:
+            value = json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+        if not missing_required(value, schema):
+            return value
+    return None
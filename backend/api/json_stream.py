@@ -0,0 +1,74 @@
+import json
+
+
+class IncrementalObjectParser:
+    """
+    Emit the top-level members of a JSON object as soon as each one is complete.
+
+    Feed it the text chunks of a streamed LLM response; each call to feed()
+    returns the (key, value) pairs that were closed by that chunk. Anything
+    before the first '{' (markdown fences, preamble) is skipped. The parser
+    only tracks nesting and string state, so members are parsed once, when
+    their closing ',' or '}' arrives; a member that does not parse is skipped
+    and left for the final full-response parse.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = None
+        self.done = False
+
+    def feed(self, chunk):
+        members = []
+        if self.done or not chunk:
+            return members
+
+        self._buffer += chunk
+        buffer = self._buffer
+        pos = self._pos
+
+        while pos < len(buffer):
+            ch = buffer[pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = pos + 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._parse_member(buffer[self._member_start:pos]))
+                    self.done = True
+                    pos += 1
+                    break
+            elif ch == "," and self._depth == 1:
+                members.extend(self._parse_member(buffer[self._member_start:pos]))
+                self._member_start = pos + 1
+
+            pos += 1
+
+        self._pos = pos
+        return members
+
+    def _parse_member(self, text):
+        if not text.strip():
+            return []
+        try:
+            return list(json.loads("{" + text + "}").items())
+        except json.JSONDecodeError:
+            return []
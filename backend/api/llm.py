@@ -1,10 +1,20 @@
-import os
 import json
+import asyncio
 import logging
+import threading
 import time
-import google.generativeai as genai
-from google.api_core.exceptions import ResourceExhausted, InternalServerError, ServiceUnavailable
 from django.conf import settings
+from .llm_cache import get_response_cache, make_cache_key
+from .json_stream import IncrementalObjectParser
+from .json_recovery import recover_json
+from .schema_validation import CompiledSchema
+from .prompt_builder import PromptBuilder, compact_json, estimate_tokens, record_call
+from .profile_context import infer_category, profile_category, profile_prompt
+from .metrics import LLM_FALLBACKS, LLM_JSON_REPAIRS, track_llm_call
+from .llm_clients import get_client_registry
+from .rate_limit import current_priority, get_quota_limiter, retry_hint_seconds
+from .hedging import get_hedger
+from .llm_backends import FALLBACK_KINDS, QUOTA, SERVER, TIMEOUT, LLMDeadlineExceeded, build_chain
 
 # Updated Schemas matching new Models (Kept same as before)
 CLIENT_SCHEMA = {
@@ -127,6 +137,25 @@ SKILL_PROFILE_SCHEMA = {
     "required": ["skill_level", "skills", "preferred_tools"]
 }
 
+# Client and project in a single response (LLM_GENERATION_MODE = "combined")
+COMBINED_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "client": CLIENT_SCHEMA,
+        "project": PROJECT_SCHEMA
+    },
+    "required": ["client", "project"]
+}
+
+GENERATION_MODES = ("sequential", "combined")
+
+# Compiled once at import; _call_gemini finds them by schema identity.
+# Follow-up (partial) schemas are not listed, so repairs never recurse.
+SCHEMA_VALIDATORS = {
+    id(schema): CompiledSchema(schema)
+    for schema in (CLIENT_SCHEMA, PROJECT_SCHEMA, SKILL_PROFILE_SCHEMA, COMBINED_SCHEMA)
+}
+
 PROMPTS = {
     "en": {
         "client_system": (
@@ -158,6 +187,24 @@ PROMPTS = {
             "7. Make it challenging but achievable - push them slightly beyond their comfort zone."
         ),
         "project_user": "Client Profile: {client_data}{context}",
+        "combined_system": (
+            "You are an expert at creating realistic, engaging project scenarios for skill development, "
+            "and an expert project manager. In ONE response, INVENT a fictitious client AND write their project brief. "
+            "CRITICAL INSTRUCTIONS:\n"
+            "1. Look at the USER SKILL PROFILE to see what skills the user has (e.g., Python, React, Figma).\n"
+            "2. Under 'client', INVENT a realistic client who would hire someone with those skills, with a SPECIFIC, detailed need.\n"
+            "3. Consider the PROJECT TYPE preference:\n"
+            "   - 'surprise': Be creative, pick something unexpected but achievable.\n"
+            "   - 'practical': A real-world tool they could actually use.\n"
+            "   - 'learning': Focused on teaching a new concept or pattern.\n"
+            "   - 'portfolio': Something impressive they can show off.\n"
+            "   - 'fun': A game, creative project, or something enjoyable.\n"
+            "4. Under 'project', write the brief for THAT client's need, tailored to the USER'S SKILLS.\n"
+            "5. Match the DIFFICULTY LEVEL (Basic=simple features, Advanced=complex architecture) and scope it to the TIME BUDGET.\n"
+            "6. Be SPECIFIC with deliverables (e.g., 'Python Flask API with 3 endpoints', not 'an API') and include concrete acceptance criteria.\n"
+            "7. Make it challenging but achievable - push them slightly beyond their comfort zone."
+        ),
+        "combined_user": "Generate a client and their project brief for this user:{context}",
         "skill_system": (
             "You are an expert career advisor and skill assessor. "
             "Analyze the user's description of their goals, interests, and current abilities. "
@@ -172,7 +219,13 @@ PROMPTS = {
             "4. Leave excluded_tools empty (user will add if needed)\n"
             "5. Be practical and realistic - don't overwhelm beginners with too many skills"
         ),
-        "skill_user": "User's description: {user_input}"
+        "skill_user": "User's description: {user_input}",
+        "repair_user": (
+            "{user_prompt}\n\n"
+            "Your previous answer was:\n{partial}\n\n"
+            "These fields are missing or invalid: {fields}.\n"
+            "Return ONLY a JSON object with those fields, consistent with the rest of your previous answer."
+        )
     },
     "es": {
         "client_system": (
@@ -206,6 +259,25 @@ PROMPTS = {
             "IMPORTANTE: Genera todo el contenido en ESPAÑOL."
         ),
         "project_user": "Perfil del Cliente: {client_data}{context}",
+        "combined_system": (
+            "Eres un experto creando escenarios de proyectos realistas y atractivos para el desarrollo de habilidades, "
+            "y un experto gerente de proyectos. En UNA sola respuesta, INVENTA un cliente ficticio Y escribe el resumen de su proyecto. "
+            "INSTRUCCIONES CRÍTICAS:\n"
+            "1. Mira el PERFIL DE HABILIDADES DEL USUARIO para ver qué habilidades tiene (ej. Python, React, Figma).\n"
+            "2. En 'client', INVENTA un cliente realista que contrataría a alguien con esas habilidades, con una necesidad ESPECÍFICA y detallada.\n"
+            "3. Considera la preferencia de TIPO DE PROYECTO:\n"
+            "   - 'surprise': Sé creativo, elige algo inesperado pero alcanzable.\n"
+            "   - 'practical': Una herramienta del mundo real que realmente puedan usar.\n"
+            "   - 'learning': Enfocado en enseñar un nuevo concepto o patrón.\n"
+            "   - 'portfolio': Algo impresionante que puedan presumir.\n"
+            "   - 'fun': Un juego, proyecto creativo o algo disfrutable.\n"
+            "4. En 'project', escribe el resumen para la necesidad de ESE cliente, adaptado a las HABILIDADES DEL USUARIO.\n"
+            "5. Coincide con el NIVEL DE DIFICULTAD (Básico=características simples, Avanzado=arquitectura compleja) y ajústalo al PRESUPUESTO DE TIEMPO.\n"
+            "6. Sé ESPECÍFICO con los entregables (ej. 'API Python Flask con 3 endpoints', no 'una API') e incluye criterios de aceptación concretos.\n"
+            "7. Hazlo desafiante pero alcanzable - empújalos un poco más allá de su zona de confort.\n"
+            "IMPORTANTE: Genera todo el contenido en ESPAÑOL (excepto las claves 'client' y 'project')."
+        ),
+        "combined_user": "Genera un cliente y el resumen de su proyecto para este usuario:{context}",
         "skill_system": (
             "Eres un experto asesor de carreras y evaluador de habilidades. "
             "Analiza la descripción del usuario sobre sus metas, intereses y habilidades actuales. "
@@ -221,168 +293,651 @@ PROMPTS = {
             "5. Sé práctico y realista - no abrumes a los principiantes con demasiadas habilidades.\n"
             "IMPORTANTE: Genera todo el contenido en ESPAÑOL (excepto los valores de enum como BASIC/INTERMEDIATE/ADVANCED)."
         ),
-        "skill_user": "Descripción del usuario: {user_input}"
+        "skill_user": "Descripción del usuario: {user_input}",
+        "repair_user": (
+            "{user_prompt}\n\n"
+            "Tu respuesta anterior fue:\n{partial}\n\n"
+            "Estos campos faltan o no son válidos: {fields}.\n"
+            "Devuelve SOLO un objeto JSON con esos campos, coherente con el resto de tu respuesta anterior."
+        )
     }
 }
 
 logger = logging.getLogger('api')
 
+# Minified schemas and per-language prompt prefixes, rendered once
+PROMPT_BUILDER = PromptBuilder(PROMPTS, {
+    "client": CLIENT_SCHEMA,
+    "project": PROJECT_SCHEMA,
+    "combined": COMBINED_SCHEMA,
+    "skill_profile": SKILL_PROFILE_SCHEMA,
+})
+
+STUB_SKILL_PROFILE = {
+    "skill_level": "INTERMEDIATE",
+    "skills": ["Python", "JavaScript"],
+    "preferred_tools": ["VSCode"],
+    "excluded_tools": []
+}
+
 class LLMService:
-    def __init__(self):
-        self.api_key = os.environ.get("GEMINI_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel(
-                'gemma-3-27b-it'
-            )
-        else:
-            self.model = None
+    def __init__(self, registry=None, chain=None):
+        # The registry configures the SDK once and shares one model per process
+        self.registry = registry or get_client_registry()
+        # Backends tried in order (LLM_CHAIN); empty when none has credentials
+        self.chain = chain if chain is not None else build_chain(registry=self.registry)
 
     def _get_prompts(self, language="en"):
         # Fallback to English if language not supported
         lang = language if language in PROMPTS else "en"
         return PROMPTS[lang]
 
-    def generate_project(self, category, answers, profile_data=None, difficulty=None, focus_area=None, language="en"):
-        if not self.model:
-            logger.warning("No GEMINI_API_KEY found, using stub.")
-            return self._generate_stub(category, answers, language=language)
-
-        prompts = self._get_prompts(language)
-
+    def _build_project_context(self, answers, profile_data=None, difficulty=None, language="en"):
         # Extract selection-based fields from answers
         time_budget = answers.get("time_budget_hours", 10)
         project_type = answers.get("project_type", "surprise")  # surprise, practical, learning, portfolio, fun
 
-        logger.info(f"Generating {project_type} project for user with difficulty {difficulty} (Lang: {language})...")
-        
         # Prepare Context String
         adaptive_context = f"\nDIFFICULTY LEVEL: {difficulty or 'INTERMEDIATE'}"
         adaptive_context += f"\nTIME BUDGET: {time_budget} hours"
         adaptive_context += f"\nPROJECT TYPE: {project_type}"
         if profile_data:
-            adaptive_context += f"\nUSER SKILL PROFILE:\n{json.dumps(profile_data, indent=2)}"
+            adaptive_context += f"\nUSER SKILL PROFILE:\n{profile_prompt(profile_data)}"
+        return adaptive_context
+
+    def _project_user_prompt(self, prompts, kind, schema, answers, profile_data, difficulty, language, client_data=None):
+        """
+        Render prompts[f"{kind}_user"], trimming the skill profile when the
+        full prompt would exceed LLM_PROMPT_TOKEN_BUDGET.
+        """
+        def render(profile):
+            context = self._build_project_context(answers, profile, difficulty, language)
+            if client_data is None:
+                return prompts[f"{kind}_user"].format(context=context)
+            return prompts[f"{kind}_user"].format(client_data=compact_json(client_data), context=context)
+
+        budget = settings.LLM_PROMPT_TOKEN_BUDGET
+        if not budget:
+            return render(profile_data)
+        _, profile = PROMPT_BUILDER.fit(prompts[f"{kind}_system"], schema, render, profile_data, budget)
+        return render(profile)
+
+    def _target_field_callback(self, on_field, target):
+        if on_field is None:
+            return None
+        return lambda key, value: on_field(target, key, value)
+
+    def _combined_field_callback(self, on_field):
+        # Top-level members of COMBINED_SCHEMA are the whole client/project objects
+        if on_field is None:
+            return None
+        def forward(target, data):
+            if target in ("client", "project") and isinstance(data, dict):
+                for key, value in data.items():
+                    on_field(target, key, value)
+        return forward
+
+    def _resolve_mode(self, mode):
+        mode = mode or settings.LLM_GENERATION_MODE
+        if mode not in GENERATION_MODES:
+            raise ValueError(f"Unknown generation mode '{mode}', expected one of {GENERATION_MODES}")
+        return mode
+
+    def _split_combined(self, combined):
+        """Validate a COMBINED_SCHEMA response and split it into (client_data, project_data)."""
+        client_data = combined.get("client") if isinstance(combined, dict) else None
+        project_data = combined.get("project") if isinstance(combined, dict) else None
+        if not isinstance(client_data, dict) or not isinstance(project_data, dict):
+            raise ValueError("Combined response must contain 'client' and 'project' objects")
+
+        missing = [f"client.{f}" for f in CLIENT_SCHEMA["required"] if f not in client_data]
+        missing += [f"project.{f}" for f in PROJECT_SCHEMA["required"] if f not in project_data]
+        if missing:
+            raise ValueError(f"Combined response is missing required fields: {', '.join(missing)}")
+        return client_data, project_data
+
+    def _finalize_project(self, project_data, answers, profile_data=None):
+        # Inferred from skills when the profile was saved
+        project_data["category"] = profile_category(profile_data)
+        project_data["source_answers"] = answers
+        project_data["status"] = "DRAFT"
+        return project_data
+
+    def generate_project(self, category, answers, profile_data=None, difficulty=None, focus_area=None, language="en", use_cache=None, mode=None, on_field=None):
+        """
+        use_cache: reuse a cached response for identical inputs. Defaults to
+        settings.LLM_CACHE_PROJECTS since users usually want a fresh brief.
+        mode: "sequential" (client call, then project call) or "combined"
+        (one call, merged schema). Defaults to settings.LLM_GENERATION_MODE.
+        on_field: optional callback(target, key, value) with target "client" or
+        "project"; enables streaming so fields can be persisted as they arrive.
+        """
+        if use_cache is None:
+            use_cache = settings.LLM_CACHE_PROJECTS
+        mode = self._resolve_mode(mode)
+
+        if not self.chain:
+            logger.warning("No LLM backend configured (GEMINI_API_KEY / LLM_CHAIN), using stub.")
+            return self._generate_stub(category, answers, language=language)
+
+        prompts = self._get_prompts(language)
+        logger.info(f"Generating {answers.get('project_type', 'surprise')} project for user with difficulty {difficulty} (Lang: {language})...")
+
+        if mode == "combined":
+            combined = self._call_gemini(
+                system_prompt=prompts["combined_system"],
+                user_prompt=self._project_user_prompt(prompts, "combined", COMBINED_SCHEMA, answers, profile_data, difficulty, language),
+                schema=COMBINED_SCHEMA,
+                language=language,
+                use_cache=use_cache,
+                on_field=self._combined_field_callback(on_field)
+            )
+            client_data, project_data = self._split_combined(combined)
+            return client_data, self._finalize_project(project_data, answers, profile_data)
 
         # 1. Generate Client AND Project Topic (AI invents both)
         client_data = self._call_gemini(
             system_prompt=prompts["client_system"],
-            user_prompt=prompts["client_user"].format(context=adaptive_context),
-            schema=CLIENT_SCHEMA
+            user_prompt=self._project_user_prompt(prompts, "client", CLIENT_SCHEMA, answers, profile_data, difficulty, language),
+            schema=CLIENT_SCHEMA,
+            language=language,
+            use_cache=use_cache,
+            on_field=self._target_field_callback(on_field, "client")
         )
 
         # 2. Generate Project Brief based on the invented client
         project_data = self._call_gemini(
             system_prompt=prompts["project_system"],
-            user_prompt=prompts["project_user"].format(client_data=json.dumps(client_data), context=adaptive_context),
-            schema=PROJECT_SCHEMA
+            user_prompt=self._project_user_prompt(
+                prompts, "project", PROJECT_SCHEMA, answers, profile_data, difficulty, language, client_data=client_data
+            ),
+            schema=PROJECT_SCHEMA,
+            language=language,
+            use_cache=use_cache,
+            on_field=self._target_field_callback(on_field, "project")
         )
-        
-        # Infer category from skills
-        inferred_category = self._infer_category("", profile_data)
-        project_data["category"] = inferred_category
-        project_data["source_answers"] = answers
-        project_data["status"] = "DRAFT"
 
-        return client_data, project_data
+        return client_data, self._finalize_project(project_data, answers, profile_data)
 
-    def _infer_category(self, description, profile_data):
-        """Simple category inference based on keywords"""
-        desc_lower = description.lower()
-        skills = profile_data.get("skills", []) if profile_data else []
-        skills_lower = [s.lower() for s in skills]
-        
-        if any(kw in desc_lower for kw in ["python", "cli", "api", "backend", "script"]) or "python" in skills_lower:
-            return "Software Development"
-        elif any(kw in desc_lower for kw in ["react", "frontend", "web", "dashboard", "html"]) or "react" in skills_lower:
-            return "Web Development"
-        elif any(kw in desc_lower for kw in ["logo", "branding", "design", "ui", "ux"]) or any(s in skills_lower for s in ["figma", "photoshop", "illustrator"]):
-            return "Design"
-        elif any(kw in desc_lower for kw in ["write", "blog", "content", "copy"]):
-            return "Writing"
-        else:
-            return "General"
+    async def agenerate_project(self, category, answers, profile_data=None, difficulty=None, focus_area=None, language="en", use_cache=None, mode=None):
+        """Async counterpart of generate_project; awaits the LLM without holding a thread."""
+        if use_cache is None:
+            use_cache = settings.LLM_CACHE_PROJECTS
+        mode = self._resolve_mode(mode)
+
+        if not self.chain:
+            logger.warning("No LLM backend configured (GEMINI_API_KEY / LLM_CHAIN), using stub.")
+            return self._generate_stub(category, answers, language=language)
 
+        prompts = self._get_prompts(language)
+        logger.info(f"Generating {answers.get('project_type', 'surprise')} project for user with difficulty {difficulty} (Lang: {language})...")
+
+        if mode == "combined":
+            combined = await self._acall_gemini(
+                system_prompt=prompts["combined_system"],
+                user_prompt=self._project_user_prompt(prompts, "combined", COMBINED_SCHEMA, answers, profile_data, difficulty, language),
+                schema=COMBINED_SCHEMA,
+                language=language,
+                use_cache=use_cache
+            )
+            client_data, project_data = self._split_combined(combined)
+            return client_data, self._finalize_project(project_data, answers, profile_data)
 
-    def _call_gemini(self, system_prompt, user_prompt, schema, max_retries=3):
+        client_data = await self._acall_gemini(
+            system_prompt=prompts["client_system"],
+            user_prompt=self._project_user_prompt(prompts, "client", CLIENT_SCHEMA, answers, profile_data, difficulty, language),
+            schema=CLIENT_SCHEMA,
+            language=language,
+            use_cache=use_cache
+        )
+
+        project_data = await self._acall_gemini(
+            system_prompt=prompts["project_system"],
+            user_prompt=self._project_user_prompt(
+                prompts, "project", PROJECT_SCHEMA, answers, profile_data, difficulty, language, client_data=client_data
+            ),
+            schema=PROJECT_SCHEMA,
+            language=language,
+            use_cache=use_cache
+        )
+
+        return client_data, self._finalize_project(project_data, answers, profile_data)
+
+    def _infer_category(self, description, profile_data):
+        return infer_category(description, profile_data)
+
+    def _build_prompt(self, system_prompt, user_prompt, schema):
         # Gemma-3-27b-it does NOT support native JSON mode / constrained decoding via API yet (Error 400).
-        # We must prompt for JSON and parse it manually.
-        
-        # Convert schema to string for prompt inclusion
-        schema_json = json.dumps(schema, indent=2)
+        # We must prompt for JSON and parse it manually; the schema is embedded minified.
+        return PROMPT_BUILDER.build(system_prompt, user_prompt, schema)
+
+    def _parse_response(self, text, schema=None):
+        # Cleanup potential markdown code blocks
+        lines = text.splitlines()
+        if lines and lines[0].strip().startswith("```"):
+           lines = lines[1:]
+        if lines and lines[-1].strip().startswith("```"):
+           lines = lines[:-1]
+        text = "\n".join(lines).strip()
         
-        # Enhanced prompt for JSON adherence
-        full_prompt = (
-            f"{system_prompt}\n\n"
-            f"STRICT OUTPUT INSTRUCTION: You must output strictly valid JSON matching the following schema:\n"
-            f"{schema_json}\n\n"
-            f"Do not output markdown formatting like ```json ... ```. Just the raw JSON string.\n\n"
-            f"USER REQUEST:\n{user_prompt}"
+        # Cleanup simpler markdown if splitlines didn't catch it (e.g. inline)
+        if text.startswith("```json"): text = text[7:]
+        elif text.startswith("```"): text = text[3:]
+        if text.endswith("```"): text = text[:-3]
+        text = text.strip()
+
+        logger.debug(f"Gemini response: {text}")
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            # Stray prose, quoting slips or a cut-off tail: repair locally before paying for a retry
+            recovered = recover_json(text, schema)
+            LLM_JSON_REPAIRS.inc(outcome="failed" if recovered is None else "recovered")
+            if recovered is None:
+                raise
+            logger.info("Recovered malformed Gemini JSON without a retry")
+            return recovered
+
+    def _retry_delay(self, error, attempt, max_retries, delay, backend):
+        """
+        Decide how to back off after a failed attempt.
+        Returns (seconds_to_wait, next_delay); re-raises non-retriable errors.
+        """
+        if isinstance(error, json.JSONDecodeError):
+            logger.warning(f"JSON Decode Error (attempt {attempt + 1}/{max_retries}): {error}. Retrying...")
+            return delay, delay
+
+        kind = backend.classify(error)
+        if kind == QUOTA:
+            wait = retry_hint_seconds(error) or delay
+            logger.warning(f"Quota exceeded on {backend.name} (attempt {attempt + 1}/{max_retries}). Waiting {wait}s...")
+            if self._block_exhausted(backend, error, delay):
+                # The next acquire() does the waiting
+                return 0, min(delay * 2, 60)
+            return wait, min(delay * 2, 60)
+
+        if kind in (SERVER, TIMEOUT):
+            logger.warning(f"Service error on {backend.name} ({error}) (attempt {attempt + 1}/{max_retries}). Retrying in {delay}s...")
+            return delay, delay * 2
+
+        logger.error("Gemini generation failed with non-retriable error", exc_info=error)
+        raise error
+
+    def _block_exhausted(self, backend, error, delay):
+        """
+        After a quota error, pause `backend` for every thread and process on
+        the node (retry hint, else `delay` seconds). False when the limiter
+        does not cover the backend.
+        """
+        limiter = get_quota_limiter()
+        if limiter is None or not backend.rate_limited:
+            return False
+        limiter.block(backend.model, retry_hint_seconds(error) or delay)
+        return True
+
+    def _invalid_fields(self, result, schema):
+        """(validator, invalid paths) for a parsed response; no paths when it is valid or unchecked."""
+        validator = SCHEMA_VALIDATORS.get(id(schema))
+        if validator is None or not isinstance(result, dict):
+            return validator, []
+        return validator, validator.invalid_paths(result)
+
+    def _repair_prompt(self, user_prompt, result, paths, language):
+        fields = ", ".join(".".join(path) for path in paths)
+        logger.warning(f"Gemini response has missing or invalid fields ({fields}); requesting only those")
+        return self._get_prompts(language)["repair_user"].format(
+            user_prompt=user_prompt,
+            partial=compact_json(result),
+            fields=fields,
         )
-        
-        # No JSON enforcement in config for Gemma-3
-        generation_config = genai.GenerationConfig()
+
+    def _merge_repair(self, validator, result, patch, paths, on_field=None):
+        merged = validator.merge(result, patch, paths)
+        remaining = validator.invalid_paths(merged)
+        if remaining:
+            logger.warning(f"Fields still invalid after follow-up: {', '.join('.'.join(p) for p in remaining)}")
+        if on_field:
+            for key in {path[0] for path in paths if path[0] in merged}:
+                on_field(key, merged[key])
+        return merged
+
+    def _complete_fields(self, result, system_prompt, user_prompt, schema, language, on_field=None, deadline=None):
+        """
+        Ask for just the fields that failed validation and merge them in,
+        instead of regenerating the whole response. Falls back to the
+        partial result if the follow-up fails.
+        """
+        validator, paths = self._invalid_fields(result, schema)
+        if not paths:
+            return result
+        try:
+            patch = self._call_gemini(
+                system_prompt,
+                self._repair_prompt(user_prompt, result, paths, language),
+                validator.subschema(paths),
+                max_retries=2,
+                language=language,
+                use_cache=False,
+                deadline=deadline
+            )
+        except Exception:
+            logger.warning("Follow-up for missing fields failed; keeping partial response", exc_info=True)
+            return result
+        return self._merge_repair(validator, result, patch, paths, on_field)
+
+    async def _acomplete_fields(self, result, system_prompt, user_prompt, schema, language, deadline=None):
+        """Async counterpart of _complete_fields."""
+        validator, paths = self._invalid_fields(result, schema)
+        if not paths:
+            return result
+        try:
+            patch = await self._acall_gemini(
+                system_prompt,
+                self._repair_prompt(user_prompt, result, paths, language),
+                validator.subschema(paths),
+                max_retries=2,
+                language=language,
+                use_cache=False,
+                deadline=deadline
+            )
+        except Exception:
+            logger.warning("Follow-up for missing fields failed; keeping partial response", exc_info=True)
+            return result
+        return self._merge_repair(validator, result, patch, paths)
+
+    def _cache_lookup(self, full_prompt, schema, language, use_cache):
+        """
+        Return (cache, model, cached_value); cache is None when caching is off
+        for this call. Responses are stored under the model that produced
+        them, so the links of the chain are tried in order.
+        """
+        cache = get_response_cache() if use_cache else None
+        if cache is None:
+            return None, None, None
+        keys = {make_cache_key(backend.model, full_prompt, schema, language): backend.model for backend in self.chain}
+        key, cached = cache.get_first(list(keys))
+        if cached is None:
+            return cache, None, None
+        logger.info(f"LLM cache hit ({keys[key]}, {key[:12]})")
+        return cache, keys[key], cached
+
+    def _cache_store(self, cache, backend, full_prompt, schema, language, result):
+        if cache is not None:
+            cache.set(make_cache_key(backend.model, full_prompt, schema, language), result)
+
+    def _estimate_tokens(self, full_prompt):
+        # Prompt estimate plus the expected response size
+        return estimate_tokens(full_prompt) + settings.LLM_RATE_LIMIT_OUTPUT_TOKENS
+
+    def _usage_tokens(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", None) or None
+
+    def _link_timeout(self, backend, deadline):
+        """Timeout for the next request: the link's own timeout, capped by what is left of the deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMDeadlineExceeded(f"No LLM response within {settings.LLM_CHAIN_DEADLINE:.0f}s")
+        return min(backend.timeout, remaining) if backend.timeout else remaining
+
+    def _fall_back(self, link, reason):
+        """Log the switch to the next link of the chain and return its index."""
+        backend, fallback = self.chain[link], self.chain[link + 1]
+        logger.warning(f"LLM {backend.name} unavailable ({reason}); falling back to {fallback.name}")
+        LLM_FALLBACKS.inc(model=backend.model, reason=reason)
+        return link + 1
+
+    def _admit(self, limiter, backend, estimate, can_fall_back, deadline):
+        """
+        Reserve quota for one request. With a fallback available an exhausted
+        quota returns False at once instead of waiting for it to refill.
+        """
+        if limiter is None or not backend.rate_limited:
+            return True
+        if can_fall_back:
+            return limiter.try_acquire(backend.model, estimate, current_priority()) <= 0
+        limiter.acquire(backend.model, estimate, max_wait=deadline - time.monotonic())
+        return True
+
+    async def _aadmit(self, limiter, backend, estimate, can_fall_back, deadline):
+        if limiter is None or not backend.rate_limited:
+            return True
+        if can_fall_back:
+            return await limiter.atry_acquire(backend.model, estimate, current_priority()) <= 0
+        await limiter.aacquire(backend.model, estimate, max_wait=deadline - time.monotonic())
+        return True
+
+    def _request(self, backend, full_prompt, schema, timeout, on_field=None):
+        """
+        One request to one backend inside its concurrency slot. With on_field
+        the response is streamed and on_field(key, value) is called as each
+        top-level member of the JSON object completes.
+        """
+        on_text = None
+        if on_field:
+            parser = IncrementalObjectParser()
+
+            def on_text(text):
+                for key, value in parser.feed(text):
+                    on_field(key, value)
+
+        with self.registry.slot(backend.model):
+            return backend.generate(full_prompt, schema, timeout=timeout, on_text=on_text)
+
+    async def _arequest(self, backend, full_prompt, schema, timeout):
+        async with self.registry.aslot(backend.model):
+            return await backend.agenerate(full_prompt, schema, timeout=timeout)
+
+    def _settle(self, limiter, backend, estimate, response):
+        """Correct the quota estimate with the real usage; a failed request (response None) refunds all of it."""
+        if limiter is not None and backend.rate_limited:
+            limiter.settle(backend.model, estimate, 0 if response is None else self._usage_tokens(response))
+
+    async def _asettle(self, limiter, backend, estimate, response):
+        if limiter is not None and backend.rate_limited:
+            await limiter.asettle(backend.model, estimate, 0 if response is None else self._usage_tokens(response))
+
+    def _observe(self, backend, full_prompt, schema, started, response):
+        """Record a finished request and parse it."""
+        elapsed = time.monotonic() - started
+        schema_name = PROMPT_BUILDER.schema_name(schema)
+        record_call(
+            backend.model, schema_name, full_prompt, elapsed,
+            usage=response.usage_metadata, response_chars=len(response.text)
+        )
+        result = self._parse_response(response.text, schema)
+        hedger = get_hedger()
+        if hedger is not None:
+            hedger.observe((backend.model, schema_name), elapsed)
+        return result
+
+    def _send(self, backend, full_prompt, schema, timeout, limiter, estimate, on_field=None):
+        started = time.monotonic()
+        try:
+            response = self._request(backend, full_prompt, schema, timeout, on_field)
+        except Exception:
+            self._settle(limiter, backend, estimate, None)
+            raise
+        self._settle(limiter, backend, estimate, response)
+        return self._observe(backend, full_prompt, schema, started, response)
+
+    async def _asend(self, backend, full_prompt, schema, timeout, limiter, estimate):
+        started = time.monotonic()
+        try:
+            response = await self._arequest(backend, full_prompt, schema, timeout)
+        except Exception:
+            await self._asettle(limiter, backend, estimate, None)
+            raise
+        await self._asettle(limiter, backend, estimate, response)
+        return self._observe(backend, full_prompt, schema, started, response)
+
+    def _admit_hedge(self, limiter, backend, estimate):
+        if limiter is None or not backend.rate_limited:
+            return True
+        return limiter.try_acquire(backend.model, estimate, current_priority()) <= 0
+
+    def _hedged_send(self, backend, full_prompt, schema, timeout, limiter, estimate, on_field=None):
+        """
+        _send, raced against an identical request once it runs longer than
+        usual (LLM_HEDGING_ENABLED). Only the first request streams; if the
+        duplicate wins, its fields are reported when it returns.
+        """
+        hedger = get_hedger()
+        if hedger is None:
+            return self._send(backend, full_prompt, schema, timeout, limiter, estimate, on_field)
+        started = time.monotonic()
+
+        def attempt(index, race):
+            remaining = max(0.1, timeout - (time.monotonic() - started))
+            forward = (race.gate(0, on_field) if race else on_field) if index == 0 else None
+            return self._send(backend, full_prompt, schema, remaining, limiter, estimate, forward)
+
+        result, winner = hedger.call(
+            (backend.model, PROMPT_BUILDER.schema_name(schema)), attempt,
+            lambda: self._admit_hedge(limiter, backend, estimate)
+        )
+        if winner and on_field and isinstance(result, dict):
+            for key, value in result.items():
+                on_field(key, value)
+        return result
+
+    async def _ahedged_send(self, backend, full_prompt, schema, timeout, limiter, estimate):
+        hedger = get_hedger()
+        if hedger is None:
+            return await self._asend(backend, full_prompt, schema, timeout, limiter, estimate)
+        started = time.monotonic()
+
+        def attempt(index, race):
+            remaining = max(0.1, timeout - (time.monotonic() - started))
+            return self._asend(backend, full_prompt, schema, remaining, limiter, estimate)
+
+        result, _ = await hedger.acall(
+            (backend.model, PROMPT_BUILDER.schema_name(schema)), attempt,
+            lambda: self._admit_hedge(limiter, backend, estimate)
+        )
+        return result
+
+    def _call_gemini(self, system_prompt, user_prompt, schema, max_retries=3, language="en", use_cache=True, on_field=None, deadline=None):
+        """
+        Walk the LLM chain until one backend returns a usable response.
+        Quota exhaustion or a timeout moves on to the next link at once; other
+        failures are retried with backoff. Everything, follow-ups included,
+        ends by `deadline` (time.monotonic(); default now + LLM_CHAIN_DEADLINE).
+
+        on_field: optional callback(key, value); when given the response is
+        streamed and each top-level field is reported as soon as it is complete.
+        """
+        full_prompt = self._build_prompt(system_prompt, user_prompt, schema)
+        schema_name = PROMPT_BUILDER.schema_name(schema)
+
+        cache, cached_model, cached = self._cache_lookup(full_prompt, schema, language, use_cache)
+        if cached is not None:
+            record_call(cached_model, schema_name, full_prompt, 0.0, cached=True)
+            if on_field:
+                for key, value in cached.items():
+                    on_field(key, value)
+            return cached
 
         delay = 5  # Initial delay
-        
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(
-                    full_prompt,
-                    generation_config=generation_config
-                )
-                text = response.text
-                
-                # Cleanup potential markdown code blocks
-                lines = text.splitlines()
-                if lines and lines[0].strip().startswith("```"):
-                   lines = lines[1:]
-                if lines and lines[-1].strip().startswith("```"):
-                   lines = lines[:-1]
-                text = "\n".join(lines).strip()
-                
-                # Cleanup simpler markdown if splitlines didn't catch it (e.g. inline)
-                if text.startswith("```json"): text = text[7:]
-                elif text.startswith("```"): text = text[3:]
-                if text.endswith("```"): text = text[:-3]
-                text = text.strip()
-
-                logger.debug(f"Gemini response: {text}")
-                return json.loads(text)
-                
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON Decode Error (attempt {attempt + 1}/{max_retries}): {e}. Retrying...")
-                # Could add a "fix it" prompt here, but for now simple retry or fail
-                time.sleep(delay)
-                
-            except ResourceExhausted as e:
-                logger.warning(f"Quota exceeded (attempt {attempt + 1}/{max_retries}). Waiting {delay}s...")
-                time.sleep(delay)
-                delay *= 2
-                if delay > 60: delay = 60
-                
-            except (InternalServerError, ServiceUnavailable) as e:
-                 logger.warning(f"Service error ({e}) (attempt {attempt + 1}/{max_retries}). Retrying in {delay}s...")
-                 time.sleep(delay)
-                 delay *= 2
-
-            except Exception as e:
-                logger.error("Gemini generation failed with non-retriable error", exc_info=True)
-                raise
-        
+        limiter = get_quota_limiter()
+        estimate = self._estimate_tokens(full_prompt)
+        deadline = deadline or time.monotonic() + settings.LLM_CHAIN_DEADLINE
+        link = 0
+        attempt = 0
+
+        with track_llm_call(self.chain[0].model, schema_name) as call:
+            while attempt < max_retries:
+                backend = self.chain[link]
+                can_fall_back = link + 1 < len(self.chain)
+                try:
+                    timeout = self._link_timeout(backend, deadline)
+                    if not self._admit(limiter, backend, estimate, can_fall_back, deadline):
+                        link = self._fall_back(link, "local_quota")
+                        continue
+                    call.attempt()
+                    result = self._hedged_send(backend, full_prompt, schema, timeout, limiter, estimate, on_field)
+                    result = self._complete_fields(result, system_prompt, user_prompt, schema, language, on_field, deadline)
+                    self._cache_store(cache, backend, full_prompt, schema, language, result)
+                    call.success()
+                    return result
+                except LLMDeadlineExceeded as e:
+                    call.error(e)
+                    raise
+                except Exception as e:
+                    call.error(e)
+                    kind = backend.classify(e)
+                    if can_fall_back and kind in FALLBACK_KINDS:
+                        if kind == QUOTA:
+                            # Keep other callers off the exhausted model, not just this one
+                            self._block_exhausted(backend, e, delay)
+                        link = self._fall_back(link, kind)
+                        continue
+                    wait, delay = self._retry_delay(e, attempt, max_retries, delay, backend)
+                    attempt += 1
+                    time.sleep(max(0.0, min(wait, deadline - time.monotonic())))
+
         raise Exception("Max retries exceeded for Gemini generation")
 
-    def generate_skill_profile(self, user_input, language="en"):
+    async def _acall_gemini(self, system_prompt, user_prompt, schema, max_retries=3, language="en", use_cache=True, deadline=None):
+        """Async counterpart of _call_gemini: same chain and retry policy, asyncio.sleep backoff."""
+        full_prompt = self._build_prompt(system_prompt, user_prompt, schema)
+        schema_name = PROMPT_BUILDER.schema_name(schema)
+
+        # The cache reads and writes a SQLite file; keep both off the event loop
+        cache, cached_model, cached = await asyncio.to_thread(self._cache_lookup, full_prompt, schema, language, use_cache)
+        if cached is not None:
+            record_call(cached_model, schema_name, full_prompt, 0.0, cached=True)
+            return cached
+
+        delay = 5  # Initial delay
+        limiter = get_quota_limiter()
+        estimate = self._estimate_tokens(full_prompt)
+        deadline = deadline or time.monotonic() + settings.LLM_CHAIN_DEADLINE
+        link = 0
+        attempt = 0
+
+        with track_llm_call(self.chain[0].model, schema_name) as call:
+            while attempt < max_retries:
+                backend = self.chain[link]
+                can_fall_back = link + 1 < len(self.chain)
+                try:
+                    timeout = self._link_timeout(backend, deadline)
+                    if not await self._aadmit(limiter, backend, estimate, can_fall_back, deadline):
+                        link = self._fall_back(link, "local_quota")
+                        continue
+                    call.attempt()
+                    result = await self._ahedged_send(backend, full_prompt, schema, timeout, limiter, estimate)
+                    result = await self._acomplete_fields(result, system_prompt, user_prompt, schema, language, deadline)
+                    if cache is not None:
+                        await asyncio.to_thread(self._cache_store, cache, backend, full_prompt, schema, language, result)
+                    call.success()
+                    return result
+                except LLMDeadlineExceeded as e:
+                    call.error(e)
+                    raise
+                except Exception as e:
+                    call.error(e)
+                    kind = backend.classify(e)
+                    if can_fall_back and kind in FALLBACK_KINDS:
+                        if kind == QUOTA:
+                            # Keep other callers off the exhausted model, not just this one
+                            await asyncio.to_thread(self._block_exhausted, backend, e, delay)
+                        link = self._fall_back(link, kind)
+                        continue
+                    # Off the event loop: a quota error blocks the model in the limiter's SQLite file
+                    wait, delay = await asyncio.to_thread(self._retry_delay, e, attempt, max_retries, delay, backend)
+                    attempt += 1
+                    await asyncio.sleep(max(0.0, min(wait, deadline - time.monotonic())))
+
+        raise Exception("Max retries exceeded for Gemini generation")
+
+    def generate_skill_profile(self, user_input, language="en", use_cache=True):
         """
         Analyze user's goals/interests and generate skill profile suggestions.
         """
-        if not self.model:
-            logger.warning("No GEMINI_API_KEY found, using stub.")
-            return {
-                "skill_level": "INTERMEDIATE",
-                "skills": ["Python", "JavaScript"],
-                "preferred_tools": ["VSCode"],
-                "excluded_tools": []
-            }
+        if not self.chain:
+            logger.warning("No LLM backend configured (GEMINI_API_KEY / LLM_CHAIN), using stub.")
+            return dict(STUB_SKILL_PROFILE)
         
         prompts = self._get_prompts(language)
 
@@ -391,11 +946,31 @@ class LLMService:
         result = self._call_gemini(
             system_prompt=prompts["skill_system"],
             user_prompt=prompts["skill_user"].format(user_input=user_input),
-            schema=SKILL_PROFILE_SCHEMA
+            schema=SKILL_PROFILE_SCHEMA,
+            language=language,
+            use_cache=use_cache
         )
 
         return result
 
+    async def agenerate_skill_profile(self, user_input, language="en", use_cache=True):
+        """Async counterpart of generate_skill_profile."""
+        if not self.chain:
+            logger.warning("No LLM backend configured (GEMINI_API_KEY / LLM_CHAIN), using stub.")
+            return dict(STUB_SKILL_PROFILE)
+
+        prompts = self._get_prompts(language)
+
+        logger.info(f"Generating skill profile from user input: {user_input[:100]}... (Lang: {language})")
+
+        return await self._acall_gemini(
+            system_prompt=prompts["skill_system"],
+            user_prompt=prompts["skill_user"].format(user_input=user_input),
+            schema=SKILL_PROFILE_SCHEMA,
+            language=language,
+            use_cache=use_cache
+        )
+
     def _generate_stub(self, category, answers, language="en"):
         if language == "es":
             client_data = {
@@ -436,3 +1011,17 @@ class LLMService:
                 "status": "DRAFT"
             }
         return client_data, project_data
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_llm_service():
+    """Shared LLMService; it holds no per-request state, so one per process is enough."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = LLMService()
+    return _service
@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+from types import SimpleNamespace
+import google.generativeai as genai
+from google.api_core.exceptions import DeadlineExceeded, InternalServerError, ResourceExhausted, ServiceUnavailable
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .llm_clients import get_client_registry
+
+logger = logging.getLogger('api')
+
+# How a backend classifies a failed request
+QUOTA = "quota"
+TIMEOUT = "timeout"
+SERVER = "server"
+
+# Failures that move a call to the next link of the chain instead of retrying the same model
+FALLBACK_KINDS = (QUOTA, TIMEOUT)
+
+
+class LLMDeadlineExceeded(Exception):
+    """The call used up LLM_CHAIN_DEADLINE across retries and fallbacks."""
+
+
+class LLMResponse:
+    """Raw text plus token usage in the Gemini usage_metadata shape."""
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class LLMBackend:
+    """
+    One model at one provider. generate()/agenerate() send a prompt that asks
+    for JSON matching `schema` and return the raw LLMResponse; parsing,
+    repair and validation stay in LLMService so every backend shares them.
+    """
+
+    provider = None
+    # Whether requests draw from the node-wide QuotaLimiter (see rate_limit.py)
+    rate_limited = False
+
+    def __init__(self, model, timeout=None):
+        self.model = model
+        self.timeout = timeout
+
+    @property
+    def name(self):
+        return f"{self.provider}:{self.model}"
+
+    @property
+    def available(self):
+        return True
+
+    def classify(self, error):
+        """QUOTA, TIMEOUT, SERVER, or None for errors retrying will not fix."""
+        if isinstance(error, TimeoutError):
+            return TIMEOUT
+        return None
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        """on_text: optional callback receiving the response text chunk by chunk as it streams."""
+        raise NotImplementedError
+
+    async def agenerate(self, prompt, schema, timeout=None):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """google.generativeai model shared through the client registry (a fake model when LLM_BACKEND=fake)."""
+
+    provider = "gemini"
+    rate_limited = True
+
+    def __init__(self, model, timeout=None, registry=None):
+        super().__init__(model, timeout)
+        if settings.LLM_BACKEND == "fake":
+            # Fake calls spend no real quota; keep them off the production buckets unless asked to
+            self.rate_limited = settings.LLM_FAKE_RATE_LIMITED
+        self._client = (registry or get_client_registry()).model(model)
+        # No JSON enforcement in config for Gemma-3
+        self._config = genai.GenerationConfig()
+
+    @property
+    def available(self):
+        return self._client is not None
+
+    def classify(self, error):
+        if isinstance(error, ResourceExhausted):
+            return QUOTA
+        if isinstance(error, DeadlineExceeded):
+            return TIMEOUT
+        if isinstance(error, (InternalServerError, ServiceUnavailable)):
+            return SERVER
+        return super().classify(error)
+
+    def _request_options(self, timeout):
+        return {"timeout": timeout} if timeout else None
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        if on_text is None:
+            response = self._client.generate_content(
+                prompt, generation_config=self._config, request_options=self._request_options(timeout)
+            )
+            return LLMResponse(response.text, getattr(response, "usage_metadata", None))
+
+        response = self._client.generate_content(
+            prompt, generation_config=self._config, stream=True, request_options=self._request_options(timeout)
+        )
+        parts = []
+        for chunk in response:
+            parts.append(chunk.text)
+            on_text(chunk.text)
+        return LLMResponse("".join(parts), getattr(response, "usage_metadata", None))
+
+    async def agenerate(self, prompt, schema, timeout=None):
+        request = self._client.generate_content_async(
+            prompt, generation_config=self._config, request_options=self._request_options(timeout)
+        )
+        response = await asyncio.wait_for(request, timeout) if timeout else await request
+        return LLMResponse(response.text, getattr(response, "usage_metadata", None))
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """Chat-completions model behind any OpenAI-compatible endpoint (OpenAI, vLLM, Ollama, ...)."""
+
+    provider = "openai"
+
+    def __init__(self, model, timeout=None, api_key=None, base_url=None):
+        super().__init__(model, timeout)
+        self.api_key = api_key
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    @property
+    def available(self):
+        return bool(self.api_key)
+
+    def _client(self, kind):
+        # One client per process and kind; each keeps its own HTTP connection pool
+        client = self._clients.get(kind)
+        if client is None:
+            import openai
+            with self._lock:
+                client = self._clients.get(kind)
+                if client is None:
+                    factory = openai.AsyncOpenAI if kind == "async" else openai.OpenAI
+                    # Retries and fallbacks are LLMService's job
+                    client = factory(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+                    self._clients[kind] = client
+        return client
+
+    def classify(self, error):
+        import openai
+        if isinstance(error, openai.RateLimitError):
+            return QUOTA
+        if isinstance(error, openai.APITimeoutError):
+            return TIMEOUT
+        if isinstance(error, (openai.InternalServerError, openai.APIConnectionError)):
+            return SERVER
+        return super().classify(error)
+
+    def _params(self, prompt, timeout):
+        params = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "response_format": {"type": "json_object"},
+        }
+        if timeout:
+            params["timeout"] = timeout
+        return params
+
+    def _usage(self, usage):
+        if usage is None:
+            return None
+        return SimpleNamespace(
+            prompt_token_count=usage.prompt_tokens,
+            candidates_token_count=usage.completion_tokens,
+            total_token_count=usage.total_tokens,
+        )
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        client = self._client("sync")
+        if on_text is None:
+            completion = client.chat.completions.create(**self._params(prompt, timeout))
+            return LLMResponse(completion.choices[0].message.content or "", self._usage(completion.usage))
+
+        parts = []
+        usage = None
+        for chunk in client.chat.completions.create(stream=True, **self._params(prompt, timeout)):
+            usage = getattr(chunk, "usage", None) or usage
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                on_text(text)
+        return LLMResponse("".join(parts), self._usage(usage))
+
+    async def agenerate(self, prompt, schema, timeout=None):
+        completion = await self._client("async").chat.completions.create(**self._params(prompt, timeout))
+        return LLMResponse(completion.choices[0].message.content or "", self._usage(completion.usage))
+
+
+class StubBackend(LLMBackend):
+    """Instant, schema-shaped placeholder content for development and load tests; never built in production."""
+
+    provider = "stub"
+
+    def _text(self, schema):
+        from .fake_llm import sample_value
+        return json.dumps(sample_value(schema, "value", random.Random()), ensure_ascii=False)
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        text = self._text(schema)
+        if on_text is not None:
+            on_text(text)
+        return LLMResponse(text)
+
+    async def agenerate(self, prompt, schema, timeout=None):
+        return LLMResponse(self._text(schema))
+
+
+def parse_chain(spec):
+    """'gemini:gemma-3-27b-it@20,openai:gpt-4o-mini,stub' -> [(provider, model, timeout or None)]."""
+    links = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        link, _, timeout = item.partition("@")
+        provider, _, model = link.partition(":")
+        try:
+            links.append((provider.strip(), model.strip(), float(timeout) if timeout else None))
+        except ValueError:
+            raise ImproperlyConfigured(f"Invalid timeout in LLM_CHAIN item {item!r}")
+    return links
+
+
+def build_backend(provider, model, timeout=None, registry=None):
+    if settings.LLM_BACKEND == "fake" and provider != "stub":
+        # Offline load tests: every provider is served by the registry's fake model
+        provider = "gemini"
+    if provider == "gemini":
+        return GeminiBackend(model, timeout, registry=registry)
+    if provider == "openai":
+        return OpenAICompatibleBackend(model, timeout, api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
+    if provider == "stub":
+        if not (settings.DEBUG or settings.LLM_BACKEND == "fake"):
+            # Its placeholders would be saved as ordinary DRAFT projects
+            raise ImproperlyConfigured("The stub LLM backend is only allowed with DEBUG or LLM_BACKEND=fake")
+        return StubBackend(model or "stub", timeout)
+    raise ImproperlyConfigured(f"Unknown LLM provider {provider!r} in LLM_CHAIN")
+
+
+def build_chain(spec=None, registry=None):
+    """Backends of LLM_CHAIN in order, leaving out the ones without credentials."""
+    chain = []
+    for provider, model, timeout in parse_chain(spec if spec is not None else settings.LLM_CHAIN):
+        backend = build_backend(provider, model, timeout, registry=registry)
+        if backend.available:
+            chain.append(backend)
+        else:
+            logger.info(f"LLM backend {backend.name} has no credentials; left out of the chain")
+    return chain
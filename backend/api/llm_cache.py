@@ -0,0 +1,213 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+
+def make_cache_key(model_name, prompt, schema, language):
+    """Fingerprint of everything that determines an LLM response."""
+    material = json.dumps(
+        [model_name, prompt, schema, language],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of parsed LLM JSON responses.
+
+    Tier 1 is an in-process LRU with a TTL; tier 2 is a SQLite file shared by
+    every process on the node, evicted least-recently-used once it grows past
+    max_bytes. The size check sums the whole table, so each process runs it at
+    most once per `prune_interval` seconds of writes; the file can overshoot
+    max_bytes by what is written in between. Values are stored as JSON text so
+    callers always get a fresh copy.
+    """
+
+    def __init__(self, path, max_entries=256, ttl=3600, disk_ttl=7 * 24 * 3600, max_bytes=50 * 1024 * 1024,
+                 prune_interval=60):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+
+        self._memory = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+        self._init_db()
+
+    # -- SQLite tier -------------------------------------------------------
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._connection().execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+    def _disk_get(self, key, now):
+        conn = self._connection()
+        row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if now - created_at > self.disk_ttl:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return value
+
+    def _disk_set(self, key, text, now):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, text, len(text.encode("utf-8")), now, now),
+        )
+        with self._lock:
+            due = now >= self._next_prune
+            if due:
+                self._next_prune = now + self.prune_interval
+        if due:
+            self._evict_disk(conn)
+
+    def _evict_disk(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at").fetchall():
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+            if total <= self.max_bytes:
+                break
+        with self._lock:
+            self._stats["evictions"] += evicted
+
+    # -- Public API --------------------------------------------------------
+
+    def get(self, key):
+        return self.get_first([key])[1]
+
+    def get_first(self, keys):
+        """(key, value) for the first of `keys` that is cached, else (None, None); counts one miss at most."""
+        now = time.time()
+        for key in keys:
+            text = self._lookup(key, now)
+            if text is not None:
+                return key, json.loads(text)
+        with self._lock:
+            self._stats["misses"] += 1
+        return None, None
+
+    def _lookup(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return text
+                del self._memory[key]
+
+        try:
+            text = self._disk_get(key, now)
+        except sqlite3.Error:
+            logger.warning("LLM cache disk read failed", exc_info=True)
+            return None
+
+        if text is not None:
+            with self._lock:
+                self._stats["disk_hits"] += 1
+                self._remember(key, text, now)
+        return text
+
+    def set(self, key, value):
+        now = time.time()
+        text = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._stats["sets"] += 1
+            self._remember(key, text, now)
+        try:
+            self._disk_set(key, text, now)
+        except sqlite3.Error:
+            logger.warning("LLM cache disk write failed", exc_info=True)
+
+    def _remember(self, key, text, now):
+        # Caller holds self._lock
+        self._memory[key] = (now + self.ttl, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        self._connection().execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        try:
+            count, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        except sqlite3.Error:
+            count, size = None, None
+        stats["disk_entries"] = count
+        stats["disk_bytes"] = size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache instance, or None when LLM_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMResponseCache(
+                    settings.LLM_CACHE_PATH,
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl=settings.LLM_CACHE_TTL,
+                    disk_ttl=settings.LLM_CACHE_DISK_TTL,
+                    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+                    prune_interval=settings.LLM_CACHE_PRUNE_INTERVAL,
+                )
+    return _cache
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+
+class LLMClientRegistry:
+    """
+    Process-wide owner of the Gemini SDK state.
+
+    genai.configure() swaps the SDK's global client manager, so calling it per
+    request throws away the pooled gRPC channels and races between threads.
+    The registry configures once, hands out one GenerativeModel per model name
+    (each keeps its transport after the first call) and caps concurrent calls
+    per model with a semaphore. With backend="fake" it hands out offline
+    FakeGenerativeModel instances instead (see api/fake_llm.py).
+    """
+
+    def __init__(self, api_key=None, default_limit=0, limits=None, backend="gemini"):
+        self.api_key = api_key
+        self.backend = backend
+        self.default_limit = default_limit
+        self.limits = dict(limits or {})
+
+        self._lock = threading.Lock()
+        self._configured = False
+        self._models = {}
+        self._semaphores = {}
+        self._async_waiters = {}  # model -> {(loop, asyncio.Event)} of coroutines waiting in aslot()
+        self._in_flight = {}
+
+    def _configure(self):
+        # Caller holds self._lock
+        if not self._configured:
+            genai.configure(api_key=self.api_key)
+            self._configured = True
+            logger.info("Gemini SDK configured")
+
+    def model(self, name):
+        """Shared GenerativeModel for `name`, or None when no API key is set."""
+        if not self.api_key and self.backend != "fake":
+            return None
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    if self.backend == "fake":
+                        from .fake_llm import FakeGenerativeModel
+                        model = FakeGenerativeModel.from_settings(name)
+                    else:
+                        self._configure()
+                        model = genai.GenerativeModel(name)
+                    self._models[name] = model
+        return model
+
+    def _semaphore(self, name):
+        limit = self.limits.get(name, self.default_limit)
+        if limit <= 0:
+            return None
+        with self._lock:
+            semaphore = self._semaphores.get(name)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(limit)
+                self._semaphores[name] = semaphore
+        return semaphore
+
+    def _track(self, name, delta):
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + delta
+
+    def _release(self, name, semaphore):
+        semaphore.release()
+        # Wake coroutines waiting for this model; each retries, and all but one wait again
+        with self._lock:
+            waiters = list(self._async_waiters.get(name, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # That loop has closed
+
+    @contextmanager
+    def slot(self, name):
+        """Hold one of the model's concurrency slots for the duration of a call."""
+        semaphore = self._semaphore(name)
+        if semaphore is not None:
+            semaphore.acquire()
+        self._track(name, 1)
+        try:
+            yield
+        finally:
+            self._track(name, -1)
+            if semaphore is not None:
+                self._release(name, semaphore)
+
+    @asynccontextmanager
+    async def aslot(self, name):
+        """Async slot sharing the same per-model limit as worker threads; waits on the loop, woken by releases."""
+        semaphore = self._semaphore(name)
+        if semaphore is not None:
+            while not semaphore.acquire(blocking=False):
+                waiter = (asyncio.get_running_loop(), asyncio.Event())
+                with self._lock:
+                    self._async_waiters.setdefault(name, set()).add(waiter)
+                try:
+                    # A release between the failed acquire and registering would not have woken us
+                    if semaphore.acquire(blocking=False):
+                        break
+                    await waiter[1].wait()
+                finally:
+                    with self._lock:
+                        self._async_waiters[name].discard(waiter)
+        self._track(name, 1)
+        try:
+            yield
+        finally:
+            self._track(name, -1)
+            if semaphore is not None:
+                self._release(name, semaphore)
+
+    def in_flight(self):
+        with self._lock:
+            return dict(self._in_flight)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """Registry for this process, built from GEMINI_API_KEY, LLM_BACKEND and LLM_MODEL_CONCURRENCY*."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry(
+                    api_key=os.environ.get("GEMINI_API_KEY"),
+                    default_limit=settings.LLM_MODEL_CONCURRENCY,
+                    limits=settings.LLM_MODEL_CONCURRENCY_OVERRIDES,
+                    backend=settings.LLM_BACKEND,
+                )
+    return _registry
@@ -0,0 +1,139 @@
+import random
+import statistics
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client as HttpClient
+from rest_framework.authtoken.models import Token
+from api.fake_llm import sample_value
+from api.models import Client, Project
+from .loadtest_generation import percentile
+
+BENCHMARK_USERNAME = "dbbench"
+
+TEXT_LIST = {"type": "ARRAY", "items": {"type": "STRING"}}
+PROJECT_TYPES = ("practical", "portfolio", "learning", "client_work")
+CATEGORIES = ("Web Development", "Data Science", "Design", "Marketing")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time project list, retrieve and concurrent generation against the configured database. "
+        "Run once with DB_ENGINE=sqlite and once with DB_ENGINE=postgres to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projects", type=int, default=1000, help="Projects to seed for the read workloads")
+        parser.add_argument("--requests", type=int, default=400, help="Requests per read workload")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent readers")
+        parser.add_argument("--generation-rate", type=float, default=4.0, help="Generations per second (0 skips the workload)")
+        parser.add_argument("--generation-duration", type=float, default=15, help="Seconds of generation load")
+        parser.add_argument("--workers", type=int, default=settings.GENERATION_WORKERS, help="Generation worker threads")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded projects afterwards")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(username=BENCHMARK_USERNAME)
+        token, _ = Token.objects.get_or_create(user=user)
+        database = settings.DATABASES["default"]
+        self.stdout.write(
+            f"Database: {connection.vendor} ({database['NAME']}), CONN_MAX_AGE={database.get('CONN_MAX_AGE', 0)}, "
+            f"pool={'pool' in database.get('OPTIONS', {})}"
+        )
+
+        project_ids = self.seed(user, options["projects"])
+        try:
+            rows = [
+                self.run_reads("list", token.key, options, lambda rng: "/api/projects/"),
+                self.run_reads("list ?status=DRAFT", token.key, options, lambda rng: "/api/projects/?status=DRAFT"),
+                self.run_reads("retrieve", token.key, options, lambda rng: f"/api/projects/{rng.choice(project_ids)}/"),
+            ]
+            self.print_table(rows)
+        finally:
+            if not options["keep"]:
+                deleted, _ = Client.objects.filter(projects__owner=user).delete()
+                self.stdout.write(f"Removed {deleted} seeded row(s)")
+
+        if options["generation_rate"] > 0:
+            if settings.LLM_BACKEND != "fake":
+                self.stdout.write("Skipping concurrent generation: set LLM_BACKEND=fake")
+            else:
+                self.stdout.write("Concurrent generation:")
+                call_command(
+                    "loadtest_generation",
+                    rate=options["generation_rate"],
+                    duration=options["generation_duration"],
+                    workers=options["workers"],
+                    poll_interval=1.0,
+                    stdout=self.stdout,
+                )
+
+    def seed(self, user, count):
+        rng = random.Random(0)
+        clients = [
+            Client(name=f"Benchmark client {i}", preferences=sample_value(TEXT_LIST, "preference", rng),
+                   constraints=sample_value(TEXT_LIST, "constraint", rng))
+            for i in range(count)
+        ]
+        Client.objects.bulk_create(clients, batch_size=500)
+        projects = [
+            Project(
+                owner=user, client=client, title=f"Benchmark project {i}", category=rng.choice(CATEGORIES),
+                objective=sample_value({"type": "STRING"}, "objective", rng),
+                status=rng.choice((Project.Status.DRAFT, Project.Status.IN_PROGRESS, Project.Status.DELIVERED)),
+                deliverables=sample_value(TEXT_LIST, "deliverable", rng),
+                scope_included=sample_value(TEXT_LIST, "scope", rng),
+                source_answers={"project_type": rng.choice(PROJECT_TYPES), "time_budget_hours": rng.randint(2, 40)},
+            )
+            for i, client in enumerate(clients)
+        ]
+        Project.objects.bulk_create(projects, batch_size=500)
+        self.stdout.write(f"Seeded {count} project(s)")
+        return [str(project.id) for project in projects]
+
+    def run_concurrently(self, options, task):
+        """Spread options["requests"] calls of task(rng) over options["concurrency"] threads; return latencies."""
+        latencies = []
+        lock = threading.Lock()
+        per_thread = max(1, options["requests"] // options["concurrency"])
+
+        def reader(index):
+            rng = random.Random(index)
+            mine = []
+            try:
+                for _ in range(per_thread):
+                    started = time.monotonic()
+                    task(rng)
+                    mine.append(time.monotonic() - started)
+            finally:
+                connections.close_all()
+            with lock:
+                latencies.extend(mine)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(options["concurrency"])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, time.monotonic() - started
+
+    def run_reads(self, name, token, options, path):
+        def request(rng):
+            http = HttpClient(HTTP_HOST=settings.ALLOWED_HOSTS[0], headers={"Authorization": f"Token {token}"})
+            response = http.get(path(rng))
+            if response.status_code != 200:
+                raise RuntimeError(f"{name}: HTTP {response.status_code}")
+
+        return (name, *self.run_concurrently(options, request))
+
+    def print_table(self, rows):
+        self.stdout.write(f"{'workload':<22}{'n':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'mean ms':>9}{'req/s':>9}")
+        for name, latencies, wall in rows:
+            self.stdout.write(
+                f"{name:<22}{len(latencies):>6}{percentile(latencies, 50) * 1000:>9.1f}{percentile(latencies, 95) * 1000:>9.1f}"
+                f"{percentile(latencies, 99) * 1000:>9.1f}{statistics.mean(latencies) * 1000:>9.1f}{len(latencies) / wall:>9.1f}"
+            )
@@ -0,0 +1,74 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from api.llm import get_llm_service, CLIENT_SCHEMA, PROJECT_SCHEMA, COMBINED_SCHEMA
+from api.prompt_builder import collect_call_stats, estimate_tokens
+
+SAMPLE_PROFILE = {
+    "skills": ["Python", "Django", "React"],
+    "skill_level": "INTERMEDIATE",
+    "preferred_tools": ["VSCode", "PostgreSQL"],
+    "excluded_tools": []
+}
+
+
+class Command(BaseCommand):
+    help = "Compare prompt size and latency of the sequential and combined generation modes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Live generations per mode (needs GEMINI_API_KEY)")
+        parser.add_argument("--language", default="en")
+        parser.add_argument("--difficulty", default="INTERMEDIATE")
+        parser.add_argument("--time-budget", type=int, default=10)
+        parser.add_argument("--project-type", default="practical")
+
+    def handle(self, *args, **options):
+        service = get_llm_service()
+        language = options["language"]
+        answers = {"time_budget_hours": options["time_budget"], "project_type": options["project_type"]}
+        difficulty = options["difficulty"]
+        prompts = service._get_prompts(language)
+
+        def build(kind, schema, client_data=None):
+            user_prompt = service._project_user_prompt(
+                prompts, kind, schema, answers, SAMPLE_PROFILE, difficulty, language, client_data=client_data
+            )
+            return service._build_prompt(prompts[f"{kind}_system"], user_prompt, schema)
+
+        # The project prompt embeds the generated client; use a stub client offline
+        sample_client, _ = service._generate_stub("General", answers, language=language)
+        sequential_prompts = [
+            build("client", CLIENT_SCHEMA),
+            build("project", PROJECT_SCHEMA, client_data=sample_client),
+        ]
+        combined_prompts = [build("combined", COMBINED_SCHEMA)]
+
+        self.stdout.write("Prompt size per generation (tokens estimated at ~4 chars/token):")
+        for mode, mode_prompts in (("sequential", sequential_prompts), ("combined", combined_prompts)):
+            chars = sum(len(p) for p in mode_prompts)
+            tokens = sum(estimate_tokens(p) for p in mode_prompts)
+            self.stdout.write(f"  {mode:<10} calls={len(mode_prompts)}  prompt_chars={chars:>6}  ~tokens={tokens:>5}")
+
+        if not service.chain:
+            self.stdout.write("No LLM backend configured; skipping latency comparison.")
+            return
+
+        self.stdout.write(f"Latency over {options['runs']} live run(s) per mode:")
+        for mode in ("sequential", "combined"):
+            timings = []
+            with collect_call_stats() as calls:
+                for _ in range(options["runs"]):
+                    started = time.monotonic()
+                    service.generate_project(
+                        "General", answers, profile_data=SAMPLE_PROFILE, difficulty=difficulty,
+                        language=language, use_cache=False, mode=mode,
+                    )
+                    timings.append(time.monotonic() - started)
+            # Token counts as reported by the API, summed over the calls of one generation
+            prompt_tokens = sum(c["prompt_tokens"] or 0 for c in calls) / options["runs"]
+            output_tokens = sum(c["output_tokens"] or 0 for c in calls) / options["runs"]
+            self.stdout.write(
+                f"  {mode:<10} median={statistics.median(timings):6.1f}s  "
+                f"min={min(timings):6.1f}s  max={max(timings):6.1f}s  "
+                f"prompt_tokens={prompt_tokens:.0f}  output_tokens={output_tokens:.0f}"
+            )
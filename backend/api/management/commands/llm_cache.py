@@ -0,0 +1,27 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from api.llm_cache import get_response_cache
+
+
+class Command(BaseCommand):
+    help = "Show the size of the node-wide LLM response cache, or clear it"
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["stats", "clear"])
+
+    def handle(self, *args, **options):
+        cache = get_response_cache()
+        if cache is None:
+            raise CommandError("LLM cache is disabled (set LLM_CACHE_ENABLED=1)")
+
+        if options["action"] == "clear":
+            cache.clear()
+            self.stdout.write("LLM cache cleared")
+        else:
+            # Hit/miss counters live in each serving process; this one has made no lookups
+            stats = cache.stats()
+            self.stdout.write(json.dumps({"disk_entries": stats["disk_entries"], "disk_bytes": stats["disk_bytes"]}, indent=2))
+            self.stdout.write(
+                "Hit/miss counts: llm_response_cache_lookups_total and llm_response_cache_hit_ratio "
+                "on /api/metrics and the worker exporter (GENERATION_METRICS_PORT)"
+            )
@@ -0,0 +1,197 @@
+import logging
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client as HttpClient
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from api.jobs import start_workers
+from api.models import Client, Project
+
+LOADTEST_USERNAME = "loadtest"
+
+SAMPLE_ANSWERS = {"time_budget_hours": 10, "project_type": "practical"}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and "locked" in str(exc).lower()
+
+
+class LockErrorCounter(logging.Handler):
+    """Counts logged "database is locked" errors (worker threads log and carry on)."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        exc = record.exc_info[1] if record.exc_info else None
+        if is_lock_error(exc) or "database is locked" in record.getMessage():
+            self.count += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive POST /api/projects/generate plus the frontend's 3s polling at a target rate "
+        "and report throughput and time-to-DRAFT (use with LLM_BACKEND=fake)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rate", type=float, default=1.0, help="New generations per second")
+        parser.add_argument("--duration", type=float, default=60, help="Seconds to keep submitting")
+        parser.add_argument("--poll-interval", type=float, default=3.0, help="Seconds between status polls (frontend: 3)")
+        parser.add_argument("--timeout", type=float, default=300, help="Give up on a project after this many seconds")
+        parser.add_argument("--workers", type=int, default=settings.GENERATION_WORKERS,
+                            help="In-process generation worker threads (0 = use running run_generation_workers)")
+        parser.add_argument("--max-sessions", type=int, default=500, help="Cap on concurrent simulated users")
+        parser.add_argument("--keep", action="store_true", help="Keep the generated projects afterwards")
+        parser.add_argument("--allow-live", action="store_true", help="Run even though LLM_BACKEND is not 'fake'")
+
+    def handle(self, *args, **options):
+        if settings.LLM_BACKEND != "fake" and not options["allow_live"]:
+            raise CommandError("LLM_BACKEND is not 'fake'; this would spend real quota. Pass --allow-live to do it anyway.")
+
+        user, _ = get_user_model().objects.get_or_create(username=LOADTEST_USERNAME)
+        token, _ = Token.objects.get_or_create(user=user)
+        started_at = timezone.now()
+
+        lock_errors = LockErrorCounter()
+        for name in ("api", "django.request"):
+            logging.getLogger(name).addHandler(lock_errors)
+
+        stop_workers = threading.Event()
+        worker_threads = []
+        if options["workers"] > 0:
+            worker_threads = start_workers(options["workers"], stop_workers, poll_interval=0.2, prefix="loadtest")
+
+        results = []
+        results_lock = threading.Lock()
+        peak = {"threads": threading.active_count()}
+        sampling = threading.Event()
+
+        def sample_threads():
+            while not sampling.wait(0.5):
+                peak["threads"] = max(peak["threads"], threading.active_count())
+
+        sampler = threading.Thread(target=sample_threads, name="loadtest-sampler", daemon=True)
+        sampler.start()
+
+        def session():
+            outcome = self.run_session(token.key, options)
+            with results_lock:
+                results.append(outcome)
+
+        total = int(options["rate"] * options["duration"])
+        self.stdout.write(
+            f"Submitting {total} generation(s) at {options['rate']}/s "
+            f"(backend={settings.LLM_BACKEND}, workers={options['workers'] or 'external'})"
+        )
+        wall_start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["max_sessions"], thread_name_prefix="loadtest-user") as pool:
+            for index in range(total):
+                # Open loop: arrivals follow the schedule whether or not earlier users are done
+                delay = wall_start + index / options["rate"] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(session)
+        wall = time.monotonic() - wall_start
+
+        sampling.set()
+        stop_workers.set()
+        for thread in worker_threads:
+            thread.join(timeout=30)
+        for name in ("api", "django.request"):
+            logging.getLogger(name).removeHandler(lock_errors)
+
+        self.report(results, wall, peak["threads"], lock_errors.count)
+
+        if not options["keep"]:
+            # Deleting the clients cascades to their projects and jobs
+            projects = Project.objects.filter(owner=user, created_at__gte=started_at)
+            deleted, _ = Client.objects.filter(projects__in=projects).delete()
+            self.stdout.write(f"Removed {deleted} load-test row(s)")
+
+    def run_session(self, token, options):
+        """One simulated user: submit, then poll the detail endpoint until it leaves GENERATING."""
+        http = HttpClient(HTTP_HOST=settings.ALLOWED_HOSTS[0], headers={"Authorization": f"Token {token}"})
+        outcome = {"status": None, "seconds": None, "polls": 0, "poll_seconds": [], "lock_errors": 0, "errors": 0}
+        submitted = time.monotonic()
+        try:
+            response = http.post(
+                "/api/projects/generate/",
+                {"category": "General", "answers": SAMPLE_ANSWERS},
+                content_type="application/json",
+            )
+            if response.status_code != 201:
+                outcome["status"] = f"HTTP {response.status_code}"
+                return outcome
+            project = response.json()
+            etag = None
+            deadline = submitted + options["timeout"]
+            while project["status"] == Project.Status.GENERATING and time.monotonic() < deadline:
+                time.sleep(options["poll_interval"])
+                headers = {"If-None-Match": etag} if etag else {}
+                poll_start = time.monotonic()
+                response = http.get(f"/api/projects/{project['id']}/", headers=headers)
+                outcome["poll_seconds"].append(time.monotonic() - poll_start)
+                outcome["polls"] += 1
+                if response.status_code == 200:
+                    project = response.json()
+                    etag = response.get("ETag")
+                elif response.status_code != 304:
+                    outcome["errors"] += 1
+            outcome["status"] = project["status"]
+            if project["status"] != Project.Status.GENERATING:
+                outcome["seconds"] = time.monotonic() - submitted
+        except Exception as exc:
+            outcome["status"] = type(exc).__name__
+            outcome["lock_errors"] += is_lock_error(exc)
+        finally:
+            connections.close_all()  # Per-thread connections; pool threads would otherwise hold them
+        return outcome
+
+    def report(self, results, wall, peak_threads, logged_lock_errors):
+        by_status = {}
+        for outcome in results:
+            by_status[outcome["status"]] = by_status.get(outcome["status"], 0) + 1
+        drafted = [o["seconds"] for o in results if o["status"] == Project.Status.DRAFT]
+        finished = [o for o in results if o["seconds"] is not None]
+
+        self.stdout.write(f"Sessions: {len(results)} in {wall:.1f}s  outcomes={by_status}")
+        self.stdout.write(f"Throughput: {len(drafted) / wall:.2f} DRAFT/s")
+        if drafted:
+            self.stdout.write(
+                f"Time to DRAFT: p50={percentile(drafted, 50):.1f}s  p95={percentile(drafted, 95):.1f}s  "
+                f"p99={percentile(drafted, 99):.1f}s  mean={statistics.mean(drafted):.1f}s  max={max(drafted):.1f}s"
+            )
+        polls = sum(o["polls"] for o in results)
+        self.stdout.write(f"Polls: {polls} ({polls / len(finished):.1f} per finished project)" if finished else f"Polls: {polls}")
+        poll_seconds = [s for o in results for s in o["poll_seconds"]]
+        if poll_seconds:
+            self.stdout.write(
+                f"Poll latency: p50={percentile(poll_seconds, 50) * 1000:.0f}ms  "
+                f"p99={percentile(poll_seconds, 99) * 1000:.0f}ms  max={max(poll_seconds) * 1000:.0f}ms"
+            )
+        # ru_maxrss is KiB on Linux
+        self.stdout.write(
+            f"High-water marks: threads={peak_threads}  "
+            f"max RSS={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB"
+        )
+        self.stdout.write(
+            f"SQLite lock errors: {sum(o['lock_errors'] for o in results)} in requests, "
+            f"{logged_lock_errors} logged by workers/views; poll errors: {sum(o['errors'] for o in results)}"
+        )
+
@@ -0,0 +1,52 @@
+import signal
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.jobs import start_workers
+from api.metrics import start_metrics_server
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers that drain the project generation job queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=settings.GENERATION_WORKERS,
+            help="Number of concurrent worker threads (default: GENERATION_WORKERS)",
+        )
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.GENERATION_POLL_INTERVAL,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+        parser.add_argument(
+            "--burst", action="store_true",
+            help="Exit once the queue is empty instead of polling forever",
+        )
+        parser.add_argument(
+            "--metrics-port", type=int, default=settings.GENERATION_METRICS_PORT,
+            help="Serve Prometheus metrics on this port (default: GENERATION_METRICS_PORT, 0 = off)",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        stop_event = threading.Event()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Shutting down after in-flight jobs finish...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+
+        if options["metrics_port"]:
+            start_metrics_server(options["metrics_port"])
+
+        self.stdout.write(f"Starting {workers} generation worker(s)")
+        threads = start_workers(workers, stop_event, options["poll_interval"], burst=options["burst"])
+
+        # Join with a timeout so the main thread keeps receiving signals
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1.0)
+
+        self.stdout.write("All generation workers stopped")
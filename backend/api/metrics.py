@@ -0,0 +1,340 @@
+import bisect
+import hmac
+import ipaddress
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger('api')
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300)
+SIZE_BUCKETS = (250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+ATTEMPT_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each observation is one bisect plus a few additions under a lock."""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)  # first bucket with upper bound >= value
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = self.header()
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(upper))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def add_collector(self, collector):
+        """collector() -> iterable of (name, type, help, [(labels dict, value)]) sampled at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                samples = list(collector())
+            except Exception:
+                logger.warning("Metrics collector failed", exc_info=True)
+                continue
+            for name, kind, documentation, values in samples:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# -- LLM calls -----------------------------------------------------------
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Latency of one LLM request (a single attempt).", ("model", "schema"),
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "Latency of _call_gemini including retries, quota waits and follow-ups.",
+    ("model", "schema", "outcome"),
+)
+LLM_CALL_ATTEMPTS = Histogram(
+    "llm_call_attempts", "Attempts needed per _call_gemini.", ("model", "schema", "outcome"), buckets=ATTEMPT_BUCKETS,
+)
+LLM_ERRORS = Counter("llm_errors_total", "Failed LLM attempts by exception class.", ("model", "exception"))
+LLM_PROMPT_CHARS = Histogram("llm_prompt_chars", "Prompt size in characters.", ("model", "schema"), buckets=SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = Histogram("llm_response_chars", "Response size in characters.", ("model", "schema"), buckets=SIZE_BUCKETS)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the API.", ("model", "kind"))
+LLM_JSON_REPAIRS = Counter("llm_json_repairs_total", "Malformed JSON responses by local repair outcome.", ("outcome",))
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Calls moved to the next link of the LLM chain.", ("model", "reason"))
+HEDGE_REQUESTS = Counter(
+    "llm_hedge_requests_total", "Hedged requests: issued, won/lost against the first request, or skipped.", ("model", "outcome"),
+)
+HEDGE_SAVED_SECONDS = Counter(
+    "llm_hedge_saved_seconds_total", "How much later the first request finished when its hedge won.", ("model",),
+)
+LLM_CACHE_SERVED = Counter("llm_response_cache_served_total", "LLM calls answered from the response cache.", ("schema",))
+
+# -- Project generation --------------------------------------------------
+
+GENERATION_SECONDS = Histogram(
+    "project_generation_seconds", "Time from placeholder creation to DRAFT/FAILED.", ("outcome",),
+)
+GENERATIONS_IN_FLIGHT = Gauge("project_generations_in_flight", "Project generations currently running in this process.")
+
+
+class LLMCallMetrics:
+    """Per-_call_gemini tracker: attempts, errors and total latency."""
+
+    def __init__(self, model, schema):
+        self.model = model
+        self.schema = schema
+        self.attempts = 0
+        self.succeeded = False
+        self._started = time.monotonic()
+
+    def attempt(self):
+        self.attempts += 1
+
+    def error(self, exc):
+        LLM_ERRORS.inc(model=self.model, exception=type(exc).__name__)
+
+    def success(self):
+        self.succeeded = True
+
+    def finish(self):
+        outcome = "ok" if self.succeeded else "error"
+        LLM_CALL_SECONDS.observe(time.monotonic() - self._started, model=self.model, schema=self.schema, outcome=outcome)
+        LLM_CALL_ATTEMPTS.observe(self.attempts, model=self.model, schema=self.schema, outcome=outcome)
+
+
+@contextmanager
+def track_llm_call(model, schema):
+    call = LLMCallMetrics(model, schema)
+    try:
+        yield call
+    finally:
+        call.finish()
+
+
+def observe_llm_request(model, schema, elapsed, prompt_chars, response_chars=None, usage=None):
+    LLM_REQUEST_SECONDS.observe(elapsed, model=model, schema=schema)
+    LLM_PROMPT_CHARS.observe(prompt_chars, model=model, schema=schema)
+    if response_chars is not None:
+        LLM_RESPONSE_CHARS.observe(response_chars, model=model, schema=schema)
+    for kind, attribute in (("prompt", "prompt_token_count"), ("output", "candidates_token_count")):
+        count = getattr(usage, attribute, None)
+        if count:
+            LLM_TOKENS.inc(count, model=model, kind=kind)
+
+
+def observe_generation_finished(project, outcome):
+    """Record GENERATING -> DRAFT/FAILED time for a project that just left GENERATING."""
+    from django.utils import timezone
+    if project.created_at is not None:
+        GENERATION_SECONDS.observe((timezone.now() - project.created_at).total_seconds(), outcome=outcome)
+
+
+# -- Sampled at scrape time ----------------------------------------------
+
+def _queue_samples():
+    from django.db.models import Count
+    from .models import GenerationJob, PooledProject
+    active = (GenerationJob.Status.QUEUED, GenerationJob.Status.RUNNING)
+    counts = {(kind, job_status): 0 for kind in GenerationJob.Kind.values for job_status in active}
+    rows = GenerationJob.objects.filter(status__in=active).values("kind", "status").annotate(n=Count("id"))
+    for row in rows:
+        counts[(row["kind"], row["status"])] = row["n"]
+    yield (
+        "generation_jobs", "gauge", "Generation jobs by kind and status (queue depth).",
+        [({"kind": kind, "status": job_status}, n) for (kind, job_status), n in sorted(counts.items())],
+    )
+    yield "project_pool_entries", "gauge", "Pre-generated projects waiting in the warm pool.", [({}, PooledProject.objects.count())]
+
+
+def _llm_samples():
+    from .llm_cache import get_response_cache
+    from .llm_clients import get_client_registry
+    yield (
+        "llm_requests_in_flight", "gauge", "LLM requests holding a concurrency slot in this process.",
+        [({"model": model}, n) for model, n in sorted(get_client_registry().in_flight().items())],
+    )
+    cache = get_response_cache()
+    if cache is not None:
+        stats = cache.stats()
+        yield "llm_response_cache_hit_ratio", "gauge", "Response cache hit ratio since process start.", [({}, stats["hit_rate"])]
+        yield (
+            "llm_response_cache_lookups_total", "counter", "Response cache lookups in this process by result.",
+            [({"result": result}, stats[key]) for result, key in
+             (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))],
+        )
+        if stats["disk_entries"] is not None:
+            yield "llm_response_cache_entries", "gauge", "Responses stored in the on-disk cache.", [({}, stats["disk_entries"])]
+
+
+REGISTRY.add_collector(_queue_samples)
+REGISTRY.add_collector(_llm_samples)
+
+
+# -- Access -------------------------------------------------------------
+
+def scrape_allowed(authorization, remote_addr):
+    """
+    Whether a scrape may read the registry. With METRICS_TOKEN set it must
+    send `Authorization: Bearer <token>`; without one, only loopback clients
+    are served, so an unconfigured deployment does not publish its metrics.
+    """
+    from django.conf import settings
+    token = settings.METRICS_TOKEN
+    if token:
+        return hmac.compare_digest((authorization or "").encode(), f"Bearer {token}".encode())
+    try:
+        return ipaddress.ip_address(remote_addr or "").is_loopback
+    except ValueError:
+        return False
+
+
+# -- Worker process exporter --------------------------------------------
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        from django.db import connections
+        if not scrape_allowed(self.headers.get("Authorization"), self.client_address[0]):
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        try:
+            body = REGISTRY.render().encode("utf-8")
+        finally:
+            connections.close_all()  # Each request runs on a fresh thread with its own connection
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, addr="0.0.0.0"):
+    """Serve REGISTRY on http://addr:port/ from a daemon thread (for processes without a web server)."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    logger.info(f"Metrics exporter listening on {addr}:{port}")
+    return server
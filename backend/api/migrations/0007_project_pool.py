@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectPoolBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('language', models.CharField(max_length=10)),
+                ('difficulty', models.CharField(max_length=20)),
+                ('project_type', models.CharField(max_length=50)),
+                ('time_band', models.CharField(max_length=20)),
+                ('category', models.CharField(max_length=100)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='kind',
+            field=models.CharField(choices=[('GENERATE', 'Generate project'), ('POOL_REFILL', 'Refill project pool')], default='GENERATE', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='generationjob',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='generation_jobs', to='api.project'),
+        ),
+        migrations.CreateModel(
+            name='PooledProject',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('client_data', models.JSONField(default=dict)),
+                ('project_data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bucket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='api.projectpoolbucket')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='pool_bucket',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='refill_jobs', to='api.projectpoolbucket'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_updated_at_validators'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', '-created_at'], name='api_project_owner_cr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', 'status', '-created_at'], name='api_project_owner_st_cr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', 'category', '-created_at'], name='api_project_owner_cat_cr_idx'),
+        ),
+    ]
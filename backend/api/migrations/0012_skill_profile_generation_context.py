@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:31
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+# Frozen copy of api.profile_context.build_profile_context as of this
+# migration, so later changes to the live builder cannot change what it writes
+PROFILE_FIELDS = ("skills", "skill_level", "preferred_tools", "excluded_tools")
+
+
+def infer_category(skills):
+    skills_lower = [s.lower() for s in skills or []]
+    if "python" in skills_lower:
+        return "Software Development"
+    if "react" in skills_lower:
+        return "Web Development"
+    if any(s in skills_lower for s in ["figma", "photoshop", "illustrator"]):
+        return "Design"
+    return "General"
+
+
+def build_profile_context(profile):
+    fields = {field: getattr(profile, field) for field in PROFILE_FIELDS}
+    prompt = json.dumps(fields, separators=(",", ":"), ensure_ascii=False)
+    category = infer_category(fields["skills"])
+    return {
+        "prompt": prompt,
+        "category": category,
+        "bucket": f"{fields['skill_level']}|{category}",
+        "hash": hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32],
+    }
+
+
+def backfill_generation_context(apps, schema_editor):
+    UserSkillProfile = apps.get_model('api', 'UserSkillProfile')
+    profiles = list(UserSkillProfile.objects.all())
+    for profile in profiles:
+        profile.generation_context = build_profile_context(profile)
+    UserSkillProfile.objects.bulk_update(profiles, ['generation_context'], batch_size=500)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_generation_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userskillprofile',
+            name='generation_context',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_generation_context, migrations.RunPython.noop),
+    ]
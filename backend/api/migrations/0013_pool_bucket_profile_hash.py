@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_skill_profile_generation_context'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectpoolbucket',
+            name='profile_hash',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+    ]
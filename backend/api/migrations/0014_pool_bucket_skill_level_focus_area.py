@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_pool_bucket_profile_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='projectpoolbucket',
+            name='profile_hash',
+        ),
+        migrations.AddField(
+            model_name='projectpoolbucket',
+            name='focus_area',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='projectpoolbucket',
+            name='skill_level',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
+from .profile_context import PROFILE_FIELDS, build_profile_context
 
 class Client(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -20,6 +21,7 @@ class Client(models.Model):
     constraints = models.JSONField(default=list)
     success_definition = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Validator for conditional GETs
 
     def __str__(self):
         return self.name
@@ -63,6 +65,7 @@ class Project(models.Model):
     
     # Timestamps & Status
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Validator for conditional GETs
     user_defined_deadline = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.DRAFT, db_index=True)
     approval_log = models.JSONField(default=list)  # Log of approval events
@@ -72,10 +75,113 @@ class Project(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'updated_at'], name='api_project_owner_upd_idx'),
+            # Landing page list and its ?status= / ?category= filters, newest first
+            models.Index(fields=['owner', '-created_at'], name='api_project_owner_cr_idx'),
+            models.Index(fields=['owner', 'status', '-created_at'], name='api_project_owner_st_cr_idx'),
+            models.Index(fields=['owner', 'category', '-created_at'], name='api_project_owner_cat_cr_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+class ProjectPoolBucket(models.Model):
+    """
+    One slot of the pre-generated project inventory, e.g.
+    es|BASIC|fun|short|BEGINNER|Design|<focus area>: the request's language,
+    difficulty, project type and time band, the profile's coarse skill level
+    and category, and the normalized focus area.
+    Hit/miss counters make the pool's effectiveness observable.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    language = models.CharField(max_length=10)
+    difficulty = models.CharField(max_length=20)
+    project_type = models.CharField(max_length=50)
+    time_band = models.CharField(max_length=20)
+    skill_level = models.CharField(max_length=20, blank=True, default='')
+    category = models.CharField(max_length=100)
+    focus_area = models.CharField(max_length=100, blank=True, default='')
+    hits = models.PositiveIntegerField(default=0)
+    misses = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+class PooledProject(models.Model):
+    """A ready-made client+project pair waiting to be claimed by /api/projects/generate."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    bucket = models.ForeignKey(ProjectPoolBucket, on_delete=models.CASCADE, related_name='entries')
+    client_data = models.JSONField(default=dict)
+    project_data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+class GenerationBatch(models.Model):
+    """A set of projects requested together through /api/projects/generate_batch."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='generation_batches')
+    size = models.PositiveIntegerField()
+    max_concurrency = models.PositiveIntegerField()  # RUNNING jobs allowed at once for this batch
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Batch {self.id} ({self.size} projects)"
+
+class GenerationJob(models.Model):
+    """Durable queue entry for a project generation, drained by run_generation_workers."""
+    class Kind(models.TextChoices):
+        GENERATE = 'GENERATE', 'Generate project'
+        POOL_REFILL = 'POOL_REFILL', 'Refill project pool'
+
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=Kind.choices, default=Kind.GENERATE)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='generation_jobs', null=True, blank=True)
+    pool_bucket = models.ForeignKey(ProjectPoolBucket, on_delete=models.CASCADE, related_name='refill_jobs', null=True, blank=True)
+    batch = models.ForeignKey(GenerationBatch, on_delete=models.SET_NULL, related_name='jobs', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    payload = models.JSONField(default=dict)  # Arguments for run_background_generation
+    attempts = models.PositiveIntegerField(default=0)
+    worker_id = models.CharField(max_length=255, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='api_job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
+
+class ProjectEvent(models.Model):
+    """Status transition published through api.broker.DatabaseBroker (cross-process delivery)."""
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_events')
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='api_event_user_id_idx'),
+        ]
+
 class UserSkillProfile(models.Model):
     class SkillLevel(models.TextChoices):
         BASIC = 'BASIC', 'Basic'
@@ -88,10 +194,19 @@ class UserSkillProfile(models.Model):
     skill_level = models.CharField(max_length=20, choices=SkillLevel.choices)
     preferred_tools = models.JSONField(default=list)
     excluded_tools = models.JSONField(default=list)
+    # Prompt fragment, category, bucket key and hash; rebuilt on every save
+    generation_context = models.JSONField(default=dict, editable=False)
 
     def __str__(self):
         return f"{self.user.username}'s Profile ({self.skill_level})"
 
+    def save(self, *args, **kwargs):
+        self.generation_context = build_profile_context({field: getattr(self, field) for field in PROFILE_FIELDS})
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'generation_context'}
+        super().save(*args, **kwargs)
+
 class LearningOption(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     project_category = models.CharField(max_length=100, db_index=True)
@@ -102,3 +217,14 @@ class LearningOption(models.Model):
 
     def __str__(self):
         return f"{self.suggested_tool_or_skill} ({self.project_category})"
+
+# Fields the LLM fills in and that may be written while a generation streams in.
+# Ids, FKs and workflow fields (status, category, answers, approvals) stay server-owned.
+LLM_CLIENT_FIELDS = tuple(
+    f.name for f in Client._meta.concrete_fields
+    if f.name not in {'id', 'created_at', 'updated_at'}
+)
+LLM_PROJECT_FIELDS = tuple(
+    f.name for f in Project._meta.concrete_fields
+    if f.name not in {'id', 'owner', 'client', 'created_at', 'updated_at', 'user_defined_deadline', 'status', 'category', 'source_answers', 'approval_log'}
+)
@@ -0,0 +1,14 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class ProjectCursorPagination(CursorPagination):
+    """
+    Newest-first keyset pagination over an owner's projects.
+    Each page is a range scan on the (owner, -created_at) index instead of an
+    OFFSET, so later pages cost the same as the first.
+    """
+    ordering = '-created_at'
+    page_size = settings.PROJECT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,183 @@
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .llm import get_llm_service
+from .models import ProjectPoolBucket, PooledProject, GenerationJob
+from .profile_context import profile_bucket
+from .rate_limit import background_priority
+from .sqlite import serialized_write
+
+logger = logging.getLogger('api')
+
+# Upper bound (inclusive, hours) -> band name; anything larger is "long"
+TIME_BANDS = (
+    (5, "short"),
+    (15, "medium"),
+)
+
+
+# Entries looked at per claim; the rest wait for a request they suit
+CLAIM_CANDIDATES = 10
+
+
+def time_budget_band(hours):
+    try:
+        hours = float(hours)
+    except (TypeError, ValueError):
+        hours = 10
+    for upper, band in TIME_BANDS:
+        if hours <= upper:
+            return band
+    return "long"
+
+
+def bucket_fields(answers, profile_data=None, difficulty=None, language="en", focus_area=None):
+    """
+    Reduce a generate request to the attributes a pooled project must match.
+    The profile only counts through its coarse skill level and category, so
+    similar profiles share a bucket; excluded tools are checked per entry
+    when it is claimed.
+    """
+    skill_level, category = profile_bucket(profile_data).split("|", 1)
+    return {
+        "language": language,
+        "difficulty": difficulty or "INTERMEDIATE",
+        "project_type": answers.get("project_type", "surprise"),
+        "time_band": time_budget_band(answers.get("time_budget_hours", 10)),
+        "skill_level": skill_level,
+        "category": category,
+        "focus_area": " ".join((focus_area or "").lower().split())[:100],
+    }
+
+
+def bucket_key(fields):
+    return "|".join(
+        fields[k] for k in ("language", "difficulty", "project_type", "time_band", "skill_level", "category", "focus_area")
+    )
+
+
+def get_bucket(fields):
+    bucket, _ = ProjectPoolBucket.objects.get_or_create(key=bucket_key(fields), defaults=fields)
+    return bucket
+
+
+def entry_cutoff():
+    """Entries created before this are past PROJECT_POOL_ENTRY_TTL and no longer served."""
+    return timezone.now() - timedelta(seconds=settings.PROJECT_POOL_ENTRY_TTL)
+
+
+def mentions_excluded_tool(entry, excluded_tools):
+    text = json.dumps(entry.project_data, ensure_ascii=False).lower()
+    return any(tool.strip().lower() in text for tool in excluded_tools if tool.strip())
+
+
+def claim_pooled_project(bucket, excluded_tools=()):
+    """
+    Take the oldest unexpired entry of `bucket` that mentions none of
+    `excluded_tools`, and record a hit or miss; expired entries are dropped
+    on the way. Must run inside the caller's transaction so the claimed pair
+    and the Project built from it commit together. The filtered delete is
+    the lock: if another request took the entry first we move on to the
+    next one.
+    """
+    PooledProject.objects.filter(bucket=bucket, created_at__lt=entry_cutoff()).delete()
+    for entry in PooledProject.objects.filter(bucket=bucket).order_by('created_at')[:CLAIM_CANDIDATES]:
+        if mentions_excluded_tool(entry, excluded_tools):
+            continue
+        deleted, _ = PooledProject.objects.filter(id=entry.id).delete()
+        if deleted:
+            ProjectPoolBucket.objects.filter(id=bucket.id).update(hits=F('hits') + 1)
+            return entry
+
+    ProjectPoolBucket.objects.filter(id=bucket.id).update(misses=F('misses') + 1)
+    return None
+
+
+def request_refill(bucket, answers, profile_data=None, difficulty=None, language="en", focus_area=None):
+    """
+    Queue POOL_REFILL jobs towards PROJECT_POOL_DEPTH, with at most
+    PROJECT_POOL_MAX_PENDING_REFILLS queued or running per bucket, so a burst
+    of claims and misses does not flood the queue. The triggering request's
+    answers and profile are reused as the generation inputs, so the refilled
+    entries look like what this user just asked for.
+    """
+    depth = settings.PROJECT_POOL_DEPTH
+    if depth <= 0:
+        return 0
+
+    ready = PooledProject.objects.filter(bucket=bucket, created_at__gte=entry_cutoff()).count()
+    pending = GenerationJob.objects.filter(
+        pool_bucket=bucket,
+        status__in=[GenerationJob.Status.QUEUED, GenerationJob.Status.RUNNING],
+    ).count()
+    missing = min(depth - ready, settings.PROJECT_POOL_MAX_PENDING_REFILLS) - pending
+    if missing <= 0:
+        return 0
+
+    payload = {
+        "category": bucket.category,
+        "answers": answers,
+        "profile_data": profile_data,
+        "difficulty": difficulty,
+        "focus_area": focus_area,
+        "language": language,
+    }
+    GenerationJob.objects.bulk_create([
+        GenerationJob(kind=GenerationJob.Kind.POOL_REFILL, pool_bucket=bucket, payload=payload)
+        for _ in range(missing)
+    ])
+    logger.info(f"Queued {missing} pool refill job(s) for bucket {bucket.key}")
+    return missing
+
+
+def run_refill_job(job):
+    """Generate one client+project pair and park it in the job's bucket."""
+    payload = job.payload
+    # Nobody is waiting on a refill: leave the quota reserve to interactive generations
+    with background_priority():
+        client_data, project_data = get_llm_service().generate_project(
+            payload.get("category"),
+            payload.get("answers") or {},
+            profile_data=payload.get("profile_data"),
+            difficulty=payload.get("difficulty"),
+            focus_area=payload.get("focus_area"),
+            language=payload.get("language", "en"),
+            use_cache=False,
+        )
+    # Answers belong to whoever claims the entry, not to the refill request
+    project_data.pop("source_answers", None)
+    serialized_write(PooledProject.objects.create, bucket_id=job.pool_bucket_id, client_data=client_data, project_data=project_data)
+    logger.info(f"Refilled pool bucket {job.pool_bucket_id}")
+
+
+def pool_stats():
+    """Depth and hit-rate per bucket, for the admin pool endpoint."""
+    cutoff = entry_cutoff()
+    buckets = (
+        ProjectPoolBucket.objects
+        .annotate(
+            depth=Count('entries', filter=Q(entries__created_at__gte=cutoff), distinct=True),
+            refills_pending=Count(
+                'refill_jobs',
+                filter=Q(refill_jobs__status__in=[GenerationJob.Status.QUEUED, GenerationJob.Status.RUNNING]),
+                distinct=True,
+            ),
+        )
+        .order_by('key')
+    )
+    stats = []
+    for bucket in buckets:
+        lookups = bucket.hits + bucket.misses
+        stats.append({
+            "key": bucket.key,
+            "depth": bucket.depth,
+            "target_depth": settings.PROJECT_POOL_DEPTH,
+            "refills_pending": bucket.refills_pending,
+            "hits": bucket.hits,
+            "misses": bucket.misses,
+            "hit_rate": bucket.hits / lookups if lookups else 0.0,
+        })
+    return stats
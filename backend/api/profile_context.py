@@ -0,0 +1,63 @@
+import hashlib
+from .prompt_builder import PROFILE_CONTEXT_KEY, compact_json
+
+# Profile fields that reach the prompt, in prompt order
+PROFILE_FIELDS = ("skills", "skill_level", "preferred_tools", "excluded_tools")
+
+
+def infer_category(description, profile_data):
+    """Simple category inference based on keywords"""
+    desc_lower = description.lower()
+    skills = profile_data.get("skills", []) if profile_data else []
+    skills_lower = [s.lower() for s in skills]
+    
+    if any(kw in desc_lower for kw in ["python", "cli", "api", "backend", "script"]) or "python" in skills_lower:
+        return "Software Development"
+    elif any(kw in desc_lower for kw in ["react", "frontend", "web", "dashboard", "html"]) or "react" in skills_lower:
+        return "Web Development"
+    elif any(kw in desc_lower for kw in ["logo", "branding", "design", "ui", "ux"]) or any(s in skills_lower for s in ["figma", "photoshop", "illustrator"]):
+        return "Design"
+    elif any(kw in desc_lower for kw in ["write", "blog", "content", "copy"]):
+        return "Writing"
+    else:
+        return "General"
+
+
+def build_profile_context(profile_data):
+    """
+    What generation derives from a skill profile, computed once when the
+    profile is saved: the compact prompt fragment, the inferred category,
+    the skill bucket key and a content hash of the prompt fields.
+    """
+    fields = {field: profile_data.get(field) for field in PROFILE_FIELDS}
+    prompt = compact_json(fields)
+    category = infer_category("", fields)
+    return {
+        "prompt": prompt,
+        "category": category,
+        "bucket": f"{fields['skill_level']}|{category}",
+        "hash": hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:32],
+    }
+
+
+def _context(profile_data):
+    return profile_data.get(PROFILE_CONTEXT_KEY) if profile_data else None
+
+
+def profile_prompt(profile_data):
+    """Prompt fragment for a profile; precomputed unless the profile was trimmed or predates the context."""
+    context = _context(profile_data)
+    return context["prompt"] if context else compact_json(profile_data)
+
+
+def profile_category(profile_data):
+    context = _context(profile_data)
+    return context["category"] if context else infer_category("", profile_data)
+
+
+def profile_bucket(profile_data):
+    """Coarse "skill_level|category" of a profile, shared by every profile at that level in that category."""
+    if not profile_data:
+        return "|General"
+    context = _context(profile_data)
+    return context["bucket"] if context else build_profile_context(profile_data)["bucket"]
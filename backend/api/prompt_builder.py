@@ -0,0 +1,145 @@
+import contextvars
+import json
+import logging
+from contextlib import contextmanager
+from .metrics import LLM_CACHE_SERVED, observe_llm_request
+
+logger = logging.getLogger('api')
+
+# Which system prompt goes with which schema; used to precompute prefixes
+SYSTEM_SCHEMAS = {
+    "client_system": "client",
+    "project_system": "project",
+    "combined_system": "combined",
+    "skill_system": "skill_profile",
+}
+
+# Trimming steps applied to the skill profile, mildest first, when a prompt is over budget
+PROFILE_LIST_FIELDS = ("skills", "preferred_tools", "excluded_tools")
+PROFILE_LIST_CAPS = (12, 8, 5, 3)
+# Key of the precomputed context in profile_data (api/profile_context.py); it only describes the untrimmed profile
+PROFILE_CONTEXT_KEY = "context"
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), enough for budgets and quota."""
+    return (len(text) + 3) // 4
+
+
+def compact_json(value):
+    # No indentation or spaces, and no \uXXXX escapes for accented Spanish text
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def profile_variants(profile_data):
+    """Yield the profile progressively trimmed: full, shorter lists, no exclusions, then None."""
+    yield profile_data
+    if not profile_data:
+        return
+    for cap in PROFILE_LIST_CAPS:
+        trimmed = {key: value for key, value in profile_data.items() if key != PROFILE_CONTEXT_KEY}
+        for field in PROFILE_LIST_FIELDS:
+            if isinstance(trimmed.get(field), list):
+                trimmed[field] = trimmed[field][:cap]
+        yield trimmed
+    trimmed = {key: value for key, value in trimmed.items() if key != "excluded_tools"}
+    yield trimmed
+    yield {"skill_level": profile_data.get("skill_level")}
+    yield None
+
+
+class PromptBuilder:
+    """
+    Builds the full JSON-mode prompt from precomputed pieces.
+
+    Minified schema text and the "system + output instruction" prefix of every
+    (language, system prompt) pair are rendered once at import. Each call then
+    only appends the user request.
+    """
+
+    INSTRUCTION = (
+        "STRICT OUTPUT INSTRUCTION: You must output strictly valid JSON matching the following schema:\n"
+        "{schema}\n\n"
+        "Do not output markdown formatting like ```json ... ```. Just the raw JSON string.\n\n"
+    )
+
+    def __init__(self, prompts, schemas):
+        self._schemas = {id(schema): name for name, schema in schemas.items()}
+        self._schema_text = {id(schema): compact_json(schema) for schema in schemas.values()}
+        self._prefixes = {}
+        for language, texts in prompts.items():
+            for system_key, schema_name in SYSTEM_SCHEMAS.items():
+                schema = schemas[schema_name]
+                self._prefixes[(texts[system_key], id(schema))] = self._render_prefix(texts[system_key], schema)
+
+    def schema_name(self, schema):
+        return self._schemas.get(id(schema), "partial")
+
+    def _render_prefix(self, system_prompt, schema):
+        schema_text = self._schema_text.get(id(schema)) or compact_json(schema)
+        return f"{system_prompt}\n\n" + self.INSTRUCTION.format(schema=schema_text)
+
+    def build(self, system_prompt, user_prompt, schema):
+        prefix = self._prefixes.get((system_prompt, id(schema)))
+        if prefix is None:
+            # Follow-up sub-schemas and ad-hoc prompts are rendered on demand
+            prefix = self._render_prefix(system_prompt, schema)
+        return f"{prefix}USER REQUEST:\n{user_prompt}"
+
+    def fit(self, system_prompt, schema, render_user, profile_data, budget):
+        """
+        Build the prompt with the largest profile variant that keeps it within
+        `budget` tokens; render_user(profile) returns the user prompt. With no
+        budget (0) the full profile is used. Returns (prompt, profile used).
+        """
+        prompt = None
+        for variant in profile_variants(profile_data):
+            prompt = self.build(system_prompt, render_user(variant), schema)
+            if not budget or estimate_tokens(prompt) <= budget:
+                if variant is not profile_data:
+                    logger.info(f"Trimmed skill profile to fit the {budget}-token prompt budget")
+                return prompt, variant
+        logger.warning(f"Prompt is ~{estimate_tokens(prompt)} tokens even without a profile (budget {budget})")
+        return prompt, None
+
+
+_call_stats = contextvars.ContextVar("llm_call_stats", default=None)
+
+
+@contextmanager
+def collect_call_stats():
+    """Collect a dict per LLM call made inside the block (prompt size, usage, latency)."""
+    calls = []
+    token = _call_stats.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_stats.reset(token)
+
+
+def record_call(model, schema_name, prompt, elapsed, usage=None, cached=False, response_chars=None):
+    """Log one LLM request, feed the metrics and append it to an active collect_call_stats() block."""
+    stats = {
+        "model": model,
+        "schema": schema_name,
+        "prompt_chars": len(prompt),
+        "prompt_tokens_est": estimate_tokens(prompt),
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "response_chars": response_chars,
+        "elapsed": elapsed,
+        "cached": cached,
+    }
+    logger.info(
+        f"LLM call [{schema_name}]: prompt ~{stats['prompt_tokens_est']} tokens "
+        f"(reported {stats['prompt_tokens']}), output {stats['output_tokens']}, {elapsed:.2f}s"
+        + (" (cache hit)" if cached else "")
+    )
+    if cached:
+        LLM_CACHE_SERVED.inc(schema=schema_name)
+    else:
+        observe_llm_request(model, schema_name, elapsed, len(prompt), response_chars, usage)
+    calls = _call_stats.get()
+    if calls is not None:
+        calls.append(stats)
+    return stats
@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from django.conf import settings
+from django.utils.http import quote_etag
+
+CONFIG_NAME = "questionnaire"
+
+
+class QuestionnaireVariant:
+    """One config file, parsed once and kept as ready-to-send bytes."""
+
+    def __init__(self, path, signature, raw):
+        self.path = path
+        self.signature = signature
+        self.digest = hashlib.sha256(raw).hexdigest()
+        self.data = json.loads(raw)
+        self.body = json.dumps(self.data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.gzipped = gzipped if len(gzipped) < len(self.body) else None
+        self.etag = quote_etag(self.digest[:32])
+        self.gzip_etag = quote_etag(f"{self.digest[:32]}-gzip")
+
+
+class QuestionnaireCache:
+    """
+    In-memory questionnaire config. Every lookup stats the file; it is only
+    re-read when (mtime, size) changes, and only re-parsed when the content
+    hash changes too. A `questionnaire.<language>.json` next to the default
+    file is served to that language; other languages share the default.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._variants = {}  # path -> QuestionnaireVariant
+
+    def path_for(self, language):
+        localized = self.directory / f"{CONFIG_NAME}.{language}.json"
+        return localized if localized.exists() else self.directory / f"{CONFIG_NAME}.json"
+
+    def get(self, language):
+        """Current variant for `language`; raises FileNotFoundError or json.JSONDecodeError."""
+        path = self.path_for(language)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        variant = self._variants.get(path)
+        if variant is not None and variant.signature == signature:
+            return variant
+
+        with self._lock:
+            variant = self._variants.get(path)
+            if variant is not None and variant.signature == signature:
+                return variant
+            with open(path, "rb") as f:
+                raw = f.read()
+            if variant is not None and variant.digest == hashlib.sha256(raw).hexdigest():
+                # Touched but unchanged: keep the parsed data, bytes and ETag
+                variant.signature = signature
+                return variant
+            variant = QuestionnaireVariant(path, signature, raw)
+            self._variants[path] = variant
+            return variant
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_questionnaire_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = QuestionnaireCache(settings.BASE_DIR / "config")
+    return _cache
@@ -0,0 +1,237 @@
+import asyncio
+import contextvars
+import logging
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger('api')
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """Mark LLM calls made inside the block as background work (pool refills)."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class RateLimitTimeout(Exception):
+    """Quota did not free up within LLM_RATE_LIMIT_MAX_WAIT."""
+
+
+_RETRY_HINT_PATTERNS = (
+    re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),
+    re.compile(r"retry after ([\d.]+)", re.IGNORECASE),
+)
+
+
+def retry_hint_seconds(error):
+    """Server-suggested wait from a quota error, or None if it carries none."""
+    for detail in getattr(error, "details", None) or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and getattr(delay, "seconds", None):
+            return float(delay.seconds) + getattr(delay, "nanos", 0) / 1e9
+    message = str(error)
+    for pattern in _RETRY_HINT_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+class QuotaLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets shared by every
+    thread and process on the node through one SQLite file.
+
+    Each acquire runs in a BEGIN IMMEDIATE transaction, so refill, check and
+    deduct are atomic across gunicorn workers and generation workers. A quota
+    error with a retry hint blocks the model for everyone instead of letting
+    each caller retry on its own schedule. Background calls may not spend the
+    last `reserve` fraction of either bucket, which keeps room for users who
+    are waiting on a generation.
+    """
+
+    def __init__(self, path, rpm, tpm, reserve=0.2):
+        self.path = str(path)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.reserve = reserve
+        self._local = threading.local()
+        self._init_db()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS llm_quota ("
+            " model TEXT PRIMARY KEY,"
+            " requests REAL NOT NULL,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " blocked_until REAL NOT NULL DEFAULT 0)"
+        )
+
+    def _load(self, conn, model, now):
+        row = conn.execute(
+            "SELECT requests, tokens, updated_at, blocked_until FROM llm_quota WHERE model = ?", (model,)
+        ).fetchone()
+        if row is None:
+            return float(self.rpm), float(self.tpm), 0.0
+        requests, tokens, updated_at, blocked_until = row
+        elapsed = max(0.0, now - updated_at)
+        requests = min(self.rpm, requests + elapsed * self.rpm / 60)
+        tokens = min(self.tpm, tokens + elapsed * self.tpm / 60)
+        return requests, tokens, blocked_until
+
+    def _store(self, conn, model, requests, tokens, now, blocked_until):
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_quota (model, requests, tokens, updated_at, blocked_until) VALUES (?, ?, ?, ?, ?)",
+            (model, requests, tokens, now, blocked_until),
+        )
+
+    def try_acquire(self, model, tokens, priority=INTERACTIVE):
+        """Take one request and `tokens` from the buckets; return 0 on success, else seconds to wait."""
+        tokens = min(tokens, self.tpm)  # An oversized call must still be admissible once the bucket is full
+        floor = self.reserve if priority == BACKGROUND else 0.0
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            available_requests, available_tokens, blocked_until = self._load(conn, model, now)
+            if blocked_until > now:
+                wait = blocked_until - now
+            else:
+                request_shortfall = 1 + floor * self.rpm - available_requests
+                token_shortfall = tokens + floor * self.tpm - available_tokens
+                wait = max(
+                    request_shortfall * 60 / self.rpm if request_shortfall > 0 else 0.0,
+                    token_shortfall * 60 / self.tpm if token_shortfall > 0 else 0.0,
+                )
+                if wait <= 0:
+                    available_requests -= 1
+                    available_tokens -= tokens
+            self._store(conn, model, available_requests, available_tokens, now, blocked_until)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def settle(self, model, estimated, actual):
+        """
+        Charge (or refund) the difference once the real token usage is known.
+        A failed request settles with actual=0, returning its whole estimate.
+        """
+        if actual is None or actual == estimated:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            requests, tokens, blocked_until = self._load(conn, model, now)
+            self._store(conn, model, requests, tokens - (actual - estimated), now, blocked_until)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def block(self, model, seconds):
+        """Pause every caller of `model` for `seconds` after a quota error."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            requests, tokens, blocked_until = self._load(conn, model, now)
+            # Drain the request bucket so callers resume one at a time after the pause, not all at once
+            self._store(conn, model, min(requests, 0.0), tokens, now, max(blocked_until, now + seconds))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.warning(f"LLM quota: {model} blocked for {seconds:.1f}s after a quota error")
+
+    def _deadline(self, max_wait):
+        max_wait = settings.LLM_RATE_LIMIT_MAX_WAIT if max_wait is None else min(max_wait, settings.LLM_RATE_LIMIT_MAX_WAIT)
+        return time.monotonic() + max_wait, max_wait
+
+    def _next_wait(self, model, tokens, priority, deadline, max_wait):
+        wait = self.try_acquire(model, tokens, priority)
+        if wait <= 0:
+            return 0.0
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(f"LLM quota for {model} not available within {max_wait:.0f}s")
+        # Re-check at least once a second so higher-priority callers and refunds are seen promptly
+        return min(wait, 1.0)
+
+    def acquire(self, model, tokens, priority=None, max_wait=None):
+        """Block until the quota allows the request; max_wait (seconds) tightens LLM_RATE_LIMIT_MAX_WAIT."""
+        priority = priority or current_priority()
+        deadline, max_wait = self._deadline(max_wait)
+        while True:
+            wait = self._next_wait(model, tokens, priority, deadline, max_wait)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    # Async counterparts. Each check is a BEGIN IMMEDIATE that can wait up to
+    # the 10s busy timeout, so it runs on a worker thread, not the event loop.
+
+    async def aacquire(self, model, tokens, priority=None, max_wait=None):
+        priority = priority or current_priority()
+        deadline, max_wait = self._deadline(max_wait)
+        while True:
+            wait = await asyncio.to_thread(self._next_wait, model, tokens, priority, deadline, max_wait)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def atry_acquire(self, model, tokens, priority=INTERACTIVE):
+        return await asyncio.to_thread(self.try_acquire, model, tokens, priority)
+
+    async def asettle(self, model, estimated, actual):
+        if actual is not None and actual != estimated:
+            await asyncio.to_thread(self.settle, model, estimated, actual)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_quota_limiter():
+    """Process-wide limiter, or None when LLM_RATE_LIMIT_ENABLED is off."""
+    global _limiter
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = QuotaLimiter(
+                    settings.LLM_RATE_LIMIT_PATH,
+                    rpm=settings.LLM_RATE_LIMIT_RPM,
+                    tpm=settings.LLM_RATE_LIMIT_TPM,
+                    reserve=settings.LLM_RATE_LIMIT_INTERACTIVE_RESERVE,
+                )
+    return _limiter
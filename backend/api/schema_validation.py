@@ -0,0 +1,108 @@
+import copy
+
+_TYPE_CHECKS = {
+    "STRING": lambda value: isinstance(value, str),
+    "NUMBER": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "INTEGER": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "BOOLEAN": lambda value: isinstance(value, bool),
+}
+
+
+def _compile(schema):
+    """Turn a Gemini-style schema into a predicate value -> bool, resolved once."""
+    kind = schema.get("type")
+
+    if kind == "OBJECT":
+        required = tuple(schema.get("required", ()))
+        properties = tuple((name, _compile(sub)) for name, sub in schema.get("properties", {}).items())
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return False
+            if any(name not in value for name in required):
+                return False
+            return all(
+                check(value[name]) or (value[name] is None and name not in required)
+                for name, check in properties
+                if name in value
+            )
+        return check_object
+
+    if kind == "ARRAY":
+        check_item = _compile(schema["items"]) if "items" in schema else (lambda value: True)
+        return lambda value: isinstance(value, list) and all(check_item(item) for item in value)
+
+    check_type = _TYPE_CHECKS.get(kind, lambda value: True)
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+        return lambda value: check_type(value) and value in allowed
+    return check_type
+
+
+class CompiledSchema:
+    """
+    Validator for one response schema, compiled at import time.
+
+    invalid_paths() names the fields that are missing or mistyped, descending
+    into nested objects (e.g. ("requirements", "must_avoid")) so a follow-up
+    request only has to produce what is actually wrong. Arrays are checked as
+    a whole: one bad deliverable means the deliverables list is regenerated.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.required = frozenset(schema.get("required", ()))
+        self._fields = {}
+        self._children = {}
+        for name, sub in schema.get("properties", {}).items():
+            self._fields[name] = _compile(sub)
+            if sub.get("type") == "OBJECT" and sub.get("properties"):
+                self._children[name] = CompiledSchema(sub)
+
+    def invalid_paths(self, value):
+        """Field paths of a response object that are missing (if required) or mistyped."""
+        paths = []
+        for name, check in self._fields.items():
+            if name not in value or value[name] is None:
+                if name in self.required:
+                    paths.append((name,))
+            elif name in self._children and isinstance(value[name], dict):
+                paths.extend((name,) + path for path in self._children[name].invalid_paths(value[name]))
+            elif not check(value[name]):
+                paths.append((name,))
+        return paths
+
+    def is_valid(self, value):
+        return not self.invalid_paths(value)
+
+    def subschema(self, paths):
+        """Schema asking for just `paths` (and the objects containing them), all required."""
+        schema = {"type": "OBJECT", "properties": {}, "required": []}
+        for path in paths:
+            node, source = schema, self.schema
+            for name in path[:-1]:
+                source = source["properties"][name]
+                if name not in node["properties"]:
+                    node["properties"][name] = {"type": "OBJECT", "properties": {}, "required": []}
+                    node["required"].append(name)
+                node = node["properties"][name]
+            node["properties"][path[-1]] = source["properties"][path[-1]]
+            node["required"].append(path[-1])
+        return schema
+
+    def merge(self, value, patch, paths):
+        """Copy `paths` from `patch` into a copy of `value`; paths the patch lacks are left alone."""
+        merged = copy.deepcopy(value) if isinstance(value, dict) else {}
+        for path in paths:
+            source = patch
+            for name in path:
+                source = source.get(name) if isinstance(source, dict) else None
+            if source is None:
+                continue
+            target = merged
+            for name in path[:-1]:
+                if not isinstance(target.get(name), dict):
+                    target[name] = {}
+                target = target[name]
+            target[path[-1]] = source
+        return merged
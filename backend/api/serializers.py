@@ -1,12 +1,41 @@
 from rest_framework import serializers
 from .models import Client, Project, UserSkillProfile, LearningOption
 
+def _query_param_set(request, name):
+    if request is None:
+        return set()
+    value = request.query_params.get(name, '')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+class SparseFieldsMixin:
+    """
+    `?fields=a,b` keeps only the named fields; `?expand=client` adds the
+    nested client to serializers that do not include it by default.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+
+        expand = _query_param_set(request, 'expand')
+        for name in expand & set(self.expandable_fields):
+            field_class, field_kwargs = self.expandable_fields[name]
+            self.fields[name] = field_class(**field_kwargs)
+
+        requested = _query_param_set(request, 'fields')
+        if requested:
+            # An expanded relation is kept even when ?fields= does not list it
+            keep = requested | expand
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
 class ClientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Client
         fields = '__all__'
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     client = ClientSerializer(read_only=True)
     
     class Meta:
@@ -14,11 +43,21 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id', 'owner', 'created_at', 'status', 'approval_log')
 
+class ProjectSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Lightweight list projection: no JSON columns, client reduced to its name"""
+    client_name = serializers.CharField(source='client.name', read_only=True)
+    expandable_fields = {'client': (ClientSerializer, {'read_only': True})}
+
+    class Meta:
+        model = Project
+        fields = ('id', 'title', 'category', 'status', 'created_at', 'updated_at', 'client_name')
+        read_only_fields = fields
+
 class UserSkillProfileSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     class Meta:
         model = UserSkillProfile
-        fields = '__all__'
+        exclude = ('generation_context',)
         read_only_fields = ('id', 'user')
 
 class LearningOptionSerializer(serializers.ModelSerializer):
@@ -0,0 +1,157 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection as default_connection, transaction
+from .metrics import REGISTRY
+
+logger = logging.getLogger('api')
+
+JOURNAL_MODES = ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF")
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created receiver (see ApiConfig.ready): WAL lets readers run
+    alongside the writer, busy_timeout makes writers wait for the lock instead
+    of failing with "database is locked", and synchronous=NORMAL is durable
+    enough in WAL mode while skipping an fsync per commit.
+    """
+    if connection.vendor != "sqlite":
+        return
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in JOURNAL_MODES:
+        raise ImproperlyConfigured(f"SQLITE_JOURNAL_MODE must be one of {', '.join(JOURNAL_MODES)}")
+    if synchronous not in SYNCHRONOUS_LEVELS:
+        raise ImproperlyConfigured(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_LEVELS)}")
+    with connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT * 1000)}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+
+
+class WriteQueue:
+    """
+    One writer thread for background generation writes. Writes queued within
+    `window` seconds of each other are committed in a single transaction, each
+    in its own savepoint so one failure does not undo the others. Generation
+    workers stop contending for the SQLite write lock, and a batch of streamed
+    fields costs one commit instead of one per field.
+    """
+
+    def __init__(self, max_batch=50, window=0.02):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs); the returned Future resolves once its transaction has committed."""
+        future = Future()
+        if default_connection.in_atomic_block:
+            # The writer's connection cannot see this uncommitted transaction, and
+            # would wait on the lock it holds: write on the caller's connection
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as exc:
+                future.set_exception(exc)
+            return future
+        self._ensure_started()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn on the writer thread and return its result, re-raising its exception."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            self._write(self._next_batch())
+
+    def _write(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, fn, args, kwargs in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, fn(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # BEGIN or COMMIT failed: nothing in the batch was written
+            logger.error(f"SQLite writer could not commit a batch of {len(batch)} write(s)", exc_info=True)
+            outcomes = [(future, None, exc) for future, *_ in batch]
+            default_connection.close_if_unusable_or_obsolete()
+        self.batches += 1
+        self.writes += len(batch)
+        # Resolve only after COMMIT so callers read what they wrote
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def samples(self):
+        yield "sqlite_write_queue_depth", "gauge", "Background writes waiting for the SQLite writer thread.", [({}, self.depth())]
+        yield "sqlite_write_batches_total", "counter", "Transactions committed by the SQLite writer thread.", [({}, self.batches)]
+        yield "sqlite_writes_total", "counter", "Writes committed by the SQLite writer thread.", [({}, self.writes)]
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Process-wide writer queue, or None when SQLITE_WRITE_QUEUE is off or the database is not SQLite."""
+    global _write_queue
+    if not settings.SQLITE_WRITE_QUEUE or default_connection.vendor != "sqlite":
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue(
+                    max_batch=settings.SQLITE_WRITE_BATCH_SIZE,
+                    window=settings.SQLITE_WRITE_BATCH_WINDOW,
+                )
+                REGISTRY.add_collector(_write_queue.samples)
+    return _write_queue
+
+
+def serialized_write(fn, *args, **kwargs):
+    """Run a background write on the writer thread when there is one, otherwise inline."""
+    writer = get_write_queue()
+    if writer is None:
+        return fn(*args, **kwargs)
+    return writer.call(fn, *args, **kwargs)
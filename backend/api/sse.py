@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from .broker import pooled_db_call
+from .models import Project, LLM_CLIENT_FIELDS, LLM_PROJECT_FIELDS
+from .serializers import ProjectSerializer
+
+HEARTBEAT_SECONDS = 15
+
+
+def sse_event(event, data, event_id=None):
+    """Format one Server-Sent Events message."""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _field_values(project):
+    return {
+        "client": {name: getattr(project.client, name) for name in LLM_CLIENT_FIELDS},
+        "project": {name: getattr(project, name) for name in LLM_PROJECT_FIELDS},
+    }
+
+
+def _poll_project(project_id, snapshot=False):
+    """
+    (status, field values, serialized project) of one project, or None once
+    it is deleted; the project is only serialized for a snapshot or once it
+    has left GENERATING.
+    """
+    project = Project.objects.select_related('client').filter(id=project_id).first()
+    if project is None:
+        return None
+    serialized = ProjectSerializer(project).data if snapshot or project.status != Project.Status.GENERATING else None
+    return project.status, _field_values(project), serialized
+
+
+_apoll_project = pooled_db_call(_poll_project)
+
+
+async def project_field_events(project_id, poll_interval=None, timeout=None):
+    """
+    Yield SSE messages for one project while it generates:
+    `snapshot` (full project) first, then a `field` event for every LLM field
+    that changes, and finally `done` with the full project once it leaves
+    GENERATING. Works across processes because it watches the row that the
+    worker persists field by field. Between polls the stream holds neither a
+    thread nor a database connection.
+    """
+    poll_interval = poll_interval if poll_interval is not None else settings.PROJECT_STREAM_POLL_INTERVAL
+    deadline = time.monotonic() + (timeout if timeout is not None else settings.PROJECT_STREAM_TIMEOUT)
+
+    state = await _apoll_project(project_id, snapshot=True)
+    if state is None:
+        yield sse_event("deleted", {"id": str(project_id)})
+        return
+    status, last_values, data = state
+    yield sse_event("snapshot", data)
+    last_sent = time.monotonic()
+
+    while status == Project.Status.GENERATING:
+        if time.monotonic() > deadline:
+            yield sse_event("timeout", {"id": str(project_id)})
+            return
+
+        await asyncio.sleep(poll_interval)
+        state = await _apoll_project(project_id)
+        if state is None:
+            yield sse_event("deleted", {"id": str(project_id)})
+            return
+
+        status, values, data = state
+        for target, fields in values.items():
+            for name, value in fields.items():
+                if value != last_values[target][name]:
+                    yield sse_event("field", {"target": target, "field": name, "value": value})
+                    last_sent = time.monotonic()
+        last_values = values
+
+        if time.monotonic() - last_sent > HEARTBEAT_SECONDS:
+            # SSE comment line; keeps proxies from closing an idle stream
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+    yield sse_event("done", data)
+
+
+async def user_events(broker, user_id, last_event_id, timeout=None):
+    """
+    Yield SSE messages for every event published to user_id after
+    last_event_id, until PROJECT_EVENTS_STREAM_TIMEOUT; the browser's
+    EventSource reconnects with Last-Event-ID so nothing is missed.
+    Waits on the broker from the event loop (broker.alisten).
+    """
+    deadline = time.monotonic() + (timeout if timeout is not None else settings.PROJECT_EVENTS_STREAM_TIMEOUT)
+    # Tell EventSource to wait a little before reconnecting after we close
+    yield "retry: 2000\n\n"
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = await broker.alisten(user_id, last_event_id, timeout=min(HEARTBEAT_SECONDS, remaining))
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            last_event_id = event["id"]
+            yield sse_event(event["type"], event["data"], event_id=event["id"])
@@ -1,3 +1,1021 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import runpy
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
+from rest_framework.authtoken.models import Token
+
+from accounts.authentication import get_token_cache
+
+from .broker import InProcessBroker
+from .fake_llm import FakeGenerativeModel, parse_latency
+from .hedging import Hedger
+from .jobs import claim_next_job, lease_heartbeat, renew_lease
+from .json_recovery import recover_json
+from .llm import CLIENT_SCHEMA, COMBINED_SCHEMA, PROJECT_SCHEMA, PROMPT_BUILDER, PROMPTS, LLMService
+from .llm_backends import QUOTA, LLMBackend, LLMResponse, StubBackend, build_chain
+from .llm_cache import LLMResponseCache
+from .llm_clients import LLMClientRegistry
+from .metrics import REGISTRY
+from .models import Client, GenerationBatch, GenerationJob, PooledProject, Project, UserSkillProfile
+from .pool import bucket_fields, claim_pooled_project, get_bucket, request_refill
+from .profile_context import build_profile_context
+from .prompt_builder import compact_json, estimate_tokens
+from .questionnaire import QuestionnaireCache
+from .rate_limit import QuotaLimiter
+from .schema_validation import CompiledSchema
+from .sqlite import WriteQueue
+from .views import filter_projects, long_poll_timeout
+
+
+class ProjectListIndexTests(TestCase):
+    """The landing-page list queries must be served by the (owner, ...) composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner', password='x')
+        other = User.objects.create_user(username='other', password='x')
+        client = Client.objects.create(name="Client", industry="Web", summary="")
+        for user in (cls.owner, other):
+            for i in range(30):
+                Project.objects.create(
+                    client=client,
+                    owner=user,
+                    title=f"Project {i}",
+                    category="Web" if i % 2 else "Design",
+                    status=Project.Status.DRAFT if i % 3 else Project.Status.GENERATING,
+                )
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A tiny table is cheaper to scan; force the planner to show which index it would use
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+
+    def plan(self, params):
+        queryset = filter_projects(Project.objects.filter(owner=self.owner), params)
+        # Same ordering and page window as ProjectCursorPagination
+        return queryset.order_by('-created_at')[:21].explain()
+
+    def assertUsesIndex(self, params, index_name):
+        plan = self.plan(params)
+        self.assertIn(index_name, plan)
+        if connection.vendor == 'sqlite':
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_list_uses_owner_created_index(self):
+        self.assertUsesIndex({}, 'api_project_owner_cr_idx')
+
+    def test_created_after_uses_owner_created_index(self):
+        self.assertUsesIndex({'created_after': '2020-01-01'}, 'api_project_owner_cr_idx')
+
+    def test_status_filter_uses_owner_status_index(self):
+        self.assertUsesIndex({'status': 'DRAFT'}, 'api_project_owner_st_cr_idx')
+
+    def test_category_filter_uses_owner_category_index(self):
+        self.assertUsesIndex({'category': 'Web'}, 'api_project_owner_cat_cr_idx')
+
+
+class ProjectListQueryTests(TestCase):
+    """Every list projection must be fully loaded by `_restrict_columns`: a missing column is one deferred load per row."""
+
+    def setUp(self):
+        get_token_cache().clear()
+        user = User.objects.create_user(username='lister')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=user).key}'
+        for i in range(5):
+            customer = Client.objects.create(name=f"Client {i}", industry="Web", summary="")
+            Project.objects.create(client=customer, owner=user, title=f"Project {i}", deliverables=["Brief"])
+        self.client.get('/api/projects/')  # Warm the token cache
+
+    def assertListQueries(self, url, expected_fields):
+        # Validators, then one page of rows however many projects and clients it covers
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertEqual(set(response.json()['results'][0]), expected_fields)
+        return queries.captured_queries[-1]['sql']
+
+    def test_summary_list_skips_the_json_columns(self):
+        sql = self.assertListQueries(
+            '/api/projects/', {'id', 'title', 'category', 'status', 'created_at', 'updated_at', 'client_name'}
+        )
+        self.assertNotIn('"deliverables"', sql)
+
+    def test_sparse_fields_with_an_expanded_client(self):
+        self.assertListQueries('/api/projects/?fields=id,deliverables&expand=client', {'id', 'deliverables', 'client'})
+
+    def test_sparse_fields_naming_full_project_fields(self):
+        self.assertListQueries(
+            '/api/projects/?fields=id,objective,owner,client,tone_rules', {'id', 'objective', 'owner', 'client', 'tone_rules'}
+        )
+
+
+class ScriptedBackend(LLMBackend):
+    """Rate-limited test backend that raises `error` or returns a fixed JSON object."""
+
+    provider = "test"
+    rate_limited = True
+
+    def __init__(self, model, error=None):
+        super().__init__(model)
+        self.error = error
+        self.calls = 0
+
+    def classify(self, error):
+        return QUOTA if isinstance(error, ResourceExhausted) else super().classify(error)
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return LLMResponse('{"name": "Fallback"}')
+
+    async def agenerate(self, prompt, schema, timeout=None):
+        return self.generate(prompt, schema, timeout)
+
+
+class QuotaFallbackTests(SimpleTestCase):
+    """A quota error that falls back must still block the exhausted model for every caller."""
+
+    SCHEMA = {"type": "OBJECT", "properties": {"name": {"type": "STRING"}}, "required": ["name"]}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.limiter = QuotaLimiter(self.directory / "quota.sqlite3", rpm=100, tpm=1_000_000)
+        patcher = mock.patch("api.llm.get_quota_limiter", return_value=self.limiter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.primary = ScriptedBackend("primary", ResourceExhausted("Quota exceeded. Please retry in 30s."))
+        self.fallback = ScriptedBackend("fallback")
+
+    def call(self, use_cache=False):
+        service = LLMService(chain=[self.primary, self.fallback])
+        return service._call_gemini("system", "user", self.SCHEMA, use_cache=use_cache)
+
+    def test_quota_error_blocks_primary_before_falling_back(self):
+        self.assertEqual(self.call(), {"name": "Fallback"})
+        self.assertGreater(self.limiter.try_acquire("primary", 10), 25)
+
+    def test_second_call_is_held_back_from_exhausted_model(self):
+        self.call()
+        self.assertEqual(self.call(), {"name": "Fallback"})
+        self.assertEqual(self.primary.calls, 1)
+        self.assertEqual(self.fallback.calls, 2)
+
+    def test_failed_request_refunds_its_token_estimate(self):
+        asyncio.run(LLMService(chain=[self.primary, self.fallback])._acall_gemini(
+            "system", "user", self.SCHEMA, use_cache=False
+        ))
+        tokens = self.limiter._connection().execute(
+            "SELECT tokens FROM llm_quota WHERE model = 'primary'"
+        ).fetchone()[0]
+        self.assertAlmostEqual(tokens, self.limiter.tpm, delta=100)
+
+    def test_fallback_response_is_cached_under_the_fallback_model(self):
+        cache = LLMResponseCache(self.directory / "cache.sqlite3")
+        healthy = ScriptedBackend("primary")
+        healthy.rate_limited = False  # The limiter has blocked "primary"
+        with mock.patch("api.llm.get_response_cache", return_value=cache):
+            self.call(use_cache=True)
+            LLMService(chain=[healthy])._call_gemini("system", "user", self.SCHEMA)
+            LLMService(chain=[self.fallback])._call_gemini("system", "user", self.SCHEMA)
+        self.assertEqual(healthy.calls, 1)
+        self.assertEqual(self.fallback.calls, 1)
+
+
+class StubBackendTests(SimpleTestCase):
+    @override_settings(DEBUG=False, LLM_BACKEND="gemini")
+    def test_stub_link_is_refused_in_production(self):
+        with self.assertRaises(ImproperlyConfigured):
+            build_chain("stub")
+
+    @override_settings(DEBUG=True, LLM_BACKEND="gemini")
+    def test_stub_link_is_built_under_debug(self):
+        chain = build_chain("stub")
+        self.assertIsInstance(chain[0], StubBackend)
+        self.assertEqual(LLMService(chain=chain)._call_gemini("system", "user", QuotaFallbackTests.SCHEMA, use_cache=False).keys(), {"name"})
+
+
+class PromptBuilderTests(SimpleTestCase):
+    PROFILE = {
+        "skill_level": "INTERMEDIATE",
+        "skills": [f"Skill {i}" for i in range(20)],
+        "preferred_tools": [f"Tool {i}" for i in range(20)],
+        "excluded_tools": ["Django"],
+        "context": "Precomputed text for the full profile",
+    }
+
+    def fit(self, budget):
+        system = PROMPTS["en"]["project_system"]
+        return PROMPT_BUILDER.fit(system, PROJECT_SCHEMA, lambda profile: compact_json(profile), self.PROFILE, budget)
+
+    def test_prompt_embeds_the_minified_schema_and_keeps_accents(self):
+        prompt = PROMPT_BUILDER.build(PROMPTS["es"]["project_system"], compact_json({"nivel": "Intermedio, diseño"}), PROJECT_SCHEMA)
+        self.assertTrue(prompt.startswith(PROMPTS["es"]["project_system"]))
+        self.assertIn(json.dumps(PROJECT_SCHEMA, separators=(",", ":")), prompt)
+        self.assertIn('{"nivel":"Intermedio, diseño"}', prompt)
+
+    def test_no_budget_keeps_the_full_profile(self):
+        self.assertIs(self.fit(0)[1], self.PROFILE)
+
+    def test_over_budget_profile_is_trimmed_to_fit(self):
+        full = estimate_tokens(self.fit(0)[0])
+        prompt, profile = self.fit(full - 50)
+        self.assertLessEqual(estimate_tokens(prompt), full - 50)
+        self.assertEqual(profile["skills"], self.PROFILE["skills"][:12])
+        self.assertEqual(profile["excluded_tools"], ["Django"])
+        self.assertNotIn("context", profile)  # It describes the untrimmed profile
+
+    def test_profile_is_dropped_when_nothing_else_fits(self):
+        without_profile = estimate_tokens(PROMPT_BUILDER.build(PROMPTS["en"]["project_system"], "null", PROJECT_SCHEMA))
+        self.assertEqual(self.fit(without_profile)[1], None)
+        self.assertEqual(self.fit(without_profile + 12)[1], {"skill_level": "INTERMEDIATE"})
+
+
+class FakeLLMTests(SimpleTestCase):
+    def prompt(self, schema=CLIENT_SCHEMA):
+        return PROMPT_BUILDER.build(PROMPTS["en"]["client_system"], "A web client", schema)
+
+    def test_response_follows_the_schema_in_the_prompt(self):
+        response = FakeGenerativeModel("fake", latency="fixed:0", seed=1).generate_content(self.prompt(), stream=True)
+        self.assertEqual("".join(chunk.text for chunk in response), response.text)
+        self.assertEqual(set(json.loads(response.text)), set(CLIENT_SCHEMA["properties"]))
+        self.assertGreater(response.usage_metadata.prompt_token_count, 0)
+
+    def test_a_seed_makes_runs_reproducible(self):
+        texts = [
+            FakeGenerativeModel("fake", latency="fixed:0", malformed_rate=0.5, seed=7).generate_content(self.prompt()).text
+            for _ in range(2)
+        ]
+        self.assertEqual(texts[0], texts[1])
+
+    def test_injected_errors_and_deadlines(self):
+        with self.assertRaises(ResourceExhausted):
+            FakeGenerativeModel("fake", latency="fixed:0", quota_error_rate=1).generate_content(self.prompt())
+        with self.assertRaises(DeadlineExceeded):
+            FakeGenerativeModel("fake", latency="fixed:5").generate_content(self.prompt(), request_options={"timeout": 0.01})
+        with self.assertRaises(ValueError):
+            parse_latency("normal:1,2")
+
+    @override_settings(LLM_BACKEND="fake", LLM_FAKE_LATENCY="fixed:0", LLM_FAKE_MALFORMED_RATE=0, LLM_FAKE_SEED=3)
+    def test_generation_runs_through_the_real_backend_path(self):
+        registry = LLMClientRegistry(backend="fake")
+        service = LLMService(chain=build_chain("gemini:fake-model", registry=registry))
+        client_data, project_data = service.generate_project("Web", {"project_type": "practical"}, use_cache=False)
+        self.assertLessEqual(set(CLIENT_SCHEMA["required"]), set(client_data))
+        self.assertEqual(project_data["status"], "DRAFT")
+        self.assertIsInstance(registry.model("fake-model"), FakeGenerativeModel)
+
+
+class CountingStubBackend(StubBackend):
+    def __init__(self, model):
+        super().__init__(model)
+        self.schemas = []
+
+    def generate(self, prompt, schema, timeout=None, on_text=None):
+        self.schemas.append(schema)
+        return super().generate(prompt, schema, timeout, on_text)
+
+
+class CombinedGenerationTests(SimpleTestCase):
+    ANSWERS = {"project_type": "practical"}
+
+    def setUp(self):
+        self.backend = CountingStubBackend("stub")
+        self.service = LLMService(chain=[self.backend])
+
+    def test_combined_mode_makes_one_call_and_splits_it(self):
+        fields = []
+        client_data, project_data = self.service.generate_project(
+            "Web", self.ANSWERS, mode="combined", use_cache=False, on_field=lambda target, key, value: fields.append((target, key))
+        )
+        self.assertEqual(self.backend.schemas, [COMBINED_SCHEMA])
+        self.assertLessEqual(set(CLIENT_SCHEMA["required"]), set(client_data))
+        self.assertLessEqual(set(PROJECT_SCHEMA["required"]), set(project_data))
+        self.assertEqual((project_data["status"], project_data["source_answers"]), ("DRAFT", self.ANSWERS))
+        # Streamed fields are routed to the object they belong to
+        self.assertIn(("client", "name"), fields)
+        self.assertIn(("project", "title"), fields)
+
+    def test_sequential_mode_makes_two_calls(self):
+        self.service.generate_project("Web", self.ANSWERS, mode="sequential", use_cache=False)
+        self.assertEqual(self.backend.schemas, [CLIENT_SCHEMA, PROJECT_SCHEMA])
+
+    def test_incomplete_combined_response_is_rejected(self):
+        client_data, project_data = self.service._split_combined(
+            {"client": {key: "x" for key in CLIENT_SCHEMA["required"]}, "project": {key: "x" for key in PROJECT_SCHEMA["required"]}}
+        )
+        del project_data["title"]
+        with self.assertRaisesMessage(ValueError, "project.title"):
+            self.service._split_combined({"client": client_data, "project": project_data})
+        with self.assertRaises(ValueError):
+            self.service._split_combined({"client": client_data})
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.service.generate_project("Web", self.ANSWERS, mode="parallel")
+
+
+class AsyncGenerationViewTests(TransactionTestCase):
+    """The ASGI endpoint authenticates on a pool thread, so the token must be committed: no TestCase."""
+
+    URL = '/api/async/projects/generate'
+    BODY = {"category": "Web", "answers": {"project_type": "practical"}, "difficulty": "Beginner"}
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user(username='async')
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.user).key}'}
+        patcher = mock.patch("api.views.get_llm_service", return_value=LLMService(chain=[StubBackend("stub")]))
+        self.service = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    async def post(self, body, headers=None):
+        return await self.async_client.post(
+            self.URL, body, content_type='application/json', headers=self.headers if headers is None else headers
+        )
+
+    async def test_returns_the_generated_project(self):
+        response = await self.post(self.BODY)
+        self.assertEqual(response.status_code, 201)
+        payload = response.json()
+        self.assertEqual(payload['status'], Project.Status.DRAFT)
+        self.assertNotEqual(payload['title'], "Generating Project...")
+        project = await Project.objects.select_related('client', 'owner').aget(id=payload['id'])
+        self.assertEqual((project.owner, project.client.name), (self.user, payload['client']['name']))
+
+    async def test_failed_generation_marks_the_project_failed(self):
+        with mock.patch.object(self.service, "agenerate_project", side_effect=ValueError("unparseable")):
+            response = await self.post(self.BODY)
+        self.assertEqual(response.status_code, 500)
+        project = await Project.objects.aget(id=response.json()['id'])
+        self.assertEqual(project.status, Project.Status.FAILED)
+
+    async def test_rejects_missing_credentials_and_input(self):
+        self.assertEqual((await self.post(self.BODY, headers={})).status_code, 401)
+        self.assertEqual((await self.post({"category": "Web"})).status_code, 400)
+        self.assertFalse(await Project.objects.aexists())
+
+
+@override_settings(PROJECT_POOL_DEPTH=5, PROJECT_POOL_MAX_PENDING_REFILLS=1, PROJECT_POOL_ENTRY_TTL=3600)
+class ProjectPoolTests(TestCase):
+    ANSWERS = {"project_type": "practical", "time_budget_hours": 10}
+    PROFILE = {"skills": ["Python"], "skill_level": "BEGINNER", "preferred_tools": [], "excluded_tools": []}
+
+    def test_similar_profiles_share_a_bucket(self):
+        other = dict(self.PROFILE, skills=["Python", "FastAPI"], preferred_tools=["VS Code"], excluded_tools=["Django"])
+        self.assertEqual(
+            get_bucket(bucket_fields(self.ANSWERS, self.PROFILE)).key,
+            get_bucket(bucket_fields(self.ANSWERS, other)).key,
+        )
+
+    def test_bucket_depends_on_skill_level_and_focus_area(self):
+        key = get_bucket(bucket_fields(self.ANSWERS, self.PROFILE, focus_area="APIs")).key
+        self.assertEqual(key, get_bucket(bucket_fields(self.ANSWERS, self.PROFILE, focus_area=" apis ")).key)
+        self.assertNotEqual(key, get_bucket(bucket_fields(self.ANSWERS, self.PROFILE, focus_area="Testing")).key)
+        advanced = dict(self.PROFILE, skill_level="ADVANCED")
+        self.assertNotEqual(key, get_bucket(bucket_fields(self.ANSWERS, advanced, focus_area="APIs")).key)
+
+    def test_entries_mentioning_an_excluded_tool_are_skipped(self):
+        bucket = get_bucket(bucket_fields(self.ANSWERS, self.PROFILE))
+        django_entry = PooledProject.objects.create(bucket=bucket, project_data={"tools": ["Django"]})
+        flask_entry = PooledProject.objects.create(bucket=bucket, project_data={"tools": ["Flask"]})
+        self.assertEqual(claim_pooled_project(bucket, ["django"]).id, flask_entry.id)
+        self.assertTrue(PooledProject.objects.filter(id=django_entry.id).exists())
+
+    def test_refills_are_capped_per_bucket(self):
+        bucket = get_bucket(bucket_fields(self.ANSWERS, self.PROFILE))
+        self.assertEqual(request_refill(bucket, self.ANSWERS, self.PROFILE), 1)
+        self.assertEqual(request_refill(bucket, self.ANSWERS, self.PROFILE), 0)
+        self.assertEqual(GenerationJob.objects.filter(pool_bucket=bucket).count(), 1)
+
+    def test_expired_entries_are_not_claimed(self):
+        bucket = get_bucket(bucket_fields(self.ANSWERS, self.PROFILE))
+        entry = PooledProject.objects.create(bucket=bucket)
+        PooledProject.objects.filter(id=entry.id).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(claim_pooled_project(bucket))
+        self.assertFalse(PooledProject.objects.filter(id=entry.id).exists())
+
+    def test_generations_are_claimed_before_refills(self):
+        bucket = get_bucket(bucket_fields(self.ANSWERS, self.PROFILE))
+        GenerationJob.objects.create(kind=GenerationJob.Kind.POOL_REFILL, pool_bucket=bucket)
+        generate = GenerationJob.objects.create(kind=GenerationJob.Kind.GENERATE)
+        self.assertEqual(claim_next_job("test").id, generate.id)
+
+
+class LeaseRenewalTests(TestCase):
+    def test_renew_lease_only_for_the_owning_worker(self):
+        job = GenerationJob.objects.create()
+        self.assertEqual(claim_next_job("worker-a").id, job.id)
+        GenerationJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now())
+        self.assertFalse(renew_lease(job.id, "worker-b"))
+        self.assertTrue(renew_lease(job.id, "worker-a"))
+        job.refresh_from_db()
+        self.assertGreater(job.lease_expires_at, timezone.now() + timedelta(seconds=60))
+
+    def test_heartbeat_renews_while_the_job_runs(self):
+        job = GenerationJob.objects.create()
+        renewed = threading.Event()
+        with mock.patch("api.jobs.serialized_write", side_effect=lambda fn, *args: renewed.set() or True) as write:
+            with lease_heartbeat(job, "worker-a", interval=0.01):
+                self.assertTrue(renewed.wait(2))
+        write.assert_called_with(renew_lease, job.id, "worker-a")
+
+
+class MetricsTests(TestCase):
+    def test_cache_lookups_are_exported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LLMResponseCache(Path(directory) / "cache.sqlite3")
+            cache.set("hit", {"a": 1})
+            cache.get("hit")
+            cache.get("missing")
+            with mock.patch("api.llm_cache.get_response_cache", return_value=cache):
+                body = REGISTRY.render()
+        self.assertIn('llm_response_cache_lookups_total{result="memory_hit"} 1', body)
+        self.assertIn('llm_response_cache_lookups_total{result="miss"} 1', body)
+
+    def test_without_a_token_only_loopback_is_served(self):
+        self.assertEqual(self.client.get('/api/metrics', REMOTE_ADDR='127.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get('/api/metrics', REMOTE_ADDR='10.0.0.5').status_code, 401)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/api/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/api/metrics', REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'generation_jobs', response.content)
+
+
+class JsonRecoveryTests(SimpleTestCase):
+    SCHEMA = {
+        "type": "OBJECT",
+        "properties": {"title": {"type": "STRING"}, "steps": {"type": "ARRAY", "items": {"type": "STRING"}}},
+        "required": ["title"],
+    }
+
+    def test_valid_json_is_returned_as_is(self):
+        self.assertEqual(recover_json('{"title": "A", "steps": []}'), {"title": "A", "steps": []})
+
+    def test_code_fences_and_prose_are_skipped(self):
+        text = 'Here is the brief:\n```json\n{"title": "A", "steps": ["x"]}\n```\nHope it helps!'
+        self.assertEqual(recover_json(text), {"title": "A", "steps": ["x"]})
+
+    def test_trailing_commas_and_python_literals(self):
+        self.assertEqual(recover_json('{"steps": [1, 2,], "ok": True, "none": None,}'),
+                         {"steps": [1, 2], "ok": True, "none": None})
+
+    def test_single_quotes_and_raw_newlines(self):
+        self.assertEqual(recover_json("{'title': 'line one\nline two'}"), {"title": "line one\nline two"})
+
+    def test_unescaped_quotes_inside_values(self):
+        self.assertEqual(recover_json('{"title": "The "fast" plan", "steps": []}'),
+                         {"title": 'The "fast" plan', "steps": []})
+        self.assertEqual(recover_json("{'title': 'it's done'}"), {"title": "it's done"})
+
+    def test_truncated_object_is_closed(self):
+        self.assertEqual(recover_json('{"title": "A", "steps": ["x", "y"', self.SCHEMA),
+                         {"title": "A", "steps": ["x", "y"]})
+
+    def test_truncated_string_member_is_dropped(self):
+        self.assertEqual(recover_json('{"title": "A", "steps": ["x", "unfini', self.SCHEMA),
+                         {"title": "A", "steps": ["x"]})
+
+    def test_truncation_before_a_required_field_is_not_recovered(self):
+        self.assertIsNone(recover_json('{"steps": ["x", "y"], "tit', self.SCHEMA))
+
+    def test_unrecoverable_input_returns_none(self):
+        self.assertIsNone(recover_json("I cannot help with that."))
+        self.assertIsNone(recover_json('{"title": }'))
+
+
+class SchemaValidationTests(SimpleTestCase):
+    SCHEMA = CompiledSchema({
+        "type": "OBJECT",
+        "properties": {
+            "title": {"type": "STRING"},
+            "hours": {"type": "INTEGER"},
+            "status": {"type": "STRING", "enum": ["DRAFT", "DELIVERED"]},
+            "notes": {"type": "STRING"},
+            "deliverables": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "requirements": {
+                "type": "OBJECT",
+                "properties": {"must_have": {"type": "ARRAY", "items": {"type": "STRING"}}},
+                "required": ["must_have"],
+            },
+        },
+        "required": ["title", "hours", "status", "requirements"],
+    })
+    VALID = {"title": "A", "hours": 5, "status": "DRAFT", "deliverables": ["x"], "requirements": {"must_have": []}}
+
+    def test_valid_response(self):
+        self.assertTrue(self.SCHEMA.is_valid(self.VALID))
+        self.assertTrue(self.SCHEMA.is_valid(dict(self.VALID, notes=None)))  # Optional fields may be null
+
+    def test_missing_required_fields(self):
+        value = dict(self.VALID)
+        del value["title"]
+        value["hours"] = None
+        self.assertEqual(self.SCHEMA.invalid_paths(value), [("title",), ("hours",)])
+
+    def test_wrong_types(self):
+        value = dict(self.VALID, hours=True, deliverables=["x", 3], notes=7)
+        self.assertEqual(self.SCHEMA.invalid_paths(value), [("hours",), ("notes",), ("deliverables",)])
+
+    def test_enum_violation(self):
+        self.assertEqual(self.SCHEMA.invalid_paths(dict(self.VALID, status="SHIPPED")), [("status",)])
+
+    def test_nested_paths_and_follow_up_schema(self):
+        value = dict(self.VALID, requirements={})
+        paths = self.SCHEMA.invalid_paths(value)
+        self.assertEqual(paths, [("requirements", "must_have")])
+        subschema = self.SCHEMA.subschema(paths)
+        self.assertEqual(subschema["required"], ["requirements"])
+        self.assertEqual(subschema["properties"]["requirements"]["required"], ["must_have"])
+        merged = self.SCHEMA.merge(value, {"requirements": {"must_have": ["tests"]}}, paths)
+        self.assertTrue(self.SCHEMA.is_valid(merged))
+        self.assertEqual(value["requirements"], {})  # The original is not modified
+
+
+class ProjectEventsTests(SimpleTestCase):
+    def test_idle_user_buffers_are_evicted(self):
+        broker = InProcessBroker()
+        with mock.patch("api.broker.time.monotonic", return_value=1000):
+            broker.publish(1, "status", {})
+            broker.publish(2, "status", {})
+        with mock.patch("api.broker.time.monotonic", return_value=1000 + broker.BUFFER_TTL_SECONDS - 1):
+            broker.publish(2, "status", {})
+        with mock.patch("api.broker.time.monotonic", return_value=1000 + broker.BUFFER_TTL_SECONDS + 1):
+            event = broker.publish(3, "status", {})
+        self.assertEqual(set(broker._events), {2, 3})
+        self.assertEqual(set(broker._last_event_at), {2, 3})
+        self.assertEqual(broker.latest_id(1), 0)
+        self.assertEqual(broker.latest_id(3), event["id"])
+
+    def test_long_poll_timeout_is_parsed_and_clamped(self):
+        self.assertEqual(long_poll_timeout(None), 25)
+        self.assertEqual(long_poll_timeout("abc"), 25)
+        self.assertEqual(long_poll_timeout("nan"), 25)
+        self.assertEqual(long_poll_timeout("-5"), 1)
+        self.assertEqual(long_poll_timeout("inf"), 60)
+        self.assertEqual(long_poll_timeout("10.5"), 10.5)
+
+
+class ClientSlotTests(SimpleTestCase):
+    def test_async_waiter_is_woken_by_a_thread_release(self):
+        registry = LLMClientRegistry(default_limit=1)
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with registry.slot("model"):
+                held.set()
+                release.wait(2)
+
+        async def wait_for_slot():
+            async with registry.aslot("model"):
+                return registry.in_flight()["model"]
+
+        async def scenario():
+            thread = threading.Thread(target=hold)
+            thread.start()
+            held.wait(2)
+            task = asyncio.create_task(wait_for_slot())
+            await asyncio.sleep(0.05)
+            self.assertFalse(task.done())
+            release.set()
+            result = await asyncio.wait_for(task, 1)
+            thread.join()
+            return result
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+        self.assertEqual(registry.in_flight()["model"], 0)
+
+    def test_cancelled_waiter_does_not_keep_a_slot(self):
+        registry = LLMClientRegistry(default_limit=1)
+
+        async def scenario():
+            async with registry.aslot("model"):
+                waiter = asyncio.create_task(registry.aslot("model").__aenter__())
+                await asyncio.sleep(0)
+                waiter.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiter
+            async with registry.aslot("model"):
+                pass
+
+        asyncio.run(asyncio.wait_for(scenario(), 1))
+        self.assertEqual(registry._async_waiters["model"], set())
+
+
+class QuestionnaireConfigTests(SimpleTestCase):
+    URL = '/api/config/questionnaire'
+    CONFIG = {"questions": [{"id": f"q{i}", "label": "What kind of project do you want?"} for i in range(20)]}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.write("questionnaire.json", self.CONFIG)
+        patcher = mock.patch("api.views.get_questionnaire_cache", return_value=QuestionnaireCache(self.directory))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name, data, mtime=1_000_000):
+        path = self.directory / name
+        path.write_text(json.dumps(data))
+        os.utime(path, (mtime, mtime))
+
+    def test_matching_etag_gets_304(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), self.CONFIG)
+        revalidated = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.content, b'')
+
+    def test_gzip_is_served_pre_compressed_with_its_own_etag(self):
+        plain = self.client.get(self.URL)
+        gzipped = self.client.get(self.URL, HTTP_ACCEPT_ENCODING='br, gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+        self.assertNotEqual(gzipped['ETag'], plain['ETag'])
+        self.assertIn('Accept-Encoding', gzipped['Vary'])
+        self.assertEqual(self.client.get(self.URL, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag']).status_code, 200)
+
+    def test_edited_file_is_reloaded(self):
+        etag = self.client.get(self.URL)['ETag']
+        self.write("questionnaire.json", self.CONFIG, mtime=2_000_000)  # Touched, same content
+        self.assertEqual(self.client.get(self.URL)['ETag'], etag)
+        self.write("questionnaire.json", {"questions": []}, mtime=3_000_000)
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"questions": []})
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_language_variant(self):
+        self.write("questionnaire.es.json", {"questions": ["es"]})
+        self.assertEqual(json.loads(self.client.get(self.URL, HTTP_ACCEPT_LANGUAGE='es').content), {"questions": ["es"]})
+        self.assertEqual(json.loads(self.client.get(self.URL, HTTP_ACCEPT_LANGUAGE='fr').content), self.CONFIG)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=self.user).key}'
+        self.customer = Client.objects.create(name="Client", industry="Web", summary="")
+        self.projects = [
+            Project.objects.create(client=self.customer, owner=self.user, title=f"Project {i}") for i in range(3)
+        ]
+
+    def assertRevalidates(self, url):
+        """Return the ETag after checking that sending it back gets 304."""
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        return etag
+
+    def assertChanged(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def later(self):
+        return timezone.now() + timedelta(seconds=1)
+
+    def test_list_etag_changes_when_a_row_is_deleted(self):
+        etag = self.assertRevalidates('/api/projects/')
+        self.projects[0].delete()  # Not the newest update: only the count changes
+        self.assertChanged('/api/projects/', etag)
+
+    def test_list_etag_changes_when_a_row_is_edited(self):
+        etag = self.assertRevalidates('/api/projects/')
+        Project.objects.filter(id=self.projects[0].id).update(title="Renamed", updated_at=self.later())
+        self.assertChanged('/api/projects/', etag)
+
+    def test_list_etag_changes_when_a_client_is_edited(self):
+        etag = self.assertRevalidates('/api/projects/')
+        Client.objects.filter(id=self.customer.id).update(name="Renamed", updated_at=self.later())
+        self.assertChanged('/api/projects/', etag)
+
+    def test_list_etag_depends_on_query_parameters(self):
+        self.assertNotEqual(
+            self.client.get('/api/projects/')['ETag'],
+            self.client.get('/api/projects/?status=DRAFT')['ETag'],
+        )
+
+    def test_detail_revalidates_until_edited(self):
+        url = f'/api/projects/{self.projects[1].id}/'
+        etag = self.assertRevalidates(url)
+        Project.objects.filter(id=self.projects[2].id).update(updated_at=self.later())  # Another project
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Project.objects.filter(id=self.projects[1].id).update(title="Renamed", updated_at=self.later())
+        self.assertChanged(url, etag)
+
+    def test_not_modified_skips_the_serializer(self):
+        etag = self.client.get('/api/projects/')['ETag']
+        with mock.patch("api.views.ProjectSummarySerializer.to_representation") as serialize:
+            self.assertEqual(self.client.get('/api/projects/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        serialize.assert_not_called()
+
+
+class ProfileContextTests(TestCase):
+    PROFILES = [
+        {"skills": ["Python", "Django"], "skill_level": "INTERMEDIATE", "preferred_tools": ["VS Code"], "excluded_tools": []},
+        {"skills": ["React"], "skill_level": "BASIC", "preferred_tools": [], "excluded_tools": ["jQuery"]},
+        {"skills": ["Figma", "Ilustración"], "skill_level": "ADVANCED", "preferred_tools": ["Diseño"], "excluded_tools": []},
+        {"skills": [], "skill_level": "BASIC", "preferred_tools": [], "excluded_tools": []},
+    ]
+
+    def create_profile(self, index=0):
+        user = User.objects.create_user(username=f"profile{index}")
+        return UserSkillProfile.objects.create(user=user, **self.PROFILES[index])
+
+    def test_context_is_rebuilt_when_profile_fields_change(self):
+        profile = self.create_profile()
+        self.assertEqual(profile.generation_context, build_profile_context(self.PROFILES[0]))
+        profile.skills = ["React"]
+        profile.excluded_tools = ["Redux"]
+        profile.save(update_fields=["skills", "excluded_tools"])
+        profile.refresh_from_db()
+        self.assertEqual(profile.generation_context["category"], "Web Development")
+        self.assertIn("Redux", profile.generation_context["prompt"])
+        self.assertEqual(profile.generation_context, build_profile_context(dict(self.PROFILES[0], skills=["React"], excluded_tools=["Redux"])))
+
+    def test_backfill_migration_matches_the_live_builder(self):
+        migration = importlib.import_module("api.migrations.0012_skill_profile_generation_context")
+        profiles = [self.create_profile(index) for index in range(len(self.PROFILES))]
+        UserSkillProfile.objects.update(generation_context={})
+        migration.backfill_generation_context(apps, None)
+        for profile, data in zip(profiles, self.PROFILES):
+            profile.refresh_from_db()
+            self.assertEqual(profile.generation_context, build_profile_context(data))
+
+
+@override_settings(GENERATION_BATCH_CONCURRENCY=2, GENERATION_BATCH_MAX_SIZE=10)
+class BatchGenerationTests(TestCase):
+    SPEC = {"category": "Web Development", "answers": {"project_type": "practical"}}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='batcher')
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {Token.objects.create(user=self.user).key}'
+
+    def create_batch(self, size=4, max_concurrency=5):
+        response = self.client.post(
+            '/api/projects/generate_batch/',
+            {"specs": [self.SPEC] * size, "max_concurrency": max_concurrency},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_concurrency_is_capped_by_the_setting(self):
+        batch = self.create_batch(max_concurrency=5)
+        self.assertEqual(batch["max_concurrency"], 2)
+        self.assertEqual(batch["queued"], 4)
+        self.assertEqual(len(batch["projects"]), 4)
+
+    def test_workers_claim_at_most_max_concurrency_jobs_of_a_batch(self):
+        batch = GenerationBatch.objects.get(id=self.create_batch()["id"])
+        first, second = claim_next_job("a"), claim_next_job("b")
+        self.assertEqual({first.batch_id, second.batch_id}, {batch.id})
+        self.assertIsNone(claim_next_job("c"))
+
+        # Saturated batches do not block other work
+        other = GenerationJob.objects.create()
+        self.assertEqual(claim_next_job("c").id, other.id)
+
+        GenerationJob.objects.filter(id=first.id).update(status=GenerationJob.Status.DONE)
+        self.assertEqual(claim_next_job("d").batch_id, batch.id)
+
+    def test_batch_status_counts_jobs_and_is_private(self):
+        batch_id = self.create_batch(size=3)["id"]
+        job = claim_next_job("a")
+        GenerationJob.objects.filter(id=job.id).update(status=GenerationJob.Status.FAILED)
+        claim_next_job("b")
+
+        progress = self.client.get(f'/api/projects/batches/{batch_id}/').json()
+        self.assertEqual((progress["queued"], progress["running"], progress["failed"]), (1, 1, 1))
+        self.assertFalse(progress["finished"])
+
+        stranger = User.objects.create_user(username='stranger')
+        response = self.client.get(
+            f'/api/projects/batches/{batch_id}/',
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=stranger).key}',
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_batches_are_rejected(self):
+        url = '/api/projects/generate_batch/'
+        self.assertEqual(self.client.post(url, {"specs": []}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, {"specs": [{"category": "Web"}]}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(url, {"specs": [self.SPEC] * 11}, content_type='application/json').status_code, 400)
+        self.assertFalse(GenerationBatch.objects.exists())
+
+
+class HedgingTests(SimpleTestCase):
+    KEY = ("model", "schema")
+
+    def hedger(self, max_ratio=1.0):
+        hedger = Hedger(min_delay=0.05, min_samples=1, max_ratio=max_ratio, max_threads=4)
+        hedger.observe(self.KEY, 0.05)
+        self.addCleanup(hedger._executor.shutdown, wait=True)
+        return hedger
+
+    def sync_attempts(self, primary, hedge):
+        """attempt(index, race) returning or raising `primary` / `hedge`; "slow" answers after 0.3 s."""
+        calls = []
+
+        def attempt(index, race):
+            calls.append(index)
+            outcome = primary if index == 0 else hedge
+            if outcome == "slow":
+                time.sleep(0.3)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return attempt, calls
+
+    def test_no_hedge_without_latency_samples(self):
+        hedger = Hedger(min_samples=5)
+        self.assertEqual(hedger.call(self.KEY, lambda index, race: (index, race), admit=lambda: True), ((0, None), 0))
+
+    def test_fast_hedge_wins_over_a_slow_request(self):
+        attempt, calls = self.sync_attempts("slow", "hedge")
+        self.assertEqual(self.hedger().call(self.KEY, attempt, admit=lambda: True), ("hedge", 1))
+        self.assertEqual(calls, [0, 1])
+
+    def test_budget_and_quota_gate_the_hedge(self):
+        admit = mock.Mock(return_value=True)
+        attempt, calls = self.sync_attempts("slow", "hedge")
+        self.assertEqual(self.hedger(max_ratio=0).call(self.KEY, attempt, admit), ("slow", 0))
+        admit.assert_not_called()
+
+        attempt, calls = self.sync_attempts("slow", "hedge")
+        self.assertEqual(self.hedger().call(self.KEY, attempt, admit=lambda: False), ("slow", 0))
+        self.assertEqual(calls, [0])
+
+    def test_error_when_both_requests_fail(self):
+        release = threading.Event()
+
+        def attempt(index, race):
+            if index == 0:
+                release.wait(5)
+            else:
+                release.set()
+            raise ValueError(f"attempt {index}")
+
+        with self.assertRaises(ValueError):
+            self.hedger().call(self.KEY, attempt, admit=lambda: True)
+
+    def test_failed_primary_falls_back_to_the_hedge(self):
+        release = threading.Event()
+
+        def attempt(index, race):
+            if index == 0:
+                release.wait(5)
+                raise ValueError("primary")
+            release.set()
+            return "hedge"
+
+        self.assertEqual(self.hedger().call(self.KEY, attempt, admit=lambda: True), ("hedge", 1))
+
+    def test_async_loser_is_cancelled(self):
+        cancelled = []
+
+        async def attempt(index, race):
+            if index == 1:
+                return "hedge"
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(index)
+                raise
+            return "slow"
+
+        async def scenario():
+            result = await self.hedger().acall(self.KEY, attempt, admit=lambda: True)
+            await asyncio.sleep(0)  # Let the cancellation be delivered
+            return result
+
+        self.assertEqual(asyncio.run(scenario()), ("hedge", 1))
+        self.assertEqual(cancelled, [0])
+
+    def test_async_error_when_both_requests_fail(self):
+        async def attempt(index, race):
+            if index == 0:
+                await asyncio.sleep(0.1)
+            raise ValueError(f"attempt {index}")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(self.hedger().acall(self.KEY, attempt, admit=lambda: True))
+
+
+class DatabaseProfileTests(TransactionTestCase):
+    SETTINGS = Path(__file__).resolve().parent.parent / "app" / "settings.py"
+
+    def database(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            for name in {"DB_ENGINE", "DB_POOL"} - set(environ):
+                os.environ.pop(name, None)
+            return runpy.run_path(str(self.SETTINGS))["DATABASES"]["default"]
+
+    def test_sqlite_is_the_default(self):
+        database = self.database()
+        self.assertEqual(database["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    def test_postgres_profile_reads_the_image_variables(self):
+        database = self.database(DB_ENGINE="postgres", POSTGRES_DB="briefs", POSTGRES_HOST="db", DB_CONN_MAX_AGE="30")
+        self.assertEqual(database["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual((database["NAME"], database["HOST"], database["PORT"]), ("briefs", "db", "5432"))
+        self.assertEqual((database["CONN_MAX_AGE"], database["CONN_HEALTH_CHECKS"], database["OPTIONS"]), (30, True, {}))
+
+    def test_postgres_pool_disables_persistent_connections(self):
+        database = self.database(DB_ENGINE="postgres", DB_POOL="1", DB_POOL_MAX_SIZE="8")
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["OPTIONS"]["pool"]["max_size"], 8)
+
+    def test_benchmark_seeds_reads_and_cleans_up(self):
+        # Readers run on their own threads and connections, hence TransactionTestCase
+        out = io.StringIO()
+        call_command("benchmark_database", projects=20, requests=8, concurrency=2, generation_rate=0, stdout=out)
+        report = out.getvalue()
+        for workload in ("list ", "list ?status=DRAFT", "retrieve"):
+            self.assertRegex(report, rf"{re.escape(workload)}\s+8\s")
+        self.assertFalse(Project.objects.exists())
+
+
+class WriteQueueTests(TransactionTestCase):
+    """Writes from many threads go through one writer connection; needs real commits, hence no TestCase."""
+
+    def setUp(self):
+        self.writer = WriteQueue(max_batch=50, window=0.2)
+
+    def write_from_threads(self, count, fn):
+        results, errors = {}, []
+        start = threading.Barrier(count)
+
+        def run(i):
+            start.wait()
+            try:
+                results[i] = self.writer.call(fn, i)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return results, errors
+
+    def test_concurrent_writes_share_a_transaction(self):
+        results, errors = self.write_from_threads(
+            8, lambda i: Client.objects.create(name=f"Client {i}", industry="Web", summary="").id
+        )
+        self.assertEqual(errors, [])
+        # Committed before call() returned, and readable from this connection
+        self.assertEqual(set(Client.objects.values_list('id', flat=True)), set(results.values()))
+        self.assertEqual(self.writer.writes, 8)
+        self.assertLess(self.writer.batches, 8)
+
+    def test_a_failed_write_does_not_undo_its_batch(self):
+        def create(i):
+            client = Client.objects.create(name=f"Client {i}", industry="Web", summary="")
+            if i == 0:
+                raise ValueError("rejected")
+            return client.id
+
+        results, errors = self.write_from_threads(4, create)
+        self.assertEqual([str(error) for error in errors], ["rejected"])
+        self.assertEqual(set(Client.objects.values_list('id', flat=True)), set(results.values()))
+        self.assertEqual(len(results), 3)
+
+    def test_writes_inside_a_transaction_run_inline(self):
+        with transaction.atomic():
+            future = self.writer.submit(Client.objects.create, name="Inline", industry="Web", summary="")
+            self.assertEqual(future.result().name, "Inline")
+        self.assertIsNone(self.writer._thread)
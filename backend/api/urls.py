@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import health, questionnaire_config, ProjectViewSet, UserSkillProfileViewSet
+from .views import (
+    health, questionnaire_config, metrics, ProjectViewSet, UserSkillProfileViewSet,
+    agenerate_project, agenerate_skill_profile, aproject_stream, aproject_events,
+)
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
@@ -9,5 +12,12 @@ router.register(r'skills', UserSkillProfileViewSet, basename='skill-profile')
 urlpatterns = [
     path("health", health),
     path("config/questionnaire", questionnaire_config),
+    path("metrics", metrics),
+    # ASGI-native variants (await the LLM in-request; serve with uvicorn)
+    path("async/projects/generate", agenerate_project),
+    path("async/skills/generate", agenerate_skill_profile),
+    # SSE, authenticated by a stream ticket instead of the token header
+    path("projects/<uuid:pk>/stream/", aproject_stream),
+    path("projects/events/", aproject_events),
     path("", include(router.urls)),
 ]
@@ -1,92 +1,362 @@
 import json
 import logging
-import threading
+import math
 from pathlib import Path
+import re
 from django.conf import settings
 from django.conf import settings
-from rest_framework import viewsets, status, authentication, permissions
-from rest_framework.decorators import api_view, action
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import viewsets, status, permissions, exceptions
+from rest_framework.decorators import api_view, action, authentication_classes
 from rest_framework.response import Response
-from .models import Project, Client, UserSkillProfile
-from .serializers import ProjectSerializer, UserSkillProfileSerializer
-from .llm import LLMService
+from accounts.authentication import CachingTokenAuthentication, stream_ticket_user
+from .models import Project, Client, GenerationBatch, GenerationJob, UserSkillProfile, LLM_CLIENT_FIELDS, LLM_PROJECT_FIELDS
+from .serializers import ProjectSerializer, ProjectSummarySerializer, UserSkillProfileSerializer
+from .llm import get_llm_service
+from .jobs import enqueue_generation, enqueue_batch, generation_payload
+from .pool import bucket_fields, get_bucket, claim_pooled_project, request_refill, pool_stats
+from .conditional import ConditionalGetMixin
+from .pagination import ProjectCursorPagination
+from .sse import project_field_events, user_events
+from .broker import get_broker, pooled_db_call, publish_project_status
+from .metrics import REGISTRY, CONTENT_TYPE, GENERATIONS_IN_FLIGHT, observe_generation_finished, scrape_allowed
+from .sqlite import get_write_queue, serialized_write
+from .questionnaire import get_questionnaire_cache
+from .profile_context import PROFILE_CONTEXT_KEY, PROFILE_FIELDS
 
 logger = logging.getLogger('api')
 
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
 @api_view(["GET"])
 def health(request):
     return Response({"status": "ok"})
 
 @api_view(["GET"])
+@authentication_classes([])
 def questionnaire_config(request):
-    config_path = settings.BASE_DIR / "config" / "questionnaire.json"
+    """
+    Public questionnaire config from an in-memory cache (see api/questionnaire.py),
+    sent as pre-serialized, optionally pre-gzipped bytes with a strong ETag.
+    """
     try:
-        with open(config_path, "r") as f:
-            data = json.load(f)
-        return Response(data)
+        variant = get_questionnaire_cache().get(request_language(request))
     except FileNotFoundError:
         return Response({"error": "Configuration file not found"}, status=500)
     except json.JSONDecodeError:
         return Response({"error": "Invalid configuration file"}, status=500)
 
+    use_gzip = variant.gzipped is not None and ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', ''))
+    etag = variant.gzip_etag if use_gzip else variant.etag
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(variant.gzipped if use_gzip else variant.body, content_type="application/json")
+        if use_gzip:
+            response['Content-Encoding'] = 'gzip'
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.QUESTIONNAIRE_MAX_AGE)
+    patch_vary_headers(response, ('Accept-Encoding', 'Accept-Language'))
+    return response
+
+def metrics(request):
+    """Prometheus scrape endpoint; see `scrape_allowed` for who may read it."""
+    if not scrape_allowed(request.headers.get("Authorization"), request.META.get("REMOTE_ADDR")):
+        return HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+def save_generation_result(project_id, client_data, project_data):
+    """Copy LLM output onto the placeholder Client/Project and mark it DRAFT."""
+    project = Project.objects.get(id=project_id)
+    return apply_generation_data(project, project.client, client_data, project_data)
+
+def apply_generation_data(project, client, client_data, project_data):
+    # Update Client
+    for key, value in client_data.items():
+        setattr(client, key, value)
+    client.save()
+
+    # Update Project
+    for key, value in project_data.items():
+        if key != 'client' and key != 'id': # Don't overwrite ID or FK
+             setattr(project, key, value)
+    
+    was_generating = not project._state.adding and project.status == Project.Status.GENERATING
+    project.status = Project.Status.DRAFT # Or whatever the LLM returned, usually DRAFT
+    project.save()
+    publish_project_status(project)
+    if was_generating:
+        observe_generation_finished(project, "draft")
+    return project
+
+def mark_generation_failed(project_id):
+    try:
+        project = Project.objects.get(id=project_id)
+        project.status = Project.Status.FAILED
+        project.save()
+        publish_project_status(project)
+        observe_generation_finished(project, "failed")
+    except Project.DoesNotExist:
+        pass
+
+def make_field_persister(project_id):
+    """
+    Build an on_field callback that writes each streamed LLM field straight
+    to the placeholder Client/Project, so /stream readers see it immediately.
+    With the SQLite writer queue the writes are queued without waiting; the
+    queue is FIFO, so they still land before the final save_generation_result.
+    """
+    client_id = Project.objects.values_list('client_id', flat=True).get(id=project_id)
+    writer = get_write_queue()
+
+    def write(target, key, value):
+        # queryset.update() skips auto_now, so bump updated_at for conditional GETs
+        try:
+            if target == "client" and key in LLM_CLIENT_FIELDS:
+                Client.objects.filter(id=client_id).update(**{key: value, "updated_at": timezone.now()})
+            elif target == "project" and key in LLM_PROJECT_FIELDS:
+                Project.objects.filter(id=project_id).update(**{key: value, "updated_at": timezone.now()})
+        except Exception:
+            # The final save_generation_result still writes every field
+            logger.warning(f"Could not persist streamed field {target}.{key} for Project {project_id}", exc_info=True)
+
+    def persist(target, key, value):
+        if writer is None:
+            write(target, key, value)
+        else:
+            writer.submit(write, target, key, value)
+
+    return persist
+
 def run_background_generation(project_id, category, answers, profile_data=None, difficulty=None, focus_area=None, language="en"):
     """
     Background worker to call LLM and update Project/Client.
     """
     logger.info(f"Starting background generation for Project {project_id} (Lang: {language})")
+    with GENERATIONS_IN_FLIGHT.track_in_progress():
+        try:
+            service = get_llm_service()
+            client_data, project_data = service.generate_project(
+                category, 
+                answers, 
+                profile_data=profile_data, 
+                difficulty=difficulty, 
+                focus_area=focus_area,
+                language=language,
+                on_field=make_field_persister(project_id) if settings.LLM_STREAMING else None
+            )
+
+            # Retrieve the placeholder project
+            try:
+                serialized_write(save_generation_result, project_id, client_data, project_data)
+                logger.info(f"Successfully generated Project {project_id}")
+
+            except Project.DoesNotExist:
+                logger.error(f"Project {project_id} not found during background generation.")
+
+        except Exception as e:
+            logger.error(f"Background generation failed for Project {project_id}", exc_info=True)
+            # Update status to FAILED
+            serialized_write(mark_generation_failed, project_id)
+
+def request_language(request):
+    """Extract language from the Accept-Language header ('en' or 'es')."""
+    accept_language = request.headers.get('Accept-Language', 'en')
+    language = accept_language.split(',')[0].strip()[:2]
+    if language not in ['en', 'es']:
+        language = 'en'
+    return language
+
+def load_profile_data(user):
+    """
+    Snapshot the user's skill profile for the LLM prompt (None if missing),
+    with the context precomputed when the profile was saved.
+    """
+    profile = (
+        UserSkillProfile.objects.filter(user=user)
+        .values(*PROFILE_FIELDS, 'generation_context')
+        .first()
+    )
+    if profile is None:
+        return None
+    context = profile.pop('generation_context')
+    if context:
+        profile[PROFILE_CONTEXT_KEY] = context
+    return profile
+
+def create_placeholder_project(user, category, answers):
+    # Create a pending client
+    client = Client.objects.create(
+        name="Generating Client...",
+        industry=category,
+        summary="Client profile is being generated."
+    )
+
+    # Create a pending project
+    return Project.objects.create(
+        client=client,
+        owner=user,
+        title="Generating Project...",
+        category=category,
+        objective="Project brief is being generated...",
+        status=Project.Status.GENERATING,
+        source_answers=answers
+    )
+
+def parse_batch_specs(data):
+    """Validate a generate_batch body; returns the list of specs or raises ValidationError."""
+    specs = data.get("specs")
+    if not isinstance(specs, list) or not specs:
+        raise exceptions.ValidationError({"specs": "Expected a non-empty list of {category, answers, difficulty}"})
+    if len(specs) > settings.GENERATION_BATCH_MAX_SIZE:
+        raise exceptions.ValidationError({"specs": f"At most {settings.GENERATION_BATCH_MAX_SIZE} projects per batch"})
+    for index, spec in enumerate(specs):
+        if not isinstance(spec, dict) or not spec.get("category") or not spec.get("answers"):
+            raise exceptions.ValidationError({"specs": f"Item {index}: category and answers are required"})
+    return specs
+
+def create_generation_batch(user, specs, profile, language, max_concurrency):
+    """
+    Placeholder clients, projects and their jobs for a whole batch: three
+    bulk INSERTs in one transaction instead of three queries per project.
+    """
+    with transaction.atomic():
+        batch = GenerationBatch.objects.create(owner=user, size=len(specs), max_concurrency=max_concurrency)
+        clients = Client.objects.bulk_create([
+            Client(name="Generating Client...", industry=spec["category"], summary="Client profile is being generated.")
+            for spec in specs
+        ])
+        projects = Project.objects.bulk_create([
+            Project(
+                client=client,
+                owner=user,
+                title="Generating Project...",
+                category=spec["category"],
+                objective="Project brief is being generated...",
+                status=Project.Status.GENERATING,
+                source_answers=spec["answers"],
+            )
+            for client, spec in zip(clients, specs)
+        ])
+        enqueue_batch(batch, projects, [
+            generation_payload(spec["category"], spec["answers"], profile, spec.get("difficulty"), spec.get("focus_area"), language)
+            for spec in specs
+        ])
+    return batch, projects
+
+def batch_progress(batch):
+    """Aggregate job status counts of a batch plus each project's current status."""
+    counts = dict(
+        GenerationJob.objects.filter(batch=batch)
+        .values_list('status')
+        .annotate(n=Count('id'))
+    )
+    projects = list(
+        Project.objects.filter(generation_jobs__batch=batch)
+        .order_by('created_at')
+        .values('id', 'status')
+    )
+    finished = counts.get(GenerationJob.Status.DONE, 0) + counts.get(GenerationJob.Status.FAILED, 0)
+    return {
+        "id": batch.id,
+        "size": batch.size,
+        "max_concurrency": batch.max_concurrency,
+        "created_at": batch.created_at,
+        "queued": counts.get(GenerationJob.Status.QUEUED, 0),
+        "running": counts.get(GenerationJob.Status.RUNNING, 0),
+        "done": counts.get(GenerationJob.Status.DONE, 0),
+        "failed": counts.get(GenerationJob.Status.FAILED, 0),
+        "finished": finished >= batch.size,
+        "projects": projects,
+    }
+
+def parse_created_after(value):
+    """Accept an ISO date or datetime; naive values use the server timezone."""
     try:
-        service = LLMService()
-        client_data, project_data = service.generate_project(
-            category, 
-            answers, 
-            profile_data=profile_data, 
-            difficulty=difficulty, 
-            focus_area=focus_area,
-            language=language
-        )
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            moment = timezone.datetime.combine(day, timezone.datetime.min.time())
+    except ValueError:
+        return None
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
 
-        # Retrieve the placeholder project
-        try:
-            project = Project.objects.get(id=project_id)
-            client = project.client
-            
-            # Update Client
-            for key, value in client_data.items():
-                setattr(client, key, value)
-            client.save()
-
-            # Update Project
-            for key, value in project_data.items():
-                if key != 'client' and key != 'id': # Don't overwrite ID or FK
-                     setattr(project, key, value)
-            
-            project.status = Project.Status.DRAFT # Or whatever the LLM returned, usually DRAFT
-            project.save()
-            
-            logger.info(f"Successfully generated Project {project_id}")
+def filter_projects(queryset, params):
+    """Apply the list filters: ?status=, ?category= and ?created_after=."""
+    status_filter = params.get('status')
+    if status_filter:
+        if status_filter not in Project.Status.values:
+            raise exceptions.ValidationError({'status': f"Must be one of: {', '.join(Project.Status.values)}"})
+        queryset = queryset.filter(status=status_filter)
 
-        except Project.DoesNotExist:
-            logger.error(f"Project {project_id} not found during background generation.")
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
 
-    except Exception as e:
-        logger.error(f"Background generation failed for Project {project_id}", exc_info=True)
-        # Update status to FAILED
-        try:
-            project = Project.objects.get(id=project_id)
-            project.status = Project.Status.FAILED
-            project.save()
-        except:
-             pass
+    created_after = params.get('created_after')
+    if created_after:
+        moment = parse_created_after(created_after)
+        if moment is None:
+            raise exceptions.ValidationError({'created_after': "Expected an ISO 8601 date or datetime"})
+        queryset = queryset.filter(created_at__gt=moment)
+    return queryset
 
-class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachingTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = ProjectCursorPagination
 
     def get_queryset(self):
         """Retrieve projects for the authenticated user"""
-        return self.queryset.filter(owner=self.request.user)
+        queryset = self.queryset.filter(owner=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            queryset = self._restrict_columns(queryset)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            queryset = filter_projects(queryset, self.request.query_params)
+        return queryset
+
+    def get_serializer_class(self):
+        # Lists default to the summary projection; ?fields= opts into any full field
+        if self.action == 'list' and not self.request.query_params.get('fields'):
+            return ProjectSummarySerializer
+        return ProjectSerializer
+
+    def _restrict_columns(self, queryset):
+        """Join the client and load only the columns the chosen serializer reads"""
+        serializer = self.get_serializer()
+        project_fields = {f.name for f in Project._meta.concrete_fields}
+        columns = {'id', 'created_at'}  # created_at is the pagination cursor
+        client_columns = set()
+
+        for name, field in serializer.fields.items():
+            if name == 'client':
+                client_columns |= {f.name for f in Client._meta.concrete_fields}
+            elif field.source.startswith('client.'):
+                client_columns.add(field.source.split('.', 1)[1])
+            elif field.source in project_fields:
+                columns.add(field.source)
+
+        if client_columns:
+            queryset = queryset.select_related('client')
+            columns |= {'client'} | {f'client__{name}' for name in client_columns}
+        return queryset.only(*columns)
 
     @action(detail=False, methods=['post'])
     def generate(self, request):
@@ -101,11 +371,7 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
         difficulty = request.data.get("difficulty")
         focus_area = request.data.get("focus_area")
 
-        # Extract language from header
-        accept_language = request.headers.get('Accept-Language', 'en')
-        language = accept_language.split(',')[0].strip()[:2]
-        if language not in ['en', 'es']:
-            language = 'en'
+        language = request_language(request)
 
         if not category or not answers:
             return Response(
@@ -113,54 +379,74 @@ class ProjectViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # 1. Create Placeholders
-        # Create a pending client
-        client = Client.objects.create(
-            name="Generating Client...",
-            industry=category,
-            summary="Client profile is being generated."
-        )
+        # 1. Fetch profile data to pass to the worker
+        profile = load_profile_data(request.user)
 
-        # Create a pending project
-        project = Project.objects.create(
-            client=client,
-            owner=request.user,
-            title="Generating Project...",
-            category=category,
-            objective="Project brief is being generated...",
-            status=Project.Status.GENERATING,
-            source_answers=answers
-        )
+        # 2. Serve a pre-generated pair from the warm pool when one matches
+        bucket = None
+        if settings.PROJECT_POOL_DEPTH > 0:
+            bucket = get_bucket(bucket_fields(answers, profile, difficulty, language, focus_area))
+            with transaction.atomic():
+                entry = claim_pooled_project(bucket, (profile or {}).get("excluded_tools") or ())
+                if entry is not None:
+                    client = Client()
+                    project = Project(client=client, owner=request.user)
+                    apply_generation_data(project, client, entry.client_data, dict(entry.project_data, source_answers=answers))
+            if entry is not None:
+                logger.info(f"Served Project {project.id} from pool bucket {bucket.key}")
+                request_refill(bucket, answers, profile, difficulty, language, focus_area)
+                return Response(ProjectSerializer(project).data, status=status.HTTP_201_CREATED)
 
-        # 2. Spawn Background Thread
-        # Fetch profile data to pass to thread
-        profile = None
-        try:
-             user_profile = UserSkillProfile.objects.get(user=request.user)
-             # Basic serialization
-             profile = {
-                 "skills": user_profile.skills,
-                 "skill_level": user_profile.skill_level,
-                 "preferred_tools": user_profile.preferred_tools,
-                 "excluded_tools": user_profile.excluded_tools
-             }
-        except UserSkillProfile.DoesNotExist:
-             pass
-
-        thread = threading.Thread(
-            target=run_background_generation,
-            args=(project.id, category, answers, profile, difficulty, focus_area, language)
-        )
-        thread.start()
+        # 3. Create Placeholders and queue the job together so a job never
+        # points at a missing project (and a project never lacks its job)
+        with transaction.atomic():
+            project = create_placeholder_project(request.user, category, answers)
 
-        # 3. Serialize and Return Immediately
+            # Picked up by `manage.py run_generation_workers`
+            enqueue_generation(project, category, answers, profile, difficulty, focus_area, language)
+
+        if bucket is not None:
+            request_refill(bucket, answers, profile, difficulty, language, focus_area)
+
+        # 4. Serialize and Return Immediately
         serializer = ProjectSerializer(project)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'])
+    def generate_batch(self, request):
+        """
+        Queue several projects at once: {"specs": [{category, answers, difficulty, focus_area}], "max_concurrency": N}.
+        At most max_concurrency (capped by GENERATION_BATCH_CONCURRENCY) of them generate at the same time.
+        """
+        specs = parse_batch_specs(request.data)
+        try:
+            requested = int(request.data.get("max_concurrency") or settings.GENERATION_BATCH_CONCURRENCY)
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError({"max_concurrency": "Expected a positive integer"})
+        max_concurrency = max(1, min(requested, settings.GENERATION_BATCH_CONCURRENCY))
+
+        profile = load_profile_data(request.user)
+        batch, projects = create_generation_batch(request.user, specs, profile, request_language(request), max_concurrency)
+        logger.info(f"Queued batch {batch.id} of {len(projects)} projects (concurrency {max_concurrency})")
+        return Response(batch_progress(batch), status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path=r'batches/(?P<batch_id>[0-9a-f-]+)')
+    def batch(self, request, batch_id=None):
+        """Aggregate progress of a generate_batch request"""
+        batch = GenerationBatch.objects.filter(id=batch_id, owner=request.user).first()
+        if batch is None:
+            raise exceptions.NotFound()
+        return Response(batch_progress(batch))
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def pool(self, request):
+        """Warm pool depth and hit-rate per bucket (staff only)"""
+        return Response({"target_depth": settings.PROJECT_POOL_DEPTH, "buckets": pool_stats()})
+
 class UserSkillProfileViewSet(viewsets.ModelViewSet):
     """Manage user skill profile"""
     serializer_class = UserSkillProfileSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachingTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
     queryset = UserSkillProfile.objects.all()
 
@@ -208,15 +494,10 @@ class UserSkillProfileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Extract language from header
-        accept_language = request.headers.get('Accept-Language', 'en')
-        language = accept_language.split(',')[0].strip()[:2]
-        if language not in ['en', 'es']:
-            language = 'en'
+        language = request_language(request)
 
         try:
-            from .llm import LLMService
-            llm = LLMService()
+            llm = get_llm_service()
             suggestions = llm.generate_skill_profile(user_input, language=language)
             
             logger.info(f"Generated skill profile suggestions for user {request.user.id}")
@@ -227,3 +508,198 @@ class UserSkillProfileViewSet(viewsets.ModelViewSet):
                 {"error": "Failed to generate profile suggestions. Please try again."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+# ---------------------------------------------------------------------------
+# ASGI-native endpoints
+#
+# DRF views are synchronous, so under an ASGI server each in-flight LLM call
+# would still pin a thread. These plain Django coroutine views await the LLM
+# directly on the event loop and only hop to a thread for short ORM calls.
+# ---------------------------------------------------------------------------
+
+async def _aauthenticate(request):
+    """Resolve `Authorization: Token <key>` to an active user, or None."""
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+    try:
+        user, _ = await pooled_db_call(CachingTokenAuthentication().authenticate_credentials)(auth[1])
+    except exceptions.AuthenticationFailed:
+        return None
+    return user
+
+def _json_body(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return None
+
+def _serialize_project(project_id):
+    project = Project.objects.select_related('client').get(id=project_id)
+    return ProjectSerializer(project).data
+
+@csrf_exempt
+@require_POST
+async def agenerate_project(request):
+    """
+    Generate a project in-request and return it once it is DRAFT (or FAILED).
+    Same input as ProjectViewSet.generate, but no job queue or worker involved.
+    """
+    user = await _aauthenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+    category = data.get("category")
+    answers = data.get("answers")
+    difficulty = data.get("difficulty")
+    focus_area = data.get("focus_area")
+    language = request_language(request)
+
+    if not category or not answers:
+        return JsonResponse({"error": "Category and answers are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+    profile = await sync_to_async(load_profile_data)(user)
+    project = await sync_to_async(create_placeholder_project)(user, category, answers)
+
+    logger.info(f"Starting async generation for Project {project.id} (Lang: {language})")
+    try:
+        with GENERATIONS_IN_FLIGHT.track_in_progress():
+            client_data, project_data = await get_llm_service().agenerate_project(
+                category,
+                answers,
+                profile_data=profile,
+                difficulty=difficulty,
+                focus_area=focus_area,
+                language=language
+            )
+            await sync_to_async(save_generation_result)(project.id, client_data, project_data)
+        logger.info(f"Successfully generated Project {project.id}")
+    except Exception:
+        logger.error(f"Async generation failed for Project {project.id}", exc_info=True)
+        await sync_to_async(mark_generation_failed)(project.id)
+        return JsonResponse(
+            {"error": "Failed to generate project. Please try again.", "id": str(project.id)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    payload = await sync_to_async(_serialize_project)(project.id)
+    return JsonResponse(payload, status=status.HTTP_201_CREATED)
+
+@csrf_exempt
+@require_POST
+async def agenerate_skill_profile(request):
+    """Async counterpart of UserSkillProfileViewSet.generate."""
+    user = await _aauthenticate(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_input = data.get('user_input', '')
+    if not user_input or len(user_input.strip()) < 10:
+        return JsonResponse(
+            {"error": "Please provide a description of your goals (at least 10 characters)"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        suggestions = await get_llm_service().agenerate_skill_profile(user_input, language=request_language(request))
+        logger.info(f"Generated skill profile suggestions for user {user.id}")
+        return JsonResponse(suggestions, status=status.HTTP_200_OK)
+    except Exception as e:
+        logger.error(f"Error generating skill profile: {str(e)}")
+        return JsonResponse(
+            {"error": "Failed to generate profile suggestions. Please try again."},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _authorize_project_stream(ticket, project_id):
+    """(status, detail) refusing the stream, or None when the ticket's user owns the project."""
+    try:
+        user = stream_ticket_user(ticket)
+    except exceptions.AuthenticationFailed as e:
+        return status.HTTP_401_UNAUTHORIZED, str(e.detail)
+    if not Project.objects.filter(id=project_id, owner=user).exists():
+        return status.HTTP_404_NOT_FOUND, "Not found."
+    return None
+
+@require_GET
+async def aproject_stream(request, pk):
+    """
+    Server-Sent Events: field-by-field progress of a generating project.
+    EventSource cannot send the token header, so the URL carries
+    ?ticket= from POST /api/auth/stream-ticket/. Under ASGI an open stream
+    holds no worker thread; it only borrows one for each poll.
+    """
+    refused = await pooled_db_call(_authorize_project_stream)(request.GET.get('ticket', ''), pk)
+    if refused is not None:
+        code, detail = refused
+        return JsonResponse({"detail": detail}, status=code)
+    response = StreamingHttpResponse(project_field_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+def _ticket_user(ticket):
+    try:
+        return stream_ticket_user(ticket)
+    except exceptions.AuthenticationFailed:
+        return None
+
+def long_poll_timeout(value, default=25, low=1, high=60):
+    """?timeout= of the events long-poll in seconds, clamped to [low, high]; default when absent or not a number."""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return default
+    if math.isnan(timeout):
+        return default
+    return min(max(timeout, low), high)
+
+async def _aevents_user(request):
+    """Stream ticket (EventSource) or token header (long-poll clients), resolved to a user or None."""
+    ticket = request.GET.get('ticket')
+    if not ticket:
+        return await _aauthenticate(request)
+    return await pooled_db_call(_ticket_user)(ticket)
+
+@require_GET
+async def aproject_events(request):
+    """
+    Status transitions (GENERATING -> DRAFT/FAILED) of my projects.
+    `Accept: text/event-stream` gets an SSE stream; anything else is a
+    long-poll returning {"events": [...], "last_event_id": N} as soon as
+    there is something newer than ?last_event_id (or after ?timeout s).
+    Both wait on the broker from the event loop, so under ASGI a waiting
+    client holds no worker thread or DB connection.
+    """
+    user = await _aevents_user(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+
+    broker = get_broker()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id)
+    except (TypeError, ValueError):
+        # New subscriber: only what happens from now on
+        last_event_id = await pooled_db_call(broker.latest_id)(user.id)
+
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(user_events(broker, user.id, last_event_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    timeout = long_poll_timeout(request.GET.get('timeout'))
+    events = await broker.alisten(user.id, last_event_id, timeout=timeout)
+    if events:
+        last_event_id = events[-1]["id"]
+    return JsonResponse({"events": events, "last_event_id": last_event_id})
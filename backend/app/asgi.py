@@ -3,6 +3,12 @@ ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server so the ``/api/async/...`` generation endpoints
+can await the LLM, and the SSE streams wait between polls, on the event loop
+instead of pinning a thread each (a WSGI server buffers those streams whole)::
+
+    uvicorn app.asgi:application --host 0.0.0.0 --port 8000
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
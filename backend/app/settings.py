@@ -49,7 +49,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachingTokenAuthentication',
     ],
 }
 
@@ -88,13 +88,178 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=postgres selects PostgreSQL (the production target); SQLite otherwise
+DB_ENGINE = os.environ.get("DB_ENGINE", "sqlite")
+
+if DB_ENGINE == "postgres":
+    # DB_POOL=1: a psycopg connection pool per process (Django requires CONN_MAX_AGE=0 then);
+    # otherwise each thread keeps its connection for DB_CONN_MAX_AGE seconds
+    DB_POOL = os.environ.get("DB_POOL", "0") == "1"
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("POSTGRES_DB", "ai_client"),
+            'USER': os.environ.get("POSTGRES_USER", "postgres"),
+            'PASSWORD': os.environ.get("POSTGRES_PASSWORD", ""),
+            'HOST': os.environ.get("POSTGRES_HOST", "localhost"),
+            'PORT': os.environ.get("POSTGRES_PORT", "5432"),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", "60")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", "2")),
+                    'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", "20")),
+                    'timeout': float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+                },
+            } if DB_POOL else {},
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Take the write lock at BEGIN, so busy_timeout applies instead of a
+                # read lock failing to upgrade with "database is locked"
+                'transaction_mode': os.environ.get("SQLITE_TRANSACTION_MODE", "IMMEDIATE"),
+            },
+        }
+    }
+
+# SQLite pragmas applied to every new connection (api/sqlite.py)
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SQLITE_BUSY_TIMEOUT", "10"))
+# Background generation writes go through one writer thread, committed in batches
+SQLITE_WRITE_QUEUE = os.environ.get("SQLITE_WRITE_QUEUE", "1") == "1"
+SQLITE_WRITE_BATCH_SIZE = int(os.environ.get("SQLITE_WRITE_BATCH_SIZE", "50"))
+SQLITE_WRITE_BATCH_WINDOW = float(os.environ.get("SQLITE_WRITE_BATCH_WINDOW", "0.02"))
+
+# Generation job queue (drained by `manage.py run_generation_workers`)
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", "4"))
+GENERATION_POLL_INTERVAL = float(os.environ.get("GENERATION_POLL_INTERVAL", "1.0"))
+# A RUNNING job whose lease expires is assumed orphaned by a dead worker and requeued;
+# the worker renews it every third of this while the job runs
+GENERATION_JOB_LEASE_SECONDS = int(os.environ.get("GENERATION_JOB_LEASE_SECONDS", "120"))
+GENERATION_JOB_MAX_ATTEMPTS = int(os.environ.get("GENERATION_JOB_MAX_ATTEMPTS", "3"))
+# /api/projects/generate_batch: projects per request, and how many of one batch may generate at once
+GENERATION_BATCH_MAX_SIZE = int(os.environ.get("GENERATION_BATCH_MAX_SIZE", "50"))
+GENERATION_BATCH_CONCURRENCY = int(os.environ.get("GENERATION_BATCH_CONCURRENCY", "2"))
+
+# LLM response cache: in-process LRU backed by a shared SQLite file
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "0") == "1"
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", str(BASE_DIR / "llm_cache.sqlite3"))
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_DISK_TTL = int(os.environ.get("LLM_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+# Seconds between size checks (a SUM over the cache table) in each process
+LLM_CACHE_PRUNE_INTERVAL = float(os.environ.get("LLM_CACHE_PRUNE_INTERVAL", "60"))
+# Project briefs should vary between requests; enable for staging/test traffic
+LLM_CACHE_PROJECTS = os.environ.get("LLM_CACHE_PROJECTS", "0") == "1"
+
+# Warm pool of pre-generated projects per (language, difficulty, type, time band, category).
+# 0 disables the pool; N keeps up to N ready pairs per bucket, refilled by the workers.
+PROJECT_POOL_DEPTH = int(os.environ.get("PROJECT_POOL_DEPTH", "0"))
+# Refill jobs queued or running per bucket at once, and seconds a pooled pair stays claimable
+PROJECT_POOL_MAX_PENDING_REFILLS = int(os.environ.get("PROJECT_POOL_MAX_PENDING_REFILLS", "1"))
+PROJECT_POOL_ENTRY_TTL = int(os.environ.get("PROJECT_POOL_ENTRY_TTL", str(24 * 3600)))
+
+# "sequential": client call then project call; "combined": one call with a merged schema
+LLM_GENERATION_MODE = os.environ.get("LLM_GENERATION_MODE", "sequential")
+
+# Stream LLM responses and persist each field as soon as it is complete
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") == "1"
+# GET /api/projects/{id}/stream: how often to check the row, and max stream length
+PROJECT_STREAM_POLL_INTERVAL = float(os.environ.get("PROJECT_STREAM_POLL_INTERVAL", "0.5"))
+PROJECT_STREAM_TIMEOUT = int(os.environ.get("PROJECT_STREAM_TIMEOUT", "300"))
+
+# Push channel for project status changes (GET /api/projects/events/).
+# DatabaseBroker works across processes (web + generation workers);
+# InProcessBroker is enough when generation runs in the web process.
+PROJECT_EVENTS_BROKER = os.environ.get("PROJECT_EVENTS_BROKER", "api.broker.DatabaseBroker")
+PROJECT_EVENTS_POLL_INTERVAL = float(os.environ.get("PROJECT_EVENTS_POLL_INTERVAL", "1.0"))
+PROJECT_EVENTS_STREAM_TIMEOUT = int(os.environ.get("PROJECT_EVENTS_STREAM_TIMEOUT", "300"))
+PROJECT_EVENTS_RETENTION = int(os.environ.get("PROJECT_EVENTS_RETENTION", "3600"))
+
+# Concurrent calls per LLM model in this process (0 = unlimited).
+# Overrides: "model=N,other-model=M"
+LLM_MODEL_CONCURRENCY = int(os.environ.get("LLM_MODEL_CONCURRENCY", "8"))
+LLM_MODEL_CONCURRENCY_OVERRIDES = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split("=", 1) for item in os.environ.get("LLM_MODEL_CONCURRENCY_OVERRIDES", "").split(",") if "=" in item
+    )
 }
 
+# Node-wide Gemini quota (token buckets in a shared SQLite file). Background
+# work (pool refills) may not use the last INTERACTIVE_RESERVE share of either bucket.
+LLM_RATE_LIMIT_ENABLED = os.environ.get("LLM_RATE_LIMIT_ENABLED", "1") == "1"
+LLM_RATE_LIMIT_PATH = os.environ.get("LLM_RATE_LIMIT_PATH", str(BASE_DIR / "llm_quota.sqlite3"))
+LLM_RATE_LIMIT_RPM = int(os.environ.get("LLM_RATE_LIMIT_RPM", "30"))
+LLM_RATE_LIMIT_TPM = int(os.environ.get("LLM_RATE_LIMIT_TPM", "15000"))
+LLM_RATE_LIMIT_INTERACTIVE_RESERVE = float(os.environ.get("LLM_RATE_LIMIT_INTERACTIVE_RESERVE", "0.2"))
+# Expected response size, charged up front and settled against the reported usage
+LLM_RATE_LIMIT_OUTPUT_TOKENS = int(os.environ.get("LLM_RATE_LIMIT_OUTPUT_TOKENS", "1500"))
+LLM_RATE_LIMIT_MAX_WAIT = int(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT", "300"))
+
+# LLM backend: "gemini", or "fake" for offline load tests (no API calls, no quota spent)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini")
+# Fake backend latency: "fixed:S", "uniform:A,B" or "lognormal:MEDIAN,SIGMA" in seconds
+LLM_FAKE_LATENCY = os.environ.get("LLM_FAKE_LATENCY", "lognormal:6,0.4")
+# Per-model latency, e.g. "gemma-3-27b-it=lognormal:15,0.8;gemini-2.0-flash=uniform:2,4"
+LLM_FAKE_LATENCY_OVERRIDES = dict(
+    item.split("=", 1) for item in os.environ.get("LLM_FAKE_LATENCY_OVERRIDES", "").split(";") if "=" in item
+)
+# Fraction of fake requests that raise ResourceExhausted / InternalServerError or return malformed JSON
+LLM_FAKE_QUOTA_ERROR_RATE = float(os.environ.get("LLM_FAKE_QUOTA_ERROR_RATE", "0"))
+LLM_FAKE_SERVER_ERROR_RATE = float(os.environ.get("LLM_FAKE_SERVER_ERROR_RATE", "0"))
+LLM_FAKE_MALFORMED_RATE = float(os.environ.get("LLM_FAKE_MALFORMED_RATE", "0"))
+LLM_FAKE_SEED = int(os.environ["LLM_FAKE_SEED"]) if os.environ.get("LLM_FAKE_SEED") else None
+# Route fake calls through the QuotaLimiter to exercise it; point LLM_RATE_LIMIT_PATH at a scratch file
+# and size LLM_RATE_LIMIT_RPM/TPM for the test, or the load test shares (and drains) the real buckets
+LLM_FAKE_RATE_LIMITED = os.environ.get("LLM_FAKE_RATE_LIMITED", "0") == "1"
+
+# Ordered fallback chain of "provider:model[@timeout_seconds]" links. Providers: gemini,
+# openai (any OpenAI-compatible endpoint, see OPENAI_*) and stub (local placeholders; DEBUG or LLM_BACKEND=fake only).
+# A call moves to the next link on quota exhaustion or timeout; links without credentials are left out.
+LLM_CHAIN = os.environ.get("LLM_CHAIN", "gemini:gemma-3-27b-it")
+# Upper bound on one LLM call (seconds) across retries, quota waits and fallbacks
+LLM_CHAIN_DEADLINE = float(os.environ.get("LLM_CHAIN_DEADLINE", "180"))
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "")
+
+# Hedged requests (opt-in): a call still running after the recent LLM_HEDGE_PERCENTILE latency of its
+# model and schema gets an identical second request; the first valid response wins. Hedges are
+# capped at LLM_HEDGE_MAX_RATIO of calls and never start before LLM_HEDGE_MIN_DELAY seconds.
+LLM_HEDGING_ENABLED = os.environ.get("LLM_HEDGING_ENABLED", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_MAX_RATIO = float(os.environ.get("LLM_HEDGE_MAX_RATIO", "0.1"))
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_WINDOW = int(os.environ.get("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Upper bound on an estimated prompt (tokens); the skill profile is trimmed to fit. 0 = no limit
+LLM_PROMPT_TOKEN_BUDGET = int(os.environ.get("LLM_PROMPT_TOKEN_BUDGET", "3000"))
+
+# Projects list page size (cursor pagination, ?page_size= up to 100)
+PROJECT_PAGE_SIZE = int(os.environ.get("PROJECT_PAGE_SIZE", "20"))
+
+# Prometheus metrics: /api/metrics requires "Authorization: Bearer <token>" when set,
+# and answers only loopback clients when it is not; run_generation_workers serves its own metrics on GENERATION_METRICS_PORT (0 = off)
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+GENERATION_METRICS_PORT = int(os.environ.get("GENERATION_METRICS_PORT", "0"))
+
+# GET /api/config/questionnaire: how long browsers and proxies may reuse it before revalidating
+QUESTIONNAIRE_MAX_AGE = int(os.environ.get("QUESTIONNAIRE_MAX_AGE", "300"))
+
+# Token -> user cache for CachingTokenAuthentication (0 disables it); bounds staleness across processes
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Seconds a ticket from POST /api/auth/stream-ticket/ can open an SSE stream
+STREAM_TICKET_MAX_AGE = int(os.environ.get("STREAM_TICKET_MAX_AGE", "60"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
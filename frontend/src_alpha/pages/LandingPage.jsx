@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import { api } from "../services/api";
 import { useAuth } from "../context/AuthContext";
@@ -27,14 +27,60 @@ export default function LandingPage() {
     const navigate = useNavigate();
     const [projects, setProjects] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextPage, setNextPage] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const projectsRef = useRef(projects);
+    projectsRef.current = projects;
 
     const loadProjects = () => {
         api.getProjects()
-            .then((res) => setProjects(res.data))
+            .then((res) => {
+                setProjects(res.data.results);
+                setNextPage(res.data.next);
+            })
             .catch((err) => console.error(err))
             .finally(() => setLoading(false));
     };
 
+    // Merge the first page into the list instead of replacing it, so pages loaded with
+    // "load more" stay put: known cards are updated in place, newer ones are prepended
+    const refreshFirstPage = () => {
+        if (projectsRef.current.length === 0) {
+            loadProjects();
+            return;
+        }
+        api.getProjects()
+            .then((res) => {
+                const fresh = new Map(res.data.results.map((p) => [p.id, p]));
+                setProjects((prev) => {
+                    const known = new Set(prev.map((p) => p.id));
+                    const newer = res.data.results.filter((p) => !known.has(p.id) && (!prev.length || p.created_at > prev[0].created_at));
+                    return [...newer, ...prev.map((p) => fresh.get(p.id) || p)];
+                });
+            })
+            .catch((err) => console.error(err));
+    };
+
+    // A status event for a listed project patches its card; an unknown id is a new project
+    const applyStatus = ({ id, status, title }) => {
+        if (projectsRef.current.some((p) => p.id === id)) {
+            setProjects((prev) => prev.map((p) => (p.id === id ? { ...p, status, title } : p)));
+        } else {
+            refreshFirstPage();
+        }
+    };
+
+    const loadMore = () => {
+        setLoadingMore(true);
+        api.getProjects(nextPage)
+            .then((res) => {
+                setProjects((prev) => [...prev, ...res.data.results]);
+                setNextPage(res.data.next);
+            })
+            .catch((err) => console.error(err))
+            .finally(() => setLoadingMore(false));
+    };
+
     useEffect(() => {
         api.getSkillProfile()
             .then(() => loadProjects())
@@ -46,8 +92,41 @@ export default function LandingPage() {
                 }
             });
 
-        const interval = setInterval(loadProjects, 10000);
-        return () => clearInterval(interval);
+        // Follow status changes the server pushes; poll if SSE is unavailable
+        let interval = null;
+        let source = null;
+        let retry = null;
+        let lastEventId = null;
+        let cancelled = false;
+        const poll = () => {
+            if (!interval) interval = setInterval(refreshFirstPage, 10000);
+        };
+        // EventSource cannot send the token header; each connection gets a fresh short-lived ticket
+        const connect = () => {
+            api.getStreamTicket()
+                .then((ticket) => {
+                    if (cancelled) return;
+                    source = new EventSource(api.projectEventsUrl(ticket, lastEventId));
+                    source.addEventListener('status', (e) => {
+                        lastEventId = e.lastEventId;
+                        applyStatus(JSON.parse(e.data));
+                    });
+                    source.onerror = () => {
+                        // The browser retries with the same, possibly expired, ticket: reconnect with a new one
+                        source.close();
+                        if (!cancelled) retry = setTimeout(connect, 1000);
+                    };
+                })
+                .catch(poll);
+        };
+        connect();
+
+        return () => {
+            cancelled = true;
+            if (source) source.close();
+            clearTimeout(retry);
+            if (interval) clearInterval(interval);
+        };
     }, []);
 
     return (
@@ -216,7 +295,7 @@ export default function LandingPage() {
                                                     }}>
                                                         {p.category}
                                                     </span>
-                                                    <span>📋 {p.client?.name || "Client"}</span>
+                                                    <span>📋 {p.client_name || "Client"}</span>
                                                     <span>📅 {new Date(p.created_at).toLocaleDateString()}</span>
                                                 </div>
                                             </div>
@@ -225,6 +304,24 @@ export default function LandingPage() {
                                     </Link>
                                 );
                             })}
+                            {nextPage && (
+                                <button
+                                    onClick={loadMore}
+                                    disabled={loadingMore}
+                                    style={{
+                                        padding: "12px",
+                                        background: "#f9fafb",
+                                        color: "#374151",
+                                        border: "1px solid #e5e7eb",
+                                        borderRadius: 12,
+                                        fontSize: 14,
+                                        fontWeight: 600,
+                                        cursor: loadingMore ? "default" : "pointer"
+                                    }}
+                                >
+                                    {loadingMore ? t('common.loading') : t('landing.loadMore')}
+                                </button>
+                            )}
                         </div>
                     )}
                 </div>
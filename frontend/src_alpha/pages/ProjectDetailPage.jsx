@@ -73,13 +73,57 @@ export default function ProjectDetailPage() {
 
     useEffect(() => {
         fetchProject();
-        const interval = setInterval(() => {
-            if (project && project.status === 'GENERATING') {
+    }, [id]);
+
+    useEffect(() => {
+        if (!project || project.status !== 'GENERATING') return;
+
+        // Stream fields as the backend writes them; fall back to polling if SSE fails
+        let interval = null;
+        let source = null;
+        let cancelled = false;
+        const poll = () => {
+            if (!interval) interval = setInterval(fetchProject, 3000);
+        };
+
+        const listen = (source) => {
+            source.addEventListener('field', (e) => {
+                const { target, field, value } = JSON.parse(e.data);
+                setProject((prev) => target === 'client'
+                    ? { ...prev, client: { ...prev.client, [field]: value } }
+                    : { ...prev, [field]: value });
+                setLoading(false);
+            });
+            source.addEventListener('done', (e) => {
+                source.close();
+                setProject(JSON.parse(e.data));
+                setLoading(false);
+            });
+            source.addEventListener('timeout', () => {
+                source.close();
                 fetchProject();
-            }
-        }, 3000);
+            });
+            source.onerror = () => {
+                // Also reached when the ticket has expired by the time EventSource reconnects
+                source.close();
+                poll();
+            };
+        };
+
+        // EventSource cannot send the token header; the URL carries a short-lived ticket instead
+        api.getStreamTicket()
+            .then((ticket) => {
+                if (cancelled) return;
+                source = new EventSource(api.projectStreamUrl(id, ticket));
+                listen(source);
+            })
+            .catch(poll);
 
-        return () => clearInterval(interval);
+        return () => {
+            cancelled = true;
+            if (source) source.close();
+            if (interval) clearInterval(interval);
+        };
     }, [id, project?.status]);
 
     if (loading && (!project || project.status === 'GENERATING')) {
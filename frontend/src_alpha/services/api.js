@@ -37,7 +37,13 @@ export const api = {
     // App
     checkHealth: () => client.get('/health'),
     getQuestionnaire: () => client.get('/config/questionnaire'),
-    getProjects: () => client.get('/projects/'),
+    // Cursor-paginated; pass the previous page's `next` URL to fetch the following page
+    getProjects: (next) => client.get(next || '/projects/'),
     getProject: (id) => client.get(`/projects/${id}/`),
+    // EventSource cannot send headers: stream URLs carry a short-lived signed ticket instead of the token
+    getStreamTicket: () => client.post('/auth/stream-ticket/').then((res) => res.data.ticket),
+    projectStreamUrl: (id, ticket) => `${API_BASE_URL}/projects/${id}/stream/?ticket=${encodeURIComponent(ticket)}`,
+    projectEventsUrl: (ticket, lastEventId) => `${API_BASE_URL}/projects/events/?ticket=${encodeURIComponent(ticket)}`
+        + (lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : ''),
     generateProject: (category, answers, difficulty, focus_area) => client.post('/projects/generate/', { category, answers, difficulty, focus_area }),
 };
@@ -31,6 +31,7 @@ export const en = {
     "landing.subtitle": "Manage your AI-generated projects",
     "landing.createProject": "✨ New Project",
     "landing.noProjects": "No projects found",
+    "landing.loadMore": "Load more",
     "landing.createFirst": "Create your first project to get started!",
     "landing.status.generating": "GENERATING",
     "landing.status.draft": "DRAFT",
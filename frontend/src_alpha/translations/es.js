@@ -31,6 +31,7 @@ export const es = {
     "landing.subtitle": "Gestiona tus proyectos generados por IA",
     "landing.createProject": "✨ Nuevo Proyecto",
     "landing.noProjects": "No se encontraron proyectos",
+    "landing.loadMore": "Cargar más",
     "landing.createFirst": "¡Crea tu primer proyecto para empezar!",
     "landing.status.generating": "GENERANDO",
     "landing.status.draft": "BORRADOR",